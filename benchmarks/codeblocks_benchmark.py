@@ -0,0 +1,130 @@
+"""Compare the former regex extractors with utils.codeblocks on model outputs.
+
+The corpus is benchmarks/fixtures/llm_outputs.jsonl, one {"kind", "text"}
+object per line where kind is "python", "json" or "tool". Responses stored
+in the LLM cache can be added with --llm-cache; their kind is guessed from
+the fences they contain. Reports how many outputs each extractor could use
+and the time per call.
+
+    python benchmarks/codeblocks_benchmark.py [--repeat 2000] [--llm-cache data/llm_cache.sqlite]
+"""
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import codeblocks
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "llm_outputs.jsonl")
+
+
+def legacy_python(text):
+    match = re.search(r"```python\n(.*?)\n```", text, re.DOTALL)
+    return match.group(1) if match else ""
+
+
+def legacy_json(text):
+    match = re.search(r'```json\n(.*?)\n```', text, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(1))
+        except json.JSONDecodeError:
+            pass
+    # The tool selector's regex fallback
+    match = re.search(r'\[\s*{.*?}\s*\]', text, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except json.JSONDecodeError:
+            pass
+    return ""
+
+
+def legacy_tool(text):
+    matches = re.findall(r"```tool\s*([\s\S]*?)```", text)
+    if not matches:
+        return None
+    try:
+        return json.loads(matches[0])
+    except json.JSONDecodeError:
+        return None
+
+
+def new_tool(text):
+    for block in codeblocks.find_blocks(text, {"tool"}):
+        if block.closed:
+            return codeblocks.loads_json(block.code)
+    return None
+
+
+EXTRACTORS = {
+    "python": (legacy_python, codeblocks.extract_python),
+    "json": (legacy_json, codeblocks.extract_json),
+    "tool": (legacy_tool, new_tool),
+}
+
+
+def usable(kind, result):
+    if kind == "python":
+        return bool(result) and codeblocks.is_valid_python(result)
+    return bool(result)
+
+
+def load_corpus(path, llm_cache=None):
+    corpus = []
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                entry = json.loads(line)
+                corpus.append((entry["kind"], entry["text"]))
+    if llm_cache:
+        connection = sqlite3.connect(llm_cache)
+        for (response,) in connection.execute("SELECT response FROM responses"):
+            if "```tool" in response:
+                corpus.append(("tool", response))
+            elif "```json" in response.lower():
+                corpus.append(("json", response))
+            elif "```" in response:
+                corpus.append(("python", response))
+        connection.close()
+    return corpus
+
+
+def measure(function, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            function(text)
+    return (time.perf_counter() - start) / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--llm-cache", default=None)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.llm_cache)
+    print(f"{'kind':<8}{'outputs':>9}{'regex ok':>10}{'blocks ok':>11}{'regex us':>10}{'blocks us':>11}")
+    for kind, (legacy, new) in EXTRACTORS.items():
+        texts = [text for entry_kind, text in corpus if entry_kind == kind]
+        if not texts:
+            continue
+        legacy_ok = sum(usable(kind, legacy(text)) for text in texts)
+        new_ok = sum(usable(kind, new(text)) for text in texts)
+        legacy_time = measure(legacy, texts, args.repeat)
+        new_time = measure(new, texts, args.repeat)
+        print(
+            f"{kind:<8}{len(texts):>9}{legacy_ok:>10}{new_ok:>11}"
+            f"{legacy_time * 1e6:>10.1f}{new_time * 1e6:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
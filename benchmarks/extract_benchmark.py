@@ -0,0 +1,85 @@
+"""Compare the BeautifulSoup and streaming lxml documentation extractors.
+
+Runs both extractors over every .html file in benchmarks/fixtures (save real
+documentation pages there to benchmark them) plus a generated ~1.3 MB
+reference page, and reports time per page and peak memory.
+
+    python benchmarks/extract_benchmark.py [--repeat 5] [--fixtures DIR]
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper.scrape
+from scraper.scrape import _extract_with_soup, extract_page_content, DOWNLOAD_CHUNK_SIZE
+
+# Compare whole-page extraction; the scraper itself stops at SCRAPER_MAX_CONTENT_CHARS
+scraper.scrape.MAX_CONTENT_CHARS = None
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def generated_reference_page(sections=3000):
+    """A large API reference page: navigation, prose, parameter tables and code samples."""
+    parts = ["<html><head><script>" + "var bundle = 1;" * 20000 + "</script></head><body>"]
+    parts.append("<nav>" + "".join(f"<a href='/ref/{i}'>Endpoint {i}</a>" for i in range(sections)) + "</nav>")
+    parts.append("<main>")
+    for i in range(sections):
+        parts.append(
+            f"<h2>Endpoint {i}</h2><p>Returns the resource number {i} with its attributes and links.</p>"
+            f"<table><tr><td><code>id</code></td><td>Identifier of resource {i}</td></tr></table>"
+            f"<pre><code>import requests\nresponse = requests.get('https://api.example.org/v1/items/{i}')\n"
+            f"print(response.json())</code></pre>"
+        )
+    parts.append("</main></body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def chunked(data):
+    return [data[i:i + DOWNLOAD_CHUNK_SIZE] for i in range(0, len(data), DOWNLOAD_CHUNK_SIZE)]
+
+
+def measure(function, repeat):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    elapsed = (time.perf_counter() - start) / repeat
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    args = parser.parse_args()
+
+    pages = {}
+    if os.path.isdir(args.fixtures):
+        for name in sorted(os.listdir(args.fixtures)):
+            if name.endswith(".html"):
+                with open(os.path.join(args.fixtures, name), "rb") as file:
+                    pages[name] = file.read()
+    pages["generated_reference"] = generated_reference_page()
+
+    print(f"{'page':<28}{'size':>10}{'soup ms':>12}{'lxml ms':>12}{'soup MB':>10}{'lxml MB':>10}{'chars':>16}")
+    for name, data in pages.items():
+        text = data.decode("utf-8", errors="replace")
+        soup_time, soup_peak, soup_result = measure(lambda: _extract_with_soup(name, text), args.repeat)
+        lxml_time, lxml_peak, lxml_result = measure(lambda: extract_page_content(name, chunked(data)), args.repeat)
+        soup_chars = len(soup_result["content"]) if soup_result else 0
+        lxml_chars = len(lxml_result["content"]) if lxml_result else 0
+        print(
+            f"{name:<28}{len(data) / 1024:>8.0f}KB{soup_time * 1000:>12.1f}{lxml_time * 1000:>12.1f}"
+            f"{soup_peak / 2**20:>10.1f}{lxml_peak / 2**20:>10.1f}{soup_chars:>8}/{lxml_chars:<7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,24 +2,26 @@ from langgraph.graph import StateGraph, START, END
 import utils.nodes as nodes
 import utils.schema as schema
 import utils.router as router
+import utils.approval as approval
+import utils.checkpointer as checkpointer
 from dotenv import load_dotenv
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import RunnableLambda
 
 load_dotenv()
 
-# Create a memory saver for checkpointing
-memory = MemorySaver()
+# Durable checkpointing (CHECKPOINTER/CHECKPOINT_DB), so paused threads survive restarts
+memory = checkpointer.get_checkpointer()
 
 # Build the graph with improved structure
 graph = StateGraph(schema.State)
 
-# Add nodes
-graph.add_node('task_analyzer', nodes.task_analyzer_agent)
-graph.add_node('tool_master', nodes.tool_master_agent)
-graph.add_node('tool_selector', nodes.tool_selector_agent)
-graph.add_node('tool_generator', nodes.tool_generator_agent)
+# Add nodes (LLM nodes carry an async variant that is used by graph.astream/ainvoke)
+graph.add_node('task_analyzer', RunnableLambda(nodes.task_analyzer_agent, afunc=nodes.atask_analyzer_agent))
+graph.add_node('tool_master', RunnableLambda(nodes.tool_master_agent, afunc=nodes.atool_master_agent))
+graph.add_node('tool_selector', RunnableLambda(nodes.tool_selector_agent, afunc=nodes.atool_selector_agent))
+graph.add_node('tool_generator', RunnableLambda(nodes.tool_generator_agent, afunc=nodes.atool_generator_agent))
 graph.add_node('human_approval', nodes.human_approval_agent)
-graph.add_node('task_solver', nodes.task_solver)
+graph.add_node('task_solver', RunnableLambda(nodes.task_solver, afunc=nodes.atask_solver))
 
 # Connect the graph
 graph.add_edge(START, "task_analyzer")
@@ -51,6 +53,9 @@ graph = graph.compile(
     interrupt_before=["human_approval"]  # Interrupt before human approval
 )
 
+# Drop finished threads idle for longer than CHECKPOINT_TTL
+checkpointer.prune_finished(graph)
+
 # display(Image(graph.get_graph().draw_mermaid_png()))
 
 # user_query = """Extract all email addresses from this text: 'Contact us at support@example.com or sales@example.org for more information.'. After extracting the email addresses,reverse those strings. And after that convert all charecters in that string into uppercase and give me that final output"""
@@ -67,35 +72,20 @@ if __name__ == "__main__":
     config = {"configurable": {"thread_id": "example_thread"}}
     
     # Use the stream method to properly handle interrupts
-    stream = graph.stream({"messages": [user_query], "max_turns": 2}, config, stream_mode="values")
+    inputs = checkpointer.resume_or_start(graph, config, {"messages": [user_query], "max_turns": 2})
     
     response = None
-    for output in stream:
-        # If output is None, the graph was interrupted for human input
-        if output is None:
-            print("\n=== HUMAN APPROVAL REQUIRED ===")
-            print("A tool has been generated and requires your approval.")
-            
-            while True:
-                choice = input("Do you approve this tool? (yes/no): ").strip().lower()
-                if choice in ["yes", "y"]:
-                    feedback = input("Optional feedback for the system: ")
-                    human_input = {"human_approved": True, "human_feedback": feedback}
-                    break
-                elif choice in ["no", "n"]:
-                    feedback = input("Please provide feedback on why you rejected the tool: ")
-                    human_input = {"human_approved": False, "human_feedback": feedback}
-                    break
-                else:
-                    print("Invalid input. Please enter 'yes' or 'no'.")
-            
-            # Resume the graph with human input
-            resume_stream = graph.stream(human_input, config, stream_mode="values")
-            for resume_output in resume_stream:
-                if resume_output is not None:
-                    response = resume_output
-        else:
+    while True:
+        # Settle a pending tool approval (APPROVAL_POLICY) before continuing a paused thread
+        if inputs is None and approval.resolve(graph, config) is approval.DEFERRED:
+            break
+        for output in graph.stream(inputs, config, stream_mode="values"):
             response = output
+        
+        # The stream stops before human_approval
+        if "human_approval" not in graph.get_state(config).next:
+            break
+        inputs = None
     
     # Print results at the end
     if response and 'messages' in response:
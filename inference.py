@@ -1,13 +1,28 @@
 import json
 import os
+import hashlib
+import itertools
+import collections
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from tqdm import tqdm
 from langgraph.graph import StateGraph, START, END
 import utils.nodes as nodes
 import utils.schema as schema
 import utils.router as router
+import utils.approval as approval
+import utils.checkpointer as checkpointer
+from utils.result_log import ResultLog
+from utils.dataset import DatasetReader, parse_shard
 from dotenv import load_dotenv
 
+load_dotenv()
+
+# Questions answered concurrently; each runs the full graph against the shared LLM endpoint
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+# Result log lines written between fsyncs
+INFERENCE_FSYNC_EVERY = int(os.getenv("INFERENCE_FSYNC_EVERY", "20"))
+
 def load_checkpoint(checkpoint_file):
     """
     Load checkpoint file to resume processing
@@ -17,134 +32,198 @@ def load_checkpoint(checkpoint_file):
             return json.load(f)
     return None
 
-def save_checkpoint(checkpoint_file, results, current_index):
+def _question(line):
+    try:
+        return json.loads(line)["question"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def _restore_results(checkpoint, dataset):
+    """Completed results by dataset index from a JSON checkpoint of earlier versions."""
+    if not checkpoint:
+        return {}
+    if 'current_index' not in checkpoint:
+        return {int(i): item for i, item in checkpoint['results'].items()}
+    # Old checkpoints kept only successful results, in order and without indices: match them to
+    # the lines they were processed from by question, repeated questions taking successive lines
+    lines = {}
+    for i in range(min(checkpoint['current_index'] + 1, len(dataset))):
+        lines.setdefault(_question(dataset[i]), collections.deque()).append(i)
+    restored = {}
+    for item in checkpoint['results']:
+        candidates = lines.get(item.get('question'))
+        if candidates:
+            restored[candidates.popleft()] = item
+    return restored
+
+def open_result_log(checkpoint_file, dataset, resume=True):
     """
-    Save checkpoint with current results and processing index
+    Open the append-only result log, importing a JSON checkpoint left by earlier versions
     """
-    checkpoint_data = {
-        'results': results,
-        'current_index': current_index
-    }
-    with open(checkpoint_file, 'w') as f:
-        json.dump(checkpoint_data, f, indent=4)
+    if not resume and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    log = ResultLog(checkpoint_file, fsync_every=INFERENCE_FSYNC_EVERY)
+    legacy_file = os.path.splitext(checkpoint_file)[0] + '.json'
+    if resume and not len(log) and legacy_file != checkpoint_file:
+        for i, item in sorted(_restore_results(load_checkpoint(legacy_file), dataset).items()):
+            log.append(i, item)
+    return log
 
-def handle_human_approval(config, thread_id):
+def dataset_thread_prefix(json_file):
+    """Prefix of the graph thread IDs for questions of `json_file`, so datasets never share threads"""
+    digest = hashlib.sha256(os.path.abspath(json_file).encode("utf-8")).hexdigest()[:12]
+    return f"inference_{digest}"
+
+def run_question(graph, i, line, thread_prefix="thread"):
     """
-    Handle human approval during graph interruption
+    Run one dataset line through the graph with its own thread ID, `<thread_prefix>_<i>`
+    
+    Tool approvals are settled by the APPROVAL_POLICY chain; a question
+    whose approval was queued for review is left for a later run.
     
     Returns:
-        dict: A dictionary with human approval decision and feedback
+        dict: The result item, or None when the graph produced no response
+    """
+    parsed_data = json.loads(line)
+    question = parsed_data["question"]
+    gt = parsed_data["answer"]
+
+    print(f"Processing Question {i+1}: {question}")
+    
+    # Create a unique thread ID for this question
+    thread_id = f"{thread_prefix}_{i}"
+    config = {"configurable": {"thread_id": thread_id}}
+    
+    # Start the graph execution
+    response = None
+    # A run of this question interrupted by a crash or a queued approval continues from its last checkpoint
+    inputs = checkpointer.resume_or_start(graph, config, {"messages": [question], "max_turns": 3})
+    
+    try:
+        while True:
+            if inputs is None and approval.resolve(graph, config) is approval.DEFERRED:
+                print(f"Question {i+1} is waiting for tool review, leaving it for a later run")
+                return None
+            for output in graph.stream(inputs, config, stream_mode="values"):
+                response = output
+            
+            # The stream ends early when the graph was interrupted before human_approval
+            if "human_approval" not in graph.get_state(config).next:
+                break
+            # Continue from the interrupt once the approval policy has decided
+            inputs = None
+    except Exception as e:
+        print(f"Error in stream processing: {e}")
+        traceback.print_exc()
+    
+    if not response:
+        return None
+    return {
+        "question": question,
+        "correct_answer": gt,
+        "answer": response['messages'][-1].content
+    }
+
+def perform_inference(graph, json_file, checkpoint_file='inference_checkpoint.jsonl', resume=True, workers=None,
+                      results_file='ATLASS_FINAL_RESULT_CRAFT.json1111', shard=None):
     """
-    print("\n=== HUMAN APPROVAL REQUIRED ===")
-    print("A tool has been generated and requires your approval.")
+    Answer every question of a JSONL dataset, `workers` at a time (INFERENCE_WORKERS by default)
     
-    while True:
-        choice = input("Do you approve this tool? (yes/no): ").strip().lower()
-        if choice in ["yes", "y"]:
-            feedback = input("Optional feedback for the system: ")
-            return {"human_approved": True, "human_feedback": feedback}
-        elif choice in ["no", "n"]:
-            feedback = input("Please provide feedback on why you rejected the tool: ")
-            return {"human_approved": False, "human_feedback": feedback}
-        else:
-            print("Invalid input. Please enter 'yes' or 'no'.")
-
-def perform_inference(graph, json_file, checkpoint_file='inference_checkpoint.json', resume=True):
+    Every answer is appended to the JSONL checkpoint as it completes, so a
+    resumed run only processes the missing indices. At the end the log is
+    compacted into `results_file`, a JSON array in dataset order. With
+    `shard=(i, N)` only the i-th of N contiguous slices of the dataset is
+    processed. Lines are read lazily, so memory does not grow with the dataset.
+    """
     # Load environment variables
     load_dotenv()
+    workers = max(workers or INFERENCE_WORKERS, 1)
 
     # Compile the graph
     atlass = graph
 
-    # Check for existing checkpoint
-    checkpoint = load_checkpoint(checkpoint_file) if resume else None
-    
-    # Determine starting point
-    start_index = checkpoint['current_index'] + 1 if checkpoint else 0
-    result = checkpoint['results'] if checkpoint else []
+    # Read input data lazily through a cached byte-offset index
+    dataset = DatasetReader(json_file)
 
-    # Read input data
-    with open(json_file) as f:
-        data = f.readlines()
+    # Completed indices are rebuilt by scanning the existing log
+    log = open_result_log(checkpoint_file, dataset, resume)
+    indices = dataset.shard(*shard) if shard else range(len(dataset))
+    thread_prefix = dataset_thread_prefix(json_file)
+    if not resume:
+        # Starting over also drops graph threads that an earlier run left paused
+        for i in indices:
+            atlass.checkpointer.delete_thread(f"{thread_prefix}_{i}")
+    done = sum(1 for i in indices if i in log)
+    pending = (i for i in indices if i not in log)
 
+    executor = ThreadPoolExecutor(max_workers=workers)
     # Process data with resumable checkpoint
     try:
-        for i in tqdm(range(start_index, len(data)), initial=start_index, total=len(data)):
-            line = data[i]
-            try:
-                parsed_data = json.loads(line)
-                question = parsed_data["question"]
-                gt = parsed_data["answer"]
-
-                print(f"Processing Question {i+1}: {question}")
-                
-                # Create a unique thread ID for this question
-                thread_id = f"thread_{i}"
-                config = {"configurable": {"thread_id": thread_id}}
-                
-                # Start the graph execution
-                response = None
-                
-                # Initial invocation
-                stream = atlass.stream({"messages": [question], "max_turns": 3}, config, stream_mode="values")
-                
-                try:
-                    # Process the stream
-                    for output in stream:
-                        # If we get None, it means the graph was interrupted
-                        if output is None:
-                            print("Graph interrupted, waiting for human input...")
-                            
-                            # Get human approval input
-                            human_input = handle_human_approval(config, thread_id)
-                            
-                            # Resume the graph with the human input
-                            resume_stream = atlass.stream(human_input, config, stream_mode="values")
-                            for resume_output in resume_stream:
-                                if resume_output is not None:
-                                    response = resume_output
-                        else:
-                            response = output
-                except Exception as e:
-                    print(f"Error in stream processing: {e}")
-                    traceback.print_exc()
-                
-                if response:
-                    # Prepare result item
-                    result_item = {
-                        "question": question,
-                        "correct_answer": gt,
-                        "answer": response['messages'][-1].content
-                    }
-                    result.append(result_item)
-
-                    # Save checkpoint after each successful processing
-                    save_checkpoint(checkpoint_file, result, i)
-
-            except Exception as inner_error:
-                print(f"Error processing line {i}: {inner_error}")
-                traceback.print_exc()
-                # Optionally, you can choose to continue or break based on your requirements
-                continue
+        # Keep only a few questions queued ahead of the workers
+        futures = {}
+        for i in itertools.islice(pending, workers * 2):
+            futures[executor.submit(run_question, atlass, i, dataset[i], thread_prefix)] = i
+        with tqdm(total=len(indices), initial=done) as progress:
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i = futures.pop(future)
+                    progress.update(1)
+                    next_index = next(pending, None)
+                    if next_index is not None:
+                        futures[executor.submit(run_question, atlass, next_index, dataset[next_index], thread_prefix)] = next_index
+                    try:
+                        result_item = future.result()
+                    except Exception as inner_error:
+                        print(f"Error processing line {i}: {inner_error}")
+                        traceback.print_exception(type(inner_error), inner_error, inner_error.__traceback__)
+                        continue
+                    if result_item:
+                        # One appended line per question, whatever the length of the run
+                        log.append(i, result_item)
 
     except Exception as e:
         print(f"An error occurred: {e}")
         traceback.print_exc()
     finally:
+        # Questions not started yet are picked up by the next resumed run
+        executor.shutdown(wait=False, cancel_futures=True)
+        dataset.close()
         # Save final results
-        with open("ATLASS_FINAL_RESULT_CRAFT.json1111", "w") as f:
-            json.dump(result, f, indent=4)
+        log.close()
+        count = log.compact(results_file)
+        print(f"Wrote {count} results to {results_file}")
+        if nodes.llm.cache is not None:
+            print(f"LLM cache stats: {nodes.llm.cache.stats()}")
 
-    return result
+    return list(log.results())
 
 # Main execution
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run ATLASS over a JSONL dataset of questions and answers")
+    parser.add_argument("json_file", nargs="?", default="inference-data/CRAFT_ALL_DATA.jsonl1111")
+    parser.add_argument("--shard", type=parse_shard, default=None, help="process only shard i of N, e.g. 0/4")
+    parser.add_argument("--workers", type=int, default=None, help="questions answered concurrently")
+    parser.add_argument("--checkpoint", default=None, help="result log (default inference_checkpoint[.shard-i-of-N].jsonl)")
+    parser.add_argument("--output", default=None, help="final results file")
+    parser.add_argument("--no-resume", action="store_true", help="discard the result log and paused threads and start over")
+    args = parser.parse_args()
+
+    # Shards get their own files, so several processes can share a directory
+    suffix = f".shard-{args.shard[0]}-of-{args.shard[1]}" if args.shard else ""
+    checkpoint_file = args.checkpoint or f"inference_checkpoint{suffix}.jsonl"
+    results_file = args.output or f"ATLASS_FINAL_RESULT_CRAFT{suffix}.json1111"
+    if suffix:
+        # Graph threads too, so shards never queue behind each other's SQLite writes
+        db_root, db_ext = os.path.splitext(os.getenv("CHECKPOINT_DB", checkpointer.DEFAULT_CHECKPOINT_DB))
+        os.environ["CHECKPOINT_DB"] = f"{db_root}{suffix}{db_ext}"
+    
     # Import the graph from graph.py
     from graph import graph
     
-    json_file = "inference-data/CRAFT_ALL_DATA.jsonl1111"
-    
     # First run
-    results = perform_inference(graph, json_file, resume=True)
+    results = perform_inference(graph, args.json_file, checkpoint_file=checkpoint_file, resume=not args.no_resume,
+                                workers=args.workers, results_file=results_file, shard=args.shard)
     
-    print("Inference completed successfully!")
\ No newline at end of file
+    print("Inference completed successfully!")
@@ -3,6 +3,7 @@ import json
 import os
 from dotenv import load_dotenv
 from graph import graph
+import utils.approval as approval
 
 def print_banner(text, char='=', width=80):
     """Print a formatted banner with the given text"""
@@ -10,14 +11,29 @@ def print_banner(text, char='=', width=80):
     print(f"{text.center(width)}")
     print(f"{char * width}\n")
 
+def print_token(event, progress):
+    """Print a streamed LLM token, starting a new line whenever the graph stage changes"""
+    stage = event.get("stage")
+    if stage != progress["stage"]:
+        progress["stage"] = stage
+        print(f"\n[{stage}] ", end="", flush=True)
+    if "ttft" in event and event["ttft"] is not None:
+        print(f"(first token after {event['ttft']:.2f}s) ", end="", flush=True)
+    print(event.get("token", ""), end="", flush=True)
+
 def main():
     """
     Main function to run the agent with human-in-the-loop functionality
     """
     load_dotenv()
     
+    # "--resume THREAD_ID" continues a thread that waited for tool review or was cut short
+    resume_thread = None
+    if len(sys.argv) > 2 and sys.argv[1] == "--resume":
+        resume_thread = sys.argv[2]
+        user_query = f"(resuming thread {resume_thread})"
     # Get user query from command line or use a default one
-    if len(sys.argv) > 1:
+    elif len(sys.argv) > 1:
         user_query = " ".join(sys.argv[1:])
     else:
         print_banner("LLM Agent with Tool Generation", "=")
@@ -35,72 +51,76 @@ def main():
     print("\nStarting execution...")
     
     # Create a unique thread ID
-    thread_id = f"thread_{os.urandom(4).hex()}"
+    thread_id = resume_thread or f"thread_{os.urandom(4).hex()}"
     config = {"configurable": {"thread_id": thread_id}}
     
     # Track whether tools were used
     tools_used = False
     tools_approved = False
     
-    # Start the graph execution with streaming to handle interruptions
-    stream = graph.stream({"messages": [user_query], "max_turns": 5}, config, stream_mode="values")
+    # Start the graph execution with streaming to handle interruptions.
+    # "custom" events carry LLM tokens as they are generated, "values" the graph state.
+    # The graph pauses before human_approval; the approval policy decides and the stream resumes.
+    inputs = {"messages": [user_query], "max_turns": 5}
+    if resume_thread:
+        if not graph.get_state(config).next:
+            print(f"Thread {thread_id} has nothing left to resume.")
+            return
+        inputs = None
     
     response = None
+    progress = {"stage": None}
     
     try:
-        for output in stream:
-            # If output is None, the graph was interrupted for human input
-            if output is None:
+        while True:
+            if inputs is None and "human_approval" in graph.get_state(config).next:
                 print_banner("TOOL REVIEW REQUIRED", "!")
                 print("A tool has been generated and requires your approval.")
                 print("Please review the code carefully before approving.")
                 
-                while True:
-                    choice = input("\nDo you approve this tool? (yes/no): ").strip().lower()
-                    if choice in ["yes", "y"]:
-                        feedback = input("Optional feedback for the system: ")
-                        human_input = {"human_approved": True, "human_feedback": feedback}
-                        tools_approved = True
-                        break
-                    elif choice in ["no", "n"]:
-                        feedback = input("Please provide feedback on why you rejected the tool: ")
-                        human_input = {"human_approved": False, "human_feedback": feedback}
-                        break
-                    else:
-                        print("Invalid input. Please enter 'yes' or 'no'.")
+                decision = approval.resolve(graph, config)
+                if decision is approval.DEFERRED:
+                    print(f"\nThe tool was queued for review. Run `python main.py --resume {thread_id}` once it has been decided.")
+                    return
                 
                 print_banner("RESUMING EXECUTION", "-")
-                if tools_approved:
+                if decision["human_approved"]:
+                    tools_approved = True
                     print("✓ Tool approved! The agent will now execute this tool to solve your task.")
                 else:
                     print("✗ Tool rejected. The agent will try to regenerate or find an alternative approach.")
-                    
-                # Resume the graph with human input
-                resume_stream = graph.stream(human_input, config, stream_mode="values")
-                for resume_output in resume_stream:
-                    if resume_output is not None:
-                        response = resume_output
-            else:
-                response = output
+            
+            for mode, output in graph.stream(inputs, config, stream_mode=["values", "custom"]):
+                if mode == "custom":
+                    print_token(output, progress)
+                    continue
                 
-            # Print progress updates based on current state
-            if output and isinstance(output, dict):
-                # Mark tool generation success
-                if output.get('code_generation_success') and not tools_used:
-                    print("✓ Code generation completed successfully")
-                    tools_used = True
+                response = output
                 
-                # Print current stage if available
-                for key in output.keys():
-                    if key == 'task_analyzer_complete':
-                        print("✓ Task analysis completed")
-                    elif key == 'tools_identified' and not tools_used:
-                        print("✓ Required tools identified")
-                    elif key == 'tools_generated' and not tools_used:
-                        print("✓ Tools generated")
-                    elif key == 'tools_executed':
-                        print("✓ Tools executed successfully")
+                # Print progress updates based on current state
+                if output and isinstance(output, dict):
+                    # Mark tool generation success
+                    if output.get('code_generation_success') and not tools_used:
+                        print("✓ Code generation completed successfully")
                         tools_used = True
+                    
+                    # Print current stage if available
+                    for key in output.keys():
+                        if key == 'task_analyzer_complete':
+                            print("✓ Task analysis completed")
+                        elif key == 'tools_identified' and not tools_used:
+                            print("✓ Required tools identified")
+                        elif key == 'tools_generated' and not tools_used:
+                            print("✓ Tools generated")
+                        elif key == 'tools_executed':
+                            print("✓ Tools executed successfully")
+                            tools_used = True
+            
+            # The stream ends early when the graph was interrupted for tool review
+            if "human_approval" not in graph.get_state(config).next:
+                break
+            # Continue from the interrupt once the tool has been reviewed
+            inputs = None
                         
     except KeyboardInterrupt:
         print("\n\nExecution interrupted by user.")
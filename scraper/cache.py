@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_CACHE_PATH = 'data/doc_cache.sqlite'
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+class DocCache:
+    """Persistent cache for the documentation scraper.
+
+    Stores the documentation URLs resolved for each normalized provider name
+    and the extracted content of each scraped URL together with its ETag and
+    Last-Modified validators. Entries younger than `ttl` seconds are served
+    as-is; older pages are revalidated with a conditional GET by the caller.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS providers ("
+            "name TEXT PRIMARY KEY, urls TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, content TEXT NOT NULL, html TEXT NOT NULL, "
+            "etag TEXT, last_modified TEXT, fetched REAL NOT NULL)"
+        )
+
+    @classmethod
+    def from_env(cls):
+        """Build the cache configured by SCRAPER_CACHE_* variables, or None when disabled."""
+        if os.getenv("SCRAPER_CACHE", "on").lower() in ("0", "off", "false", "no"):
+            return None
+        return cls(
+            path=os.getenv("SCRAPER_CACHE_PATH", DEFAULT_CACHE_PATH),
+            ttl=float(os.getenv("SCRAPER_CACHE_TTL", str(DEFAULT_TTL))),
+        )
+
+    def _fresh(self, timestamp):
+        return time.time() - timestamp <= self.ttl
+
+    def get_urls(self, provider):
+        """Return the documentation URLs resolved for `provider`, or None if unknown or expired."""
+        with self._lock:
+            row = self._conn.execute("SELECT urls, created FROM providers WHERE name = ?", (provider,)).fetchone()
+        if row is None or not self._fresh(row[1]):
+            return None
+        return json.loads(row[0])
+
+    def put_urls(self, provider, urls):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO providers (name, urls, created) VALUES (?, ?, ?)",
+                (provider, json.dumps(urls), time.time()),
+            )
+
+    def get_page(self, url):
+        """Return the cached page for `url` with a `fresh` flag, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, html, etag, last_modified, fetched FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        content, html, etag, last_modified, fetched = row
+        return {
+            "url": url,
+            "content": content,
+            "html": html,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": self._fresh(fetched),
+        }
+
+    def put_page(self, url, content, html, etag=None, last_modified=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, content, html, etag, last_modified, fetched) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, content, html, etag, last_modified, time.time()),
+            )
+
+    def touch_page(self, url):
+        """Mark a page as fresh again after a 304 Not Modified."""
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched = ? WHERE url = ?", (time.time(), url))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM providers")
+            self._conn.execute("DELETE FROM pages")
@@ -0,0 +1,200 @@
+import os
+import re
+import math
+import logging
+from collections import Counter
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+logger = logging.getLogger(__name__)
+
+# Tokens of documentation sent to the code-writing LLM
+DOC_TOKEN_BUDGET = int(os.getenv("DOC_TOKEN_BUDGET", "3000"))
+MAX_CHUNK_TOKENS = 400
+# Code samples are what the code writer needs most
+CODE_BOOST = 1.5
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+SKIPPED_TAGS = {"script", "style", "noscript", "nav", "footer", "svg"}
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_encoding = None
+
+
+def count_tokens(text):
+    """Token count with tiktoken, or a characters/4 estimate when the encoding is unavailable."""
+    global _encoding
+    if _encoding is None:
+        try:
+            from tiktoken import get_encoding
+            _encoding = get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken encoding unavailable ({e}), estimating tokens from length")
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def _tokenize(text):
+    # Splitting on anything but letters and digits also breaks snake_case and dotted identifiers apart
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _sections_from_html(html):
+    """Yield (heading, text, is_code) for each heading section and code block of a page."""
+    try:
+        soup = BeautifulSoup(html, 'lxml')
+    except Exception:
+        soup = BeautifulSoup(html, 'html.parser')
+
+    heading = ""
+    buffer = []
+
+    def walk(node):
+        nonlocal heading, buffer
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                text = str(child).strip()
+                if text:
+                    buffer.append(text)
+            elif isinstance(child, Tag):
+                if child.name in SKIPPED_TAGS:
+                    continue
+                if child.name in HEADING_TAGS:
+                    if buffer:
+                        yield heading, "\n".join(buffer), False
+                        buffer = []
+                    heading = child.get_text(" ", strip=True)
+                elif child.name == "pre":
+                    if buffer:
+                        yield heading, "\n".join(buffer), False
+                        buffer = []
+                    code = child.get_text()
+                    if code.strip():
+                        yield heading, code.strip("\n"), True
+                else:
+                    yield from walk(child)
+
+    yield from walk(soup)
+    if buffer:
+        yield heading, "\n".join(buffer), False
+
+
+def _sections_from_text(text):
+    """Yield (heading, text, is_code) from plain or markdown-like text."""
+    heading = ""
+    buffer = []
+    in_code = False
+    for line in text.splitlines():
+        if line.strip().startswith("```"):
+            if buffer:
+                yield heading, "\n".join(buffer), in_code
+                buffer = []
+            in_code = not in_code
+            continue
+        if not in_code and re.match(r"#{1,6}\s", line):
+            if buffer:
+                yield heading, "\n".join(buffer), False
+                buffer = []
+            heading = line.lstrip("#").strip()
+            continue
+        if in_code or line.strip():
+            buffer.append(line if in_code else line.strip())
+    if buffer:
+        yield heading, "\n".join(buffer), in_code
+
+
+def _split_long(text, max_tokens):
+    """Split text on line boundaries into pieces of at most max_tokens."""
+    pieces, current, size = [], [], 0
+    for line in text.split("\n"):
+        tokens = count_tokens(line) + 1
+        if current and size + tokens > max_tokens:
+            pieces.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += tokens
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def chunk_documents(documents, max_chunk_tokens=MAX_CHUNK_TOKENS):
+    """Split scraped {"url", "content", "html"} documents into de-duplicated chunks."""
+    chunks = []
+    seen = set()
+    for document in documents:
+        html = document.get("html")
+        sections = _sections_from_html(html) if html else _sections_from_text(document.get("content") or "")
+        for heading, text, is_code in sections:
+            for piece in _split_long(text, max_chunk_tokens):
+                key = " ".join(piece.split())
+                # Navigation and footers repeat across pages and sections
+                if key in seen or (not is_code and len(key) < 20):
+                    continue
+                seen.add(key)
+                chunks.append({
+                    "url": document.get("url"),
+                    "heading": heading,
+                    "text": piece,
+                    "is_code": is_code,
+                    "position": len(chunks),
+                    "tokens": count_tokens(piece),
+                })
+    return chunks
+
+
+def score_chunks(chunks, query):
+    """Score chunks against the query with BM25 over heading and text."""
+    query_terms = set(_tokenize(query))
+    documents = [Counter(_tokenize(f"{chunk['heading']} {chunk['text']}")) for chunk in chunks]
+    if not documents:
+        return []
+    average_length = sum(sum(terms.values()) for terms in documents) / len(documents) or 1
+    frequency = Counter(term for terms in documents for term in terms.keys() & query_terms)
+
+    scores = []
+    for chunk, terms in zip(chunks, documents):
+        length = sum(terms.values())
+        score = 0.0
+        for term in query_terms:
+            tf = terms.get(term)
+            if not tf:
+                continue
+            idf = math.log(1 + (len(documents) - frequency[term] + 0.5) / (frequency[term] + 0.5))
+            score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+        if chunk["is_code"]:
+            score *= CODE_BOOST
+        scores.append(score)
+    return scores
+
+
+def build_documentation_context(documents, user_query, api_name, token_budget=DOC_TOKEN_BUDGET):
+    """Pack the documentation chunks most relevant to the query into `token_budget` tokens.
+
+    Selected chunks are emitted in their original page order, grouped by source URL.
+    """
+    chunks = chunk_documents(documents)
+    query = f"{user_query} {api_name} python example request api key"
+    scores = score_chunks(chunks, query)
+
+    selected = []
+    used = 0
+    for score, chunk in sorted(zip(scores, chunks), key=lambda item: (-item[0], item[1]["position"])):
+        if used + chunk["tokens"] > token_budget:
+            continue
+        selected.append(chunk)
+        used += chunk["tokens"]
+
+    parts = []
+    current_url = current_heading = None
+    for chunk in sorted(selected, key=lambda chunk: chunk["position"]):
+        if chunk["url"] != current_url:
+            parts.append(f"Source: {chunk['url']}")
+            current_url, current_heading = chunk["url"], None
+        if chunk["heading"] and chunk["heading"] != current_heading:
+            parts.append(f"## {chunk['heading']}")
+            current_heading = chunk["heading"]
+        parts.append(f"```\n{chunk['text']}\n```" if chunk["is_code"] else chunk["text"])
+    logger.info(f"Selected {len(selected)} of {len(chunks)} documentation chunks ({used} tokens)")
+    return "\n\n".join(parts)
@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = 'data/doc_discovery.json'
+DEFAULT_SEEDS_PATH = 'data/api_doc_seeds.json'
+CANCEL_POLL_INTERVAL = 0.2
+# Probe result for a URL the server says does not exist (404/410), as opposed to None for no answer
+NOT_FOUND = object()
+
+# Documentation URL guesses, filled in with the normalized API name and its variations
+URL_TEMPLATES = [
+    "https://www.{api}.com/docs",
+    "https://www.{api}.com/documentation",
+    "https://{api}.com/documentation",
+    "https://www.{api}.co/documentation",
+    "https://docs.{api}.com",
+    "https://developer.{api}.com",
+    "https://api.{api}.com/documentation",
+    "https://www.{api}.org/docs",
+    "https://www.{api}.io/docs",
+    "https://docs.{api}.io",
+    "https://dev.{api}.com",
+    "https://developers.{api}.com",
+    "https://{api}.dev",
+    "https://{api}.com/api",
+    "https://{api}.readthedocs.io",
+    "https://pypi.org/project/{api}",
+    "https://pypi.org/project/python-{api}",
+    "https://github.com/search?q={api}+api+python",
+    "https://rapidapi.com/search/{api}",
+    "https://www.{api_dot}.com/docs",
+    "https://pypi.org/project/{api_underscore}",
+]
+
+
+def normalize_api_name(api_name):
+    return api_name.lower().replace(" ", "").replace("_", "-")
+
+
+def _found(result):
+    return result is not None and result is not NOT_FOUND
+
+
+def _compact(name):
+    return "".join(ch for ch in name.lower() if ch.isalnum())
+
+
+class DiscoveryEngine:
+    """Finds documentation URLs for an API provider and learns from every probe.
+
+    Providers listed in the seed file resolve without any network access.
+    For the others the URL templates are probed in priority order: templates
+    that already worked for this provider first, then templates by how often
+    they worked for any provider, then by `score`. Probing stops as soon as
+    the best `target` candidates are known, or when the time budget runs out.
+
+    `probe(url, deadline)` returns the documentation URL, NOT_FOUND, or None
+    when it got no definitive answer. Only NOT_FOUND counts as a miss: such
+    URLs are not probed again for `negative_ttl` seconds, while timeouts and
+    other transient failures are not recorded at all.
+    """
+
+    def __init__(self, probe, score, state_path=DEFAULT_STATE_PATH, seeds_path=DEFAULT_SEEDS_PATH,
+                 target=3, budget=20.0, negative_ttl=7 * 24 * 3600, max_workers=5):
+        self.probe = probe
+        self.score = score
+        self.state_path = state_path
+        self.target = target
+        self.budget = budget
+        self.negative_ttl = negative_ttl
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+        self._seeds = self._load_seeds(seeds_path)
+
+    @classmethod
+    def from_env(cls, probe, score):
+        return cls(
+            probe,
+            score,
+            state_path=os.getenv("SCRAPER_DISCOVERY_PATH", DEFAULT_STATE_PATH),
+            seeds_path=os.getenv("SCRAPER_DOC_SEEDS", DEFAULT_SEEDS_PATH),
+            budget=float(os.getenv("SCRAPER_DISCOVERY_BUDGET", "20")),
+            negative_ttl=float(os.getenv("SCRAPER_NEGATIVE_TTL", str(7 * 24 * 3600))),
+        )
+
+    def _load_state(self):
+        state = {"patterns": {}, "providers": {}, "negative": {}}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as file:
+                state.update(json.load(file))
+        except (OSError, ValueError):
+            pass
+        return state
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._state, file, indent=4)
+        os.replace(tmp_path, self.state_path)
+
+    @staticmethod
+    def _load_seeds(path):
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                seeds = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        by_name = {}
+        for name, entry in seeds.items():
+            for alias in [name, *entry.get("aliases", [])]:
+                by_name.setdefault(_compact(alias), entry.get("docs", []))
+        return by_name
+
+    def seed_urls(self, api_name):
+        """Known documentation roots for `api_name` from the seed file, if any."""
+        return list(self._seeds.get(_compact(api_name), []))
+
+    def candidates(self, normalized_api):
+        """(template, url) pairs to probe, best first, without recently failed URLs."""
+        variables = {
+            "api": normalized_api,
+            "api_dot": normalized_api.replace("-", "."),
+            "api_underscore": normalized_api.replace("-", "_"),
+        }
+        now = time.time()
+        with self._lock:
+            known = self._state["providers"].get(normalized_api, {}).get("templates", [])
+            patterns = dict(self._state["patterns"])
+            negative = dict(self._state["negative"])
+
+        def priority(item):
+            template, url = item
+            stats = patterns.get(template, {})
+            # Laplace-smoothed success rate across all providers
+            rate = (stats.get("hits", 0) + 1) / (stats.get("hits", 0) + stats.get("misses", 0) + 2)
+            return (template not in known, -rate, -self.score(url, normalized_api))
+
+        seen = set()
+        candidates = []
+        for template in URL_TEMPLATES:
+            url = template.format(**variables)
+            if url in seen or now - negative.get(url, float("-inf")) < self.negative_ttl:
+                continue
+            seen.add(url)
+            candidates.append((template, url))
+        candidates.sort(key=priority)
+        return candidates
+
+    def _record(self, normalized_api, outcomes):
+        now = time.time()
+        with self._lock:
+            provider = self._state["providers"].setdefault(normalized_api, {"templates": []})
+            for template, url, found in outcomes:
+                stats = self._state["patterns"].setdefault(template, {"hits": 0, "misses": 0})
+                if found:
+                    stats["hits"] += 1
+                    self._state["negative"].pop(url, None)
+                    if template not in provider["templates"]:
+                        provider["templates"].append(template)
+                else:
+                    stats["misses"] += 1
+                    self._state["negative"][url] = now
+                    if template in provider["templates"]:
+                        provider["templates"].remove(template)
+            # Forget failures old enough to be retried anyway
+            self._state["negative"] = {
+                url: failed for url, failed in self._state["negative"].items()
+                if now - failed < self.negative_ttl
+            }
+            self._save_state()
+
+    def discover(self, api_name, cancel=None):
+        """Return up to `target` documentation URLs for `api_name`, best first.
+
+        Setting the optional `cancel` event stops probing early; what was
+        learned so far is kept, but no URLs are returned.
+        """
+        seeds = self.seed_urls(api_name)
+        if seeds:
+            logger.info(f"Using known documentation roots for {api_name}")
+            return seeds[:self.target]
+
+        normalized_api = normalize_api_name(api_name)
+        candidates = self.candidates(normalized_api)
+        deadline = time.monotonic() + self.budget
+        results = [None] * len(candidates)
+        resolved = [False] * len(candidates)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = {
+            executor.submit(self.probe, url, deadline): position
+            for position, (_, url) in enumerate(candidates)
+        }
+        pending = set(futures)
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.info(f"Discovery budget of {self.budget}s used up for {api_name}")
+                    break
+                if cancel is not None:
+                    if cancel.is_set():
+                        break
+                    # Wake up regularly to notice cancellation
+                    remaining = min(remaining, CANCEL_POLL_INTERVAL)
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    position = futures[future]
+                    resolved[position] = True
+                    results[position] = future.result()
+                # Stop once the best-ranked candidates are settled and hold enough hits
+                hits = 0
+                for position in range(len(candidates)):
+                    if not resolved[position]:
+                        break
+                    hits += _found(results[position])
+                if hits >= self.target:
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # Probes cut off by the budget or without a definitive answer teach nothing
+        self._record(normalized_api, [
+            (template, url, results[position] is not NOT_FOUND)
+            for position, (template, url) in enumerate(candidates)
+            if resolved[position] and results[position] is not None
+        ])
+
+        if cancel is not None and cancel.is_set():
+            return []
+
+        urls = []
+        for position in range(len(candidates)):
+            if _found(results[position]) and results[position] not in urls:
+                urls.append(results[position])
+        urls.sort(key=lambda url: self.score(url, normalized_api), reverse=True)
+        return urls[:self.target]
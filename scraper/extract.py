@@ -0,0 +1,223 @@
+import io
+import re
+import codecs
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+# Containers matched by the documentation selectors of the BeautifulSoup extractor
+MAIN_TAGS = {"main", "article"}
+MAIN_DIV_CLASSES = {"content", "documentation", "docs", "markdown-body", "readme"}
+MAIN_CLASSES = {"api-documentation", "api-reference"}
+MAIN_IDS = {"readme", "documentation", "content"}
+SKIPPED_TAGS = {"head", "script", "style", "noscript", "template", "svg", "iframe", "nav", "footer"}
+BLOCK_TAGS = {
+    "p", "div", "section", "br", "li", "ul", "ol", "dl", "dt", "dd", "tr", "table",
+    "blockquote", "header", "aside", "form", "hr",
+}
+HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1].lower() if isinstance(tag, str) else ""
+
+
+class _MainContentTarget:
+    """lxml parser target that renders a page as markdown-like text in one pass.
+
+    Text inside documentation containers, all body text and the code blocks
+    are collected side by side, so the same fallbacks as the BeautifulSoup
+    extractor apply without walking the tree again: main containers first,
+    then Python-looking code blocks, then the whole body.
+    """
+
+    def __init__(self, max_chars=None):
+        self.max_chars = max_chars
+        self.main_chars = 0
+        self.body_chars = 0
+        self.main = []
+        self.body = []
+        self.code_blocks = []
+        self._stack = []
+        self._skip = 0
+        self._main = 0
+        self._pre = 0
+        self._code = None
+
+    def _is_main(self, tag, attrib):
+        if tag in MAIN_TAGS:
+            return True
+        classes = set((attrib.get("class") or "").split())
+        if attrib.get("id") in MAIN_IDS or classes & MAIN_CLASSES:
+            return True
+        return tag == "div" and bool(classes & MAIN_DIV_CLASSES)
+
+    def _emit(self, text):
+        if self._skip:
+            return
+        # The body is only a fallback, so stop growing it once it could fill the budget on its own
+        if self.max_chars is None or self.body_chars < self.max_chars:
+            self.body.append(text)
+            self.body_chars += len(text)
+        if self._main:
+            self.main.append(text)
+            self.main_chars += len(text)
+
+    def enough(self):
+        """True once the documentation containers hold `max_chars` of text."""
+        return self.max_chars is not None and self.main_chars >= self.max_chars
+
+    def start(self, tag, attrib):
+        tag = _local_name(tag)
+        skip = tag in SKIPPED_TAGS
+        main = not skip and self._is_main(tag, attrib)
+        self._stack.append((tag, skip, main))
+        self._skip += skip
+        self._main += main
+        if tag == "pre":
+            self._emit("\n```\n")
+            self._pre += 1
+            if self._pre == 1 and not self._skip:
+                self._code = []
+        elif tag in HEADING_LEVELS and not self._pre:
+            self._emit("\n\n" + "#" * HEADING_LEVELS[tag] + " ")
+        elif tag in BLOCK_TAGS and not self._pre:
+            self._emit("\n")
+
+    def end(self, tag):
+        if not self._stack:
+            return
+        tag, skip, main = self._stack.pop()
+        if tag == "pre":
+            self._pre -= 1
+            if self._pre == 0 and self._code is not None:
+                self.code_blocks.append("".join(self._code).strip("\n"))
+                self._code = None
+            self._emit("\n```\n")
+        elif tag in HEADING_LEVELS and not self._pre:
+            self._emit("\n\n")
+        elif tag in BLOCK_TAGS and not self._pre:
+            self._emit("\n")
+        self._skip -= skip
+        self._main -= main
+
+    def data(self, data):
+        if self._skip:
+            return
+        if self._pre:
+            if self._code is not None:
+                self._code.append(data)
+            self._emit(data)
+        else:
+            text = re.sub(r"\s+", " ", data)
+            if text.strip():
+                self._emit(text)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        main = _tidy("".join(self.main))
+        if main:
+            return main
+        code = [block for block in self.code_blocks
+                if 'python' in block.lower() or 'import' in block.lower()]
+        if code:
+            return "\n\n".join(f"```\n{block}\n```" for block in code)
+        return _tidy("".join(self.body))
+
+
+def _tidy(text):
+    lines = [line.rstrip() for line in text.split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def _make_parser(encoding, target):
+    # libxml2 knows fewer aliases than Python, so retry with the canonical codec name
+    candidates = [encoding]
+    if encoding:
+        try:
+            candidates.append(codecs.lookup(encoding).name)
+        except LookupError:
+            pass
+        candidates.append(None)
+    for candidate in candidates:
+        try:
+            return etree.HTMLParser(target=target, encoding=candidate, remove_comments=True)
+        except LookupError:
+            continue
+
+
+def extract_main_content(chunks, encoding=None, include_html=False, max_chars=None):
+    """Extract documentation text from an HTML page given as an iterable of byte chunks.
+
+    Returns {"content", "html"} where content is markdown-like text (headings
+    as `#` lines, code in fenced blocks) and html is the raw page only when
+    `include_html` is set. Chunks are fed to the parser as they arrive, so a
+    page is never held as a tree in memory, and reading stops once the
+    documentation containers hold `max_chars` characters.
+    """
+    if etree is None:
+        raise ImportError("lxml is required for extract_main_content")
+    target = _MainContentTarget(max_chars)
+    parser = _make_parser(encoding, target)
+    raw = [] if include_html else None
+    fed = False
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if isinstance(chunk, str):
+            chunk = chunk.encode(encoding or "utf-8")
+        if raw is not None:
+            raw.append(chunk)
+        parser.feed(chunk)
+        fed = True
+        if target.enough():
+            break
+    content = parser.close() if fed else ""
+    html = b"".join(raw).decode(encoding or "utf-8", errors="replace") if raw is not None else ""
+    return {"content": content, "html": html}
+
+
+def extract_text_content(chunks, encoding=None, max_chars=None):
+    """Decode a plain-text or markdown page incrementally, keeping at most `max_chars` characters."""
+    try:
+        decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parts, size = [], 0
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        parts.append(text)
+        size += len(text)
+        if max_chars is not None and size >= max_chars:
+            break
+    else:
+        parts.append(decoder.decode(b"", final=True))
+    text = "".join(parts)
+    return {"content": (text[:max_chars] if max_chars else text).strip(), "html": ""}
+
+
+def extract_pdf_content(data, max_chars=None):
+    """Text of a PDF document, or None when pypdf is not installed or the file is unreadable."""
+    if PdfReader is None:
+        return None
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        parts, size = [], 0
+        for page in reader.pages:
+            text = page.extract_text() or ""
+            parts.append(text)
+            size += len(text)
+            if max_chars is not None and size >= max_chars:
+                break
+    except Exception:
+        return None
+    return {"content": "\n\n".join(parts).strip(), "html": ""}
@@ -0,0 +1,142 @@
+import os
+import re
+import glob
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEEDS_PATH = 'data/api_doc_seeds.json'
+DEFAULT_EVALUATION_DIR = 'evaluation'
+# Words in tool and file names that describe the task rather than the provider
+GENERIC_WORDS = {
+    "api", "tool", "tools", "get", "fetch", "check", "web", "search", "stock", "stocks",
+    "weather", "news", "data", "price", "prices", "current", "historical", "daily", "client",
+}
+MAX_NGRAM = 3
+MEMO_SIZE = 1024
+
+
+def _compact(text):
+    return "".join(ch for ch in text.lower() if ch.isalnum())
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def provider_from_name(name):
+    """Provider named by a tool or file name such as `stock_Alpha_Vantage_API`, or None."""
+    parts = [part for part in re.split(r"[\W_]+", name) if part]
+    remaining = [part for part in parts if part.lower() not in GENERIC_WORDS]
+    if not remaining or len(remaining) > 2:
+        return None
+    return _compact("".join(remaining))
+
+
+class ProviderClassifier:
+    """Deterministic provider identification from aliases and category keywords.
+
+    Aliases come from the documentation seed file, the tools in `evaluation/`
+    and the API tools in the registry; an alias written anywhere in the query
+    (as one word or split over up to three words) names the provider. Queries
+    without an explicit provider fall back to the seed file's category
+    keywords when exactly one category matches. Answers, including ones
+    obtained from the LLM, are memoized per query.
+    """
+
+    def __init__(self, seeds_path=DEFAULT_SEEDS_PATH, evaluation_dir=DEFAULT_EVALUATION_DIR, registry=None):
+        self.seeds_path = seeds_path
+        self.evaluation_dir = evaluation_dir
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._memo = OrderedDict()
+        self._aliases = {}
+        self._keywords = {}
+        self._registry_version = None
+        self._load_static()
+
+    def _add_alias(self, alias, provider):
+        alias = _compact(alias)
+        # Very short aliases ("x") would match ordinary words
+        if len(alias) >= 3:
+            self._aliases.setdefault(alias, provider)
+
+    def _load_static(self):
+        try:
+            with open(self.seeds_path, "r", encoding="utf-8") as file:
+                seeds = json.load(file)
+        except (OSError, ValueError):
+            seeds = {}
+        for provider, entry in seeds.items():
+            self._add_alias(provider, provider)
+            for alias in entry.get("aliases", []):
+                self._add_alias(alias, provider)
+            for keyword in entry.get("keywords", []):
+                self._keywords.setdefault(_compact(keyword), provider)
+
+        for path in sorted(glob.glob(os.path.join(self.evaluation_dir, "*.py"))):
+            provider = provider_from_name(os.path.splitext(os.path.basename(path))[0])
+            if provider:
+                self._add_alias(provider, self._aliases.get(provider, provider))
+
+    def _sync_registry(self):
+        if self.registry is None:
+            return
+        version, tools = self.registry.snapshot()
+        if version == self._registry_version:
+            return
+        for tool in tools:
+            name = tool.get("name") or ""
+            if "api" not in _words(name.replace("_", " ")):
+                continue
+            provider = provider_from_name(name)
+            if provider:
+                self._add_alias(provider, self._aliases.get(provider, provider))
+        self._registry_version = version
+
+    def canonical(self, name):
+        """Provider a name or alias refers to, so that e.g. "Alpha Vantage" and "alphavantage" compare equal."""
+        with self._lock:
+            self._sync_registry()
+            return self._aliases.get(_compact(name), _compact(name))
+
+    def _match_alias(self, words):
+        # Longest n-gram first, so "alpha vantage" beats a shorter alias inside it
+        for start in range(len(words)):
+            for n in range(min(MAX_NGRAM, len(words) - start), 0, -1):
+                provider = self._aliases.get("".join(words[start:start + n]))
+                if provider:
+                    return provider
+        return None
+
+    def _match_keywords(self, words):
+        providers = {self._keywords[word] for word in words if word in self._keywords}
+        return providers.pop() if len(providers) == 1 else None
+
+    def classify(self, query):
+        """Return the provider for `query` without calling the LLM, or None."""
+        key = " ".join(query.lower().split())
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+            self._sync_registry()
+            words = _words(query)
+            provider = self._match_alias(words) or self._match_keywords(words)
+            if provider:
+                self._remember(key, provider)
+            return provider
+
+    def remember(self, query, provider):
+        """Memoize a provider found another way, such as by the LLM."""
+        with self._lock:
+            self._remember(" ".join(query.lower().split()), provider)
+
+    def _remember(self, key, provider):
+        self._memo[key] = provider
+        self._memo.move_to_end(key)
+        if len(self._memo) > MEMO_SIZE:
+            self._memo.popitem(last=False)
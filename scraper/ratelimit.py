@@ -0,0 +1,44 @@
+import time
+import threading
+from urllib.parse import urlparse
+
+
+class HostRateLimiter:
+    """Token bucket per host, so fetches to different hosts never wait on each other.
+
+    Each host gets `burst` tokens that refill at `rate` tokens per second; a
+    request takes one token and waits for the next refill when none is left.
+    """
+
+    def __init__(self, rate=0.5, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def _reserve(self, host):
+        """Take a token for `host` and return how long the caller must wait before using it."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            # Going negative queues the request behind earlier reservations
+            tokens -= 1
+            self._buckets[host] = (tokens, now)
+        return 0.0 if tokens >= 0 else -tokens / self.rate
+
+    def _release(self, host):
+        with self._lock:
+            tokens, updated = self._buckets[host]
+            self._buckets[host] = (tokens + 1, updated)
+
+    def acquire(self, url, deadline=None):
+        """Block until a request to `url` is allowed; False if that would pass `deadline`."""
+        host = urlparse(url).netloc.lower()
+        wait = self._reserve(host)
+        if deadline is not None and time.monotonic() + wait > deadline:
+            self._release(host)
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
@@ -0,0 +1,247 @@
+"""Record and replay the scraper's HTTP traffic, LLM calls included.
+
+With SCRAPER_REPLAY=record every request sent through `requests` (the
+documentation probes and downloads, and the Ollama calls made through
+utils.transport) is stored under SCRAPER_FIXTURE_DIR, keyed by method, URL,
+conditional headers and body. With SCRAPER_REPLAY=replay the same requests
+are answered from those fixtures without touching the network; a request
+that was never recorded fails like an unreachable host. Replayed responses
+are returned instantly unless SCRAPER_REPLAY_LATENCY scales the recorded
+latency (1 reproduces it).
+
+Run the API code pipeline end to end and print stage timings:
+
+    SCRAPER_REPLAY=record python -m scraper.replay "Weather of Dhaka now?"
+    SCRAPER_REPLAY=replay python -m scraper.replay "Weather of Dhaka now?"
+"""
+import os
+import io
+import json
+import time
+import base64
+import hashlib
+import logging
+import tempfile
+import threading
+import functools
+from collections import defaultdict
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURE_DIR = 'benchmarks/fixtures/scraper'
+# Headers that change the response and therefore belong in the fixture key
+KEY_HEADERS = ("If-None-Match", "If-Modified-Since", "Range")
+# The recorded body is already decoded, so these no longer describe it
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+ERRORS = {
+    "Timeout": requests.exceptions.Timeout,
+    "ConnectionError": requests.exceptions.ConnectionError,
+}
+
+
+class ReplayMiss(requests.exceptions.ConnectionError):
+    """Raised for a request that has no recorded fixture."""
+
+
+class Stats:
+    """Call counts and wall time per pipeline stage and per kind of request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = defaultdict(int)
+        self._seconds = defaultdict(float)
+
+    def add(self, name, seconds):
+        with self._lock:
+            self._calls[name] += 1
+            self._seconds[name] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {name: {"calls": self._calls[name], "seconds": self._seconds[name]} for name in self._calls}
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._seconds.clear()
+
+    def report(self):
+        lines = [f"{'stage':<36}{'calls':>8}{'total s':>10}{'mean ms':>10}"]
+        for name, entry in sorted(self.snapshot().items()):
+            mean = entry["seconds"] / entry["calls"] * 1000 if entry["calls"] else 0
+            lines.append(f"{name:<36}{entry['calls']:>8}{entry['seconds']:>10.2f}{mean:>10.1f}")
+        return "\n".join(lines)
+
+
+stats = Stats()
+
+
+def timed(name):
+    """Decorator that adds the wrapped call's wall time to `stats` under `name`."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats.add(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _request_key(request):
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    conditional = [f"{name}:{request.headers.get(name, '')}" for name in KEY_HEADERS]
+    payload = "\n".join([request.method, request.url, *conditional]).encode("utf-8") + b"\n" + body
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _request_kind(request):
+    return "llm" if request.url.rstrip("/").endswith("/api/generate") else "http"
+
+
+class _Recorder:
+    def __init__(self, mode, fixture_dir, latency_scale=0.0):
+        self.mode = mode
+        self.fixture_dir = fixture_dir
+        self.latency_scale = latency_scale
+        os.makedirs(fixture_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.fixture_dir, f"{key}.json")
+
+    def _save(self, key, entry):
+        tmp_path = f"{self._path(key)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(entry, file, indent=4)
+        os.replace(tmp_path, self._path(key))
+
+    @staticmethod
+    def _build_response(adapter, request, entry):
+        body = base64.b64decode(entry["body"])
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason")
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        return response
+
+    def send(self, original_send, adapter, request, **kwargs):
+        key = _request_key(request)
+        kind = _request_kind(request)
+        start = time.perf_counter()
+        try:
+            if self.mode == "replay":
+                return self._replay(adapter, request, key)
+            return self._record(original_send, adapter, request, key, **kwargs)
+        finally:
+            stats.add(f"{kind} requests", time.perf_counter() - start)
+
+    def _replay(self, adapter, request, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except FileNotFoundError:
+            raise ReplayMiss(f"No recorded response for {request.method} {request.url}", request=request)
+        if self.latency_scale:
+            time.sleep(entry.get("elapsed", 0) * self.latency_scale)
+        if "error" in entry:
+            raise ERRORS.get(entry["error"], requests.exceptions.ConnectionError)(entry["message"], request=request)
+        return self._build_response(adapter, request, entry)
+
+    def _record(self, original_send, adapter, request, key, **kwargs):
+        start = time.perf_counter()
+        entry = {"method": request.method, "url": request.url}
+        try:
+            response = original_send(adapter, request, **kwargs)
+            body = response.content
+        except requests.exceptions.RequestException as e:
+            name = "Timeout" if isinstance(e, requests.exceptions.Timeout) else "ConnectionError"
+            entry.update(error=name, message=str(e), elapsed=time.perf_counter() - start)
+            self._save(key, entry)
+            raise
+        entry.update(
+            status=response.status_code,
+            reason=response.reason,
+            headers={k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS},
+            body=base64.b64encode(body).decode("ascii"),
+            elapsed=time.perf_counter() - start,
+        )
+        self._save(key, entry)
+        return self._build_response(adapter, request, entry)
+
+
+_installed = None
+_original_send = HTTPAdapter.send
+
+
+def install(mode, fixture_dir=DEFAULT_FIXTURE_DIR, latency_scale=0.0):
+    """Route every `requests` transport through the recorder ("record") or the fixtures ("replay")."""
+    global _installed
+    if mode not in ("record", "replay"):
+        raise ValueError(f"Unknown replay mode: {mode}")
+    recorder = _Recorder(mode, fixture_dir, latency_scale)
+
+    def send(adapter, request, **kwargs):
+        return recorder.send(_original_send, adapter, request, **kwargs)
+
+    HTTPAdapter.send = send
+    _installed = recorder
+    logger.info(f"Scraper HTTP {mode} enabled with fixtures in {fixture_dir}")
+
+
+def uninstall():
+    global _installed
+    HTTPAdapter.send = _original_send
+    _installed = None
+
+
+def install_from_env():
+    """Enable record/replay when SCRAPER_REPLAY is "record" or "replay"."""
+    mode = os.getenv("SCRAPER_REPLAY", "off").lower()
+    if mode in ("record", "replay") and _installed is None:
+        install(
+            mode,
+            os.getenv("SCRAPER_FIXTURE_DIR", DEFAULT_FIXTURE_DIR),
+            float(os.getenv("SCRAPER_REPLAY_LATENCY", "0")),
+        )
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Run APICodeAgent under record/replay and print stage timings")
+    parser.add_argument("queries", nargs="+")
+    args = parser.parse_args()
+
+    # Persistent caches would hide requests from the fixtures and make runs differ
+    state_dir = tempfile.mkdtemp(prefix="scraper-replay-")
+    os.environ.setdefault("SCRAPER_CACHE", "off")
+    os.environ.setdefault("SCRAPER_DISCOVERY_PATH", os.path.join(state_dir, "doc_discovery.json"))
+    from scraper.scrape import APICodeAgent
+
+    agent = APICodeAgent()
+    for query in args.queries:
+        stats.reset()
+        start = time.perf_counter()
+        code = agent.generate_api_code(query)
+        elapsed = time.perf_counter() - start
+        print(f"\n=== {query} ({elapsed:.2f}s)")
+        print(stats.report())
+        print(f"\n{code[:500]}")
+
+
+if __name__ == "__main__":
+    main()
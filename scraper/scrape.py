@@ -5,10 +5,21 @@ import re
 import os
 import json
 import random
+import threading
 import logging
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait
 from urllib.parse import urlparse
+from utils import transport
+from utils import codeblocks
+from scraper.cache import DocCache
+from scraper.ratelimit import HostRateLimiter
+from scraper.discovery import DiscoveryEngine, normalize_api_name, CANCEL_POLL_INTERVAL, NOT_FOUND
+from scraper.chunking import build_documentation_context
+from scraper.extract import etree, extract_main_content, extract_text_content, extract_pdf_content
+from scraper.providers import ProviderClassifier, provider_from_name
+from scraper import replay
+from utils.utility import registry
 
 load_dotenv()
 llm_model = os.getenv("LLM_MODEL")
@@ -23,9 +34,25 @@ except ImportError:
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Serve HTTP and LLM calls from recorded fixtures when SCRAPER_REPLAY is set
+replay.install_from_env()
+
 # Constants
 MAX_RETRIES = 3
 BASE_TIMEOUT = 20
+RETRY_BACKOFF_BASE = 1
+RETRY_BACKOFF_CAP = 8
+# Upper bound in seconds on scraping all documentation sources for one tool
+SCRAPE_DEADLINE = float(os.getenv("SCRAPER_DEADLINE", "45"))
+# Look up documentation for the provider in the tool name while the LLM identifies the provider
+SPECULATIVE_DISCOVERY = os.getenv("SCRAPER_SPECULATIVE", "on").lower() not in ("0", "off", "false", "no")
+# Larger documentation pages are truncated while downloading
+MAX_PAGE_BYTES = int(os.getenv("SCRAPER_MAX_PAGE_BYTES", str(2 * 1024 * 1024)))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Reading a page stops once its documentation text reaches this many characters
+MAX_CONTENT_CHARS = int(os.getenv("SCRAPER_MAX_CONTENT_CHARS", "200000"))
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
+TEXT_CONTENT_TYPES = {"text/plain", "text/markdown", "text/x-markdown", "text/x-rst"}
 USER_AGENTS = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Safari/605.1.15',
@@ -33,236 +60,379 @@ USER_AGENTS = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:90.0) Gecko/20100101 Firefox/90.0'
 ]
 
-def find_api_documentation(api_name):
+# Resolved documentation URLs and scraped pages, shared across tool generations
+doc_cache = DocCache.from_env()
+
+# Politeness per documentation host, replacing the fixed sleep before every request
+host_limiter = HostRateLimiter(
+    rate=float(os.getenv("SCRAPER_HOST_RATE", "0.5")),
+    burst=int(os.getenv("SCRAPER_HOST_BURST", "2")),
+)
+
+def url_priority_score(url, normalized_api):
+    """Sort URLs by relevance - prioritize official docs over third-party sites."""
+    parsed_url = urlparse(url)
+    domain = parsed_url.netloc.lower()
+    
+    # Higher score means higher priority
+    score = 0
+    
+    # Prioritize domains containing the API name
+    if normalized_api in domain:
+        score += 100
+        
+    # Prioritize official-looking documentation paths
+    if "/docs" in url or "/documentation" in url or "/api" in url:
+        score += 50
+        
+    # Deprioritize search results and repositories
+    if "github.com/search" in url:
+        score -= 30
+    if "pypi.org" in url:
+        score -= 10
+    if "rapidapi.com" in url:
+        score -= 20
+        
+    return score
+
+def check_documentation_url(url, deadline=None):
+    """Return the final URL if `url` resolves to a documentation page.
+
+    NOT_FOUND means the server answered 404 or 410; None covers everything
+    that is not a definitive answer (timeouts, errors, other pages).
+    """
+    timeout = BASE_TIMEOUT
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            return None
+    try:
+        headers = {'User-Agent': random.choice(USER_AGENTS)}
+        # Just do a HEAD request to check if URL exists
+        response = requests.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+        
+        # Also try GET if HEAD fails (some servers don't support HEAD), asking for a single byte
+        if response.status_code not in [200, 301, 302]:
+            headers['Range'] = 'bytes=0-0'
+            with requests.get(url, headers=headers, timeout=timeout, allow_redirects=True, stream=True) as response:
+                pass
+            
+        if response.status_code in [404, 410]:
+            return NOT_FOUND
+        if response.status_code in [200, 206, 301, 302]:
+            if _content_kind(response.headers.get('Content-Type')) is None:
+                logger.debug(f"Skipping {url}: unsupported content type {response.headers.get('Content-Type')}")
+                return None
+            parsed_url = urlparse(response.url)
+            # Only return URLs that point to actual domains (not search results)
+            if parsed_url.netloc:
+                if any(search_site in parsed_url.netloc for search_site in ["google", "bing", "duckduckgo", "yahoo"]):
+                    return None
+                logger.info(f"Found valid URL: {response.url}")
+                return response.url
+    except requests.exceptions.RequestException as e:
+        logger.debug(f"URL check failed for {url}: {e}")
+    return None
+
+# Recognizes providers named in the query before falling back to the LLM
+provider_classifier = ProviderClassifier(registry=registry)
+
+# Learns which documentation URL patterns work, seeded with known providers
+discovery = DiscoveryEngine.from_env(check_documentation_url, url_priority_score)
+
+@replay.timed("find_api_documentation")
+def find_api_documentation(api_name, cancel=None):
     """Search for API documentation and return relevant URLs using a fallback approach.
     
     Args:
         api_name (str): Name of the API service provider
+        cancel (threading.Event, optional): Stops the search early when set
         
     Returns:
         list: Up to 3 relevant documentation URLs
     """
     # Normalize API name for URL construction
-    normalized_api = api_name.lower().replace(" ", "").replace("_", "-")
-    
-    # Construct common documentation URL patterns
-    common_doc_sites = [
-        f"https://www.{normalized_api}.com/docs",
-        f"https://www.{normalized_api}.com/documentation",
-        f"https://{normalized_api}.com/documentation",
-        f"https://www.{normalized_api}.co/documentation",
-        f"https://docs.{normalized_api}.com",
-        f"https://developer.{normalized_api}.com",
-        f"https://api.{normalized_api}.com/documentation",
-        f"https://www.{normalized_api}.org/docs",
-        f"https://www.{normalized_api}.io/docs",
-        f"https://docs.{normalized_api}.io",
-        f"https://dev.{normalized_api}.com",
-        f"https://developers.{normalized_api}.com",
-        f"https://{normalized_api}.dev",
-        f"https://{normalized_api}.com/api",
-        f"https://{normalized_api}.readthedocs.io",
-        f"https://pypi.org/project/{normalized_api}",
-        f"https://pypi.org/project/python-{normalized_api}",
-        f"https://github.com/search?q={normalized_api}+api+python",
-        f"https://rapidapi.com/search/{normalized_api}"
-    ]
-    
-    # Add common variations (with dots, underscores, etc.)
-    variation_with_dot = normalized_api.replace("-", ".")
-    variation_with_underscore = normalized_api.replace("-", "_")
+    normalized_api = normalize_api_name(api_name)
     
-    # Add these variations to our URL list
-    common_doc_sites.extend([
-        f"https://www.{variation_with_dot}.com/docs",
-        f"https://pypi.org/project/{variation_with_underscore}",
-    ])
+    if doc_cache is not None:
+        cached_urls = doc_cache.get_urls(normalized_api)
+        if cached_urls:
+            logger.info(f"Using cached documentation URLs for {api_name}")
+            return cached_urls
     
     # Check which URLs actually exist
     logger.info(f"Checking potential documentation URLs for {api_name}...")
+    urls = discovery.discover(api_name, cancel)
     
-    def check_url(url):
-        try:
-            headers = {'User-Agent': random.choice(USER_AGENTS)}
-            # Just do a HEAD request to check if URL exists
-            response = requests.head(url, headers=headers, timeout=BASE_TIMEOUT, allow_redirects=True)
-            
-            # Also try GET if HEAD fails (some servers don't support HEAD)
-            if response.status_code not in [200, 301, 302]:
-                response = requests.get(url, headers=headers, timeout=BASE_TIMEOUT, allow_redirects=True, stream=True)
-                # Close connection immediately after checking status
-                response.close()
-                
-            if response.status_code in [200, 301, 302]:
-                parsed_url = urlparse(response.url)
-                # Only return URLs that point to actual domains (not search results)
-                if parsed_url.netloc:
-                    if any(search_site in parsed_url.netloc for search_site in ["google", "bing", "duckduckgo", "yahoo"]):
-                        return None
-                    logger.info(f"Found valid URL: {response.url}")
-                    return response.url
-        except requests.exceptions.RequestException as e:
-            logger.debug(f"URL check failed for {url}: {e}")
-        return None
-    
-    # Check URLs in parallel
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        results = list(executor.map(check_url, common_doc_sites))
-    
-    # Filter out None results
-    urls = [url for url in results if url]
-    
-    # Sort URLs by relevance - prioritize official docs over third-party sites
-    def url_priority_score(url):
-        parsed_url = urlparse(url)
-        domain = parsed_url.netloc.lower()
-        
-        # Higher score means higher priority
-        score = 0
-        
-        # Prioritize domains containing the API name
-        if normalized_api in domain:
-            score += 100
-            
-        # Prioritize official-looking documentation paths
-        if "/docs" in url or "/documentation" in url or "/api" in url:
-            score += 50
-            
-        # Deprioritize search results and repositories
-        if "github.com/search" in url:
-            score -= 30
-        if "pypi.org" in url:
-            score -= 10
-        if "rapidapi.com" in url:
-            score -= 20
-            
-        return score
-    
-    # Sort URLs by priority score (descending)
-    urls.sort(key=url_priority_score, reverse=True)
+    if cancel is not None and cancel.is_set():
+        return []
     
     if not urls:
         logger.warning(f"No documentation found for {api_name}. Please check the API name.")
         return []
     
     logger.info(f"Found {len(urls)} documentation URLs for {api_name}")
-    return urls[:3]
+    if doc_cache is not None:
+        doc_cache.put_urls(normalized_api, urls)
+    return urls
 
-def scrape_documentation(urls):
-    """Scrape and extract content from API documentation URLs with improved error handling."""
-    all_content = []
+@replay.timed("scrape_documentation")
+def scrape_documentation(urls, deadline=SCRAPE_DEADLINE, include_html=False, cancel=None):
+    """Scrape and extract content from API documentation URLs with improved error handling.
+    
+    URLs are fetched concurrently; pages still pending after `deadline`
+    seconds, or when the optional `cancel` event is set, are dropped so one
+    slow host cannot stall tool generation.
+    """
+    if not urls:
+        return []
+    
+    expires = time.monotonic() + deadline
+    executor = ThreadPoolExecutor(max_workers=len(urls))
+    futures = [executor.submit(scrape_single_url, url, expires, include_html) for url in urls]
+    pending = set(futures)
+    while pending and (cancel is None or not cancel.is_set()):
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            logger.warning(f"Documentation deadline of {deadline}s reached, skipping {len(pending)} slow sources")
+            break
+        if cancel is not None:
+            # Wake up regularly to notice cancellation
+            remaining = min(remaining, CANCEL_POLL_INTERVAL)
+        _, pending = wait(pending, timeout=remaining)
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    if cancel is not None and cancel.is_set():
+        return []
     
-    for url in urls:
-        content = scrape_single_url(url)
-        if content:
-            all_content.append(content)
+    all_content = []
+    # Keep the priority order of the input URLs
+    for future in futures:
+        if future not in pending:
+            content = future.result()
+            if content:
+                all_content.append(content)
     
     return all_content
 
-def scrape_single_url(url, retry_count=0):
-    """Scrape a single URL with retry mechanism."""
-    if retry_count >= MAX_RETRIES:
-        logger.error(f"Maximum retries reached for {url}")
-        return None
+@replay.timed("scrape_single_url")
+def scrape_single_url(url, deadline=None, include_html=False):
+    """Scrape a single URL, retrying timeouts and connection errors with jittered backoff.
     
-    try:
-        # Add delay with jitter to avoid rate limiting
-        delay = 2 + random.random() * 2
-        time.sleep(delay)
-        
-        # Get a random user agent
-        headers = {
-            'User-Agent': random.choice(USER_AGENTS),
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-        
-        # Increasing timeout and adding backoff with retry
-        timeout = BASE_TIMEOUT * (retry_count + 1)
-        logger.info(f"Scraping {url} (attempt {retry_count+1}/{MAX_RETRIES}, timeout: {timeout}s)")
-        
-        response = requests.get(url, headers=headers, timeout=timeout)
-        response.raise_for_status()
+    Args:
+        url (str): Page to scrape
+        deadline (float, optional): time.monotonic() value after which no new attempt is started
+        include_html (bool): Also return the raw page as "html"
+    """
+    cached = doc_cache.get_page(url) if doc_cache is not None else None
+    if cached and cached["fresh"]:
+        logger.info(f"Using cached documentation for {url}")
+        return {"url": url, "content": cached["content"], "html": cached["html"]}
+    
+    for attempt in range(MAX_RETRIES):
+        if attempt:
+            # Full jitter keeps concurrent retries from hitting a host in lockstep
+            backoff = random.uniform(0, min(RETRY_BACKOFF_CAP, RETRY_BACKOFF_BASE * 2 ** attempt))
+            if deadline is not None and time.monotonic() + backoff >= deadline:
+                break
+            time.sleep(backoff)
+        
+        # Wait for this host's rate limit instead of sleeping unconditionally
+        if not host_limiter.acquire(url, deadline):
+            break
         
-        # Use lxml parser if available, otherwise fall back to built-in parser
         try:
-            soup = BeautifulSoup(response.text, 'lxml')
-        except:
-            # Fall back to the built-in parser
-            soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract main content (this will vary based on site structure)
-        # Try multiple selectors that might contain the main documentation
-        content_elements = []
-        
-        # Check for common documentation containers
-        for selector in [
-            'main', 'article', 
-            'div.content', 'div.documentation', 'div.docs', 
-            'div.markdown-body', 'div.readme', 
-            '#readme', '#documentation', '#content',
-            '.api-documentation', '.api-reference'
-        ]:
-            elements = soup.select(selector)
-            if elements:
-                content_elements.extend(elements)
-        
-        # If we found specific content containers, use them
-        if content_elements:
-            combined_text = "\n".join([elem.get_text(separator='\n') for elem in content_elements])
-            return {
-                "url": url,
-                "content": combined_text,
-                "html": "".join([str(elem) for elem in content_elements])
+            # Get a random user agent
+            headers = {
+                'User-Agent': random.choice(USER_AGENTS),
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.5',
+                'Connection': 'keep-alive',
+                'Upgrade-Insecure-Requests': '1',
             }
-        
-        # Fallback to sections with code examples
-        code_blocks = soup.find_all(['pre', 'code'])
-        if code_blocks:
-            code_sections = []
-            for block in code_blocks:
-                # Get the parent container to capture context around the code
-                parent = block.parent
-                if parent and parent.name != 'body':
-                    section_text = parent.get_text(separator='\n')
-                    if 'python' in section_text.lower() or 'import' in section_text.lower():
-                        code_sections.append(section_text)
             
-            if code_sections:
-                return {
-                    "url": url,
-                    "content": "\n\n".join(code_sections),
-                    "html": "".join([str(block) for block in code_blocks])
-                }
-        
-        # Second fallback to body if can't find main content area
-        body = soup.body
-        if body:
-            return {
-                "url": url,
-                "content": body.get_text(separator='\n'),
-                "html": str(body)
-            }
-        
-        logger.warning(f"Could not extract content from {url}: No body found")
-        return None
+            # Revalidate an expired cache entry instead of downloading it again
+            if cached:
+                if cached["etag"]:
+                    headers['If-None-Match'] = cached["etag"]
+                if cached["last_modified"]:
+                    headers['If-Modified-Since'] = cached["last_modified"]
             
-    except requests.exceptions.Timeout:
-        logger.warning(f"Timeout for {url}, retrying...")
-        return scrape_single_url(url, retry_count + 1)
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error for {url}: {e}")
-        # Only retry on connection errors, not on 4xx/5xx status codes
-        if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError)):
+            # Increasing timeout on each attempt, bounded by the deadline
+            timeout = BASE_TIMEOUT * (attempt + 1)
+            if deadline is not None:
+                timeout = max(1, min(timeout, deadline - time.monotonic()))
+            logger.info(f"Scraping {url} (attempt {attempt+1}/{MAX_RETRIES}, timeout: {timeout:.0f}s)")
+            
+            with requests.get(url, headers=headers, timeout=timeout, stream=True) as response:
+                if cached and response.status_code == 304:
+                    logger.info(f"Documentation not modified: {url}")
+                    doc_cache.touch_page(url)
+                    return {"url": url, "content": cached["content"], "html": cached["html"]}
+                response.raise_for_status()
+                
+                # Parse while downloading, up to MAX_PAGE_BYTES
+                result = extract_page_content(
+                    url, _read_capped(response, url), encoding=_declared_charset(response),
+                    include_html=include_html, content_type=response.headers.get('Content-Type'),
+                )
+            if result and doc_cache is not None:
+                doc_cache.put_page(
+                    url, result["content"], result["html"],
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'),
+                )
+            return result
+                
+        except requests.exceptions.Timeout:
+            logger.warning(f"Timeout for {url}, retrying...")
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            # Only retry on connection errors, not on 4xx/5xx status codes
+            logger.error(f"Request error for {url}: {e}")
             logger.info(f"Connection error, retrying...")
-            return scrape_single_url(url, retry_count + 1)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request error for {url}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error scraping {url}: {e}")
+            return None
+    
+    logger.error(f"Giving up on {url}")
+    return None
+
+def _declared_charset(response):
+    """Charset from the Content-Type header, or None to let the parser detect it."""
+    match = re.search(r"charset=([\w.:-]+)", response.headers.get('Content-Type', ''), re.IGNORECASE)
+    return match.group(1) if match else None
+
+def _read_capped(response, url):
+    """Yield the response body in chunks, stopping after MAX_PAGE_BYTES."""
+    received = 0
+    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+        received += len(chunk)
+        if received > MAX_PAGE_BYTES:
+            logger.warning(f"Truncating {url} at {MAX_PAGE_BYTES} bytes")
+            yield chunk[:len(chunk) - (received - MAX_PAGE_BYTES)]
+            return
+        yield chunk
+
+def _content_kind(content_type):
+    """Map a Content-Type header to "html", "text" or "pdf"; None for anything else."""
+    mime = (content_type or "").split(";")[0].strip().lower()
+    if not mime or mime in HTML_CONTENT_TYPES:
+        return "html"
+    if mime in TEXT_CONTENT_TYPES:
+        return "text"
+    if mime == "application/pdf":
+        return "pdf"
+    return None
+
+def extract_page_content(url, source, encoding=None, include_html=False, content_type=None):
+    """Extract the documentation part of a page as {"url", "content", "html"}, or None.
+    
+    Args:
+        url (str): Address of the page
+        source (str | bytes | iterable of bytes): Page markup, possibly still downloading
+        encoding (str, optional): Declared charset of byte input
+        include_html (bool): Also return the raw page as "html"
+        content_type (str, optional): Content-Type of the response; HTML is assumed when missing
+    """
+    kind = _content_kind(content_type)
+    if kind is None:
+        logger.info(f"Skipping {url}: unsupported content type {content_type}")
         return None
-    except Exception as e:
-        logger.error(f"Error scraping {url}: {e}")
+    
+    if isinstance(source, str):
+        source, encoding = [source.encode('utf-8')], 'utf-8'
+    elif isinstance(source, bytes):
+        source = [source]
+    
+    if kind == "pdf":
+        result = extract_pdf_content(b"".join(source), max_chars=MAX_CONTENT_CHARS)
+        if result is None:
+            logger.info(f"Skipping {url}: PDF text extraction needs the optional pypdf package")
+            return None
+    elif kind == "text":
+        result = extract_text_content(source, encoding=encoding, max_chars=MAX_CONTENT_CHARS)
+    elif etree is None:
+        raw = b"".join(source)
+        return _extract_with_soup(url, raw.decode(encoding or 'utf-8', errors='replace'), include_html)
+    else:
+        result = extract_main_content(
+            source, encoding=encoding, include_html=include_html, max_chars=MAX_CONTENT_CHARS
+        )
+    
+    if not result["content"]:
+        logger.warning(f"Could not extract content from {url}: No body found")
         return None
+    return {"url": url, **result}
 
+def _extract_with_soup(url, html_text, include_html=True):
+    """BeautifulSoup extractor, used when lxml is not installed."""
+    # Use lxml parser if available, otherwise fall back to built-in parser
+    try:
+        soup = BeautifulSoup(html_text, 'lxml')
+    except:
+        # Fall back to the built-in parser
+        soup = BeautifulSoup(html_text, 'html.parser')
+    
+    # Extract main content (this will vary based on site structure)
+    # Try multiple selectors that might contain the main documentation
+    content_elements = []
+    
+    # Check for common documentation containers
+    for selector in [
+        'main', 'article', 
+        'div.content', 'div.documentation', 'div.docs', 
+        'div.markdown-body', 'div.readme', 
+        '#readme', '#documentation', '#content',
+        '.api-documentation', '.api-reference'
+    ]:
+        elements = soup.select(selector)
+        if elements:
+            content_elements.extend(elements)
+    
+    # If we found specific content containers, use them
+    if content_elements:
+        combined_text = "\n".join([elem.get_text(separator='\n') for elem in content_elements])
+        return {
+            "url": url,
+            "content": combined_text,
+            "html": "".join([str(elem) for elem in content_elements]) if include_html else ""
+        }
+    
+    # Fallback to sections with code examples
+    code_blocks = soup.find_all(['pre', 'code'])
+    if code_blocks:
+        code_sections = []
+        for block in code_blocks:
+            # Get the parent container to capture context around the code
+            parent = block.parent
+            if parent and parent.name != 'body':
+                section_text = parent.get_text(separator='\n')
+                if 'python' in section_text.lower() or 'import' in section_text.lower():
+                    code_sections.append(section_text)
+        
+        if code_sections:
+            return {
+                "url": url,
+                "content": "\n\n".join(code_sections),
+                "html": "".join([str(block) for block in code_blocks]) if include_html else ""
+            }
+    
+    # Second fallback to body if can't find main content area
+    body = soup.body
+    if body:
+        return {
+            "url": url,
+            "content": body.get_text(separator='\n'),
+            "html": str(body) if include_html else ""
+        }
+    
+    logger.warning(f"Could not extract content from {url}: No body found")
+    return None
+
+@replay.timed("process_documentation_with_llm")
 def process_documentation_with_llm(api_name, documentation_content, user_query):
     """Use LLM to understand documentation and generate functional code snippet only.
     
@@ -297,7 +467,7 @@ def process_documentation_with_llm(api_name, documentation_content, user_query):
     - USE placeholder values like "YOUR_API_KEY" for credentials
     
     Documentation excerpt:
-    {documentation_content[:10000]}
+    {documentation_content}
 
     You can ONLY output python code block scraped from documentation or generated from the knowledge of user query and documentation. DO NOT output any other response.
     """
@@ -310,9 +480,8 @@ def process_documentation_with_llm(api_name, documentation_content, user_query):
             "prompt": prompt,
             "stream": False
         })
-        headers = {'Content-Type': 'application/json'}
         logger.info("Sending request to LLM API...")
-        response = requests.post(url, data=payload, headers=headers, timeout=180)  # Extended timeout for LLM
+        response = transport.post(url, data=payload, timeout=180)  # Extended timeout for LLM
         
         if response.status_code != 200:
             logger.error(f"LLM API returned status code {response.status_code}: {response.text}")
@@ -354,12 +523,11 @@ def extract_clean_python_code(content):
         str: Clean Python code only
     """
     # First try to extract code from markdown code blocks
-    code_block_pattern = r"```(?:python)?(.*?)```"
-    code_blocks = re.findall(code_block_pattern, content, re.DOTALL)
+    code_blocks = codeblocks.find_blocks(content, codeblocks.PYTHON_TAGS | {""})
     
     if code_blocks:
         # Join all code blocks and strip leading/trailing whitespace
-        return "\n\n".join(block.strip() for block in code_blocks)
+        return "\n\n".join(block.code.strip() for block in code_blocks)
     
     # If no code blocks found, try to identify Python code without markdown
     # This is trickier but we can look for common Python patterns
@@ -409,16 +577,32 @@ def extract_clean_python_code(content):
     # No code found, return None
     return None
 
+@replay.timed("identify_api_provider")
 def identify_api_provider(user_query):
     """
     Analyzes a user query and identifies the most suitable API service provider.
     
+    Known providers and categories are recognized locally; the LLM is only
+    asked when the query matches neither.
+    
     Args:
         user_query (str): The user's natural language query
         
     Returns:
         str: Name of the most appropriate API service provider
     """
+    provider_name = provider_classifier.classify(user_query)
+    if provider_name:
+        logger.info(f"Identified API provider without LLM: {provider_name}")
+        return provider_name
+    
+    provider_name = _identify_api_provider_with_llm(user_query)
+    if provider_name != "generic_api":
+        provider_classifier.remember(user_query, provider_name)
+    return provider_name
+
+def _identify_api_provider_with_llm(user_query):
+    """Ask the LLM for the API service provider best suited to the query."""
     url = "http://10.10.10.104:11434/api/generate"
     
     # First check if the user explicitly mentioned a service provider
@@ -452,9 +636,8 @@ def identify_api_provider(user_query):
             "prompt": prompt,
             "stream": False
         })
-        headers = {'Content-Type': 'application/json'}
         logger.info("Sending request to identify API provider...")
-        response = requests.post(url, data=payload, headers=headers, timeout=30)
+        response = transport.post(url, data=payload, timeout=30)
         
         if response.status_code != 200:
             logger.error(f"LLM API returned status code {response.status_code}: {response.text}")
@@ -507,43 +690,79 @@ def identify_api_provider(user_query):
         return "generic_api"
         
 class APICodeAgent:
-    def generate_api_code(self, query):
-        """Generate functional Python code for the specified API."""
+    def generate_api_code(self, query, tool_name=None):
+        """Generate functional Python code for the specified API.
+        
+        When `tool_name` names a provider (e.g. `OpenWeatherMap_API_Tool`),
+        its documentation is looked up and scraped while the provider is
+        still being identified, and that work is discarded if the identified
+        provider turns out to be a different one.
+        """
+        speculation = self._speculate(tool_name) if SPECULATIVE_DISCOVERY and tool_name else None
         api_name = identify_api_provider(query)
-        # Step 1: Find documentation
-        logger.info(f"Searching for {api_name} API documentation...")
-        urls = find_api_documentation(api_name)
+        
+        doc_content = None
+        if speculation is not None:
+            guess, cancel, future, executor = speculation
+            if provider_classifier.canonical(api_name) == guess:
+                logger.info(f"Using documentation gathered speculatively for {guess}")
+                urls, doc_content = future.result()
+                replay.stats.add("speculative discovery hit", 0)
+            else:
+                logger.info(f"Provider {api_name} differs from {guess}, cancelling speculative discovery")
+                cancel.set()
+                replay.stats.add("speculative discovery miss", 0)
+            executor.shutdown(wait=False)
+        
+        if doc_content is None:
+            # Step 1: Find documentation
+            logger.info(f"Searching for {api_name} API documentation...")
+            urls = find_api_documentation(api_name)
+            
+            # Step 2: Scrape content
+            if urls:
+                logger.info(f"Scraping documentation from {len(urls)} sources...")
+                doc_content = scrape_documentation(urls)
         
         if not urls:
             return "No API documentation found. Please check the API name."
         
-        # Step 2: Scrape content
-        logger.info(f"Scraping documentation from {len(urls)} sources...")
-        doc_content = scrape_documentation(urls)
-        
         if not doc_content:
             return "Failed to extract usable content from documentation sources."
         
         # Step 3: Process with LLM
         logger.info("Analyzing documentation and generating code...")
-        combined_content = "\n\n".join([f"Source: {item['url']}\n{item['content']}" for item in doc_content])
+        # Keep only the sections most relevant to the query, within the prompt's token budget
+        combined_content = build_documentation_context(doc_content, query, api_name)
         code = process_documentation_with_llm(api_name, combined_content, query)
         return code
     
+    def _speculate(self, tool_name):
+        """Start discovery and scraping for the provider named by `tool_name`, if it names one."""
+        guess = provider_from_name(tool_name)
+        if not guess:
+            return None
+        guess = provider_classifier.canonical(guess)
+        cancel = threading.Event()
+        
+        def gather():
+            logger.info(f"Speculatively searching for {guess} API documentation...")
+            urls = find_api_documentation(guess, cancel)
+            return urls, scrape_documentation(urls, cancel=cancel) if urls else []
+        
+        executor = ThreadPoolExecutor(max_workers=1)
+        return guess, cancel, executor.submit(gather), executor
+    
     def extract_code(self, response):
         """Extract code blocks from LLM response."""
-        try:
-            if "```python" in response:
-                code = response.split("```python")[1].split("```")[0]
-                return code.strip()
-            elif "```" in response:
-                code = response.split("```")[1].split("```")[0]
-                return code.strip() if code.strip() else response
-            else:
-                return response
-        except Exception as e:
-            logger.error(f"Error extracting code: {e}")
-            return response
+        code = codeblocks.extract_python(response)
+        if code.strip():
+            return code.strip()
+        # Fall back to the first non-empty block of any language
+        for block in codeblocks.find_blocks(response):
+            if block.code.strip():
+                return block.code.strip()
+        return response
 
 # # Example usage
 # if __name__ == "__main__":
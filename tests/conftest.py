@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules under test import each other as top-level packages (utils, scraper)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,102 @@
+import io
+
+import pytest
+
+from utils import approval
+
+POLICY = approval.AstPolicy(approval.DEFAULT_ALLOWED_MODULES.split(",") + ["numpy", "pandas"])
+
+REJECTED = {
+    "aliased open": 'w = open\nw("/tmp/x", "w")',
+    "partial open": 'import functools\nfunctools.partial(open, "/tmp/x", "w")()',
+    "mapped open": 'list(map(open, ["/tmp/x"], ["w"]))',
+    "open with a variable mode": 'mode = "w"\nopen("/tmp/x", mode)',
+    "open with unpacked arguments": 'args = ("/tmp/x", "w")\nopen(*args)',
+    "open for writing": 'open("/tmp/x", "a")',
+    "type hints of a string annotation": (
+        "import typing\n"
+        "def f(x: \"__import__('os').system('id')\"):\n"
+        "    pass\n"
+        "typing.get_type_hints(f)"
+    ),
+    "imported get_type_hints": "from typing import get_type_hints",
+    "forward reference": "import typing\ntyping.ForwardRef('1')._evaluate(None, None, frozenset())",
+    "singledispatch on a string annotation": (
+        "import functools\n"
+        "@functools.singledispatch\n"
+        "def f(x):\n"
+        "    pass\n"
+        "@f.register\n"
+        "def _(x: \"__import__('os').system('id')\"):\n"
+        "    pass"
+    ),
+    "string return annotation": "def f() -> 'int':\n    return 1",
+    "star import": "from typing import *",
+    "pandas reader": "import pandas as pd\npd.read_csv('http://example.com/x.csv')",
+    "numpy data source": "import numpy as np\nnp.lib.npyio.DataSource().open('http://example.com')",
+    "pandas writer": "import pandas as pd\npd.DataFrame().to_html('out.html')",
+    "subclass walk": "().__class__.__base__.__subclasses__()",
+    "builtins": "b = __builtins__",
+    "getattr": "getattr(1, 'real')",
+    "attrgetter": "from operator import attrgetter",
+    "disallowed import": "import os",
+}
+
+ACCEPTED = {
+    "read-only open": 'with open("data.txt") as f:\n    print(f.read())\nopen("data.bin", mode="rb").close()',
+    "ordinary code": (
+        "import re, json, typing, functools\n"
+        "class Error(Exception):\n"
+        "    def __init__(self, message: str) -> None:\n"
+        "        super().__init__(message)\n"
+        "@functools.lru_cache\n"
+        "def words(text: str) -> typing.List[str]:\n"
+        "    return re.findall(r'\\w+', text.replace('-', ' '))\n"
+        "if __name__ == '__main__':\n"
+        "    print(json.dumps(words('a-b c')))"
+    ),
+    "text writers without a destination": (
+        "import pandas as pd\n"
+        "df = pd.DataFrame({'a': [1]})\n"
+        "print(df.to_string(), df.to_csv(index=False), df.to_dict(), pd.to_datetime('2020-01-01'))"
+    ),
+}
+
+
+@pytest.mark.parametrize("code", REJECTED.values(), ids=REJECTED.keys())
+def test_ast_policy_rejects(code):
+    assert POLICY.violations(code)
+
+
+@pytest.mark.parametrize("code", ACCEPTED.values(), ids=ACCEPTED.keys())
+def test_ast_policy_accepts(code):
+    assert POLICY.violations(code) == []
+
+
+class Registry:
+    def __init__(self, entry):
+        self.entry = entry
+
+    def find(self, name, description):
+        return self.entry
+
+
+TOOL = {"name": "Tool", "description": "does things", "function": "print(1)"}
+
+
+@pytest.mark.parametrize("flag, expected", [({}, None), ({"approved": False}, None), ({"approved": True}, True)])
+def test_registry_policy_needs_an_explicit_approval(flag, expected):
+    decision = approval.RegistryPolicy(Registry({**TOOL, **flag})).decide([TOOL], None)
+    assert (decision and decision["human_approved"]) == expected
+
+
+@pytest.mark.parametrize("answers, approved", [("yes\n", True), ("no\n", False), ("y\nlooks good\n", True)])
+def test_interactive_feedback_is_optional(monkeypatch, answers, approved):
+    monkeypatch.setattr("sys.stdin", io.StringIO(answers))
+    decision = approval.InteractivePolicy().decide([TOOL], None)
+    assert decision["human_approved"] is approved
+
+
+def test_interactive_policy_rejects_without_a_terminal(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO(""))
+    assert approval.InteractivePolicy().decide([TOOL], None)["human_approved"] is False
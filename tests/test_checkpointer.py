@@ -0,0 +1,98 @@
+import asyncio
+import operator
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.graph import StateGraph, START, END
+
+from utils import checkpointer
+
+
+class State(TypedDict):
+    messages: Annotated[list, operator.add]
+
+
+def agent(state):
+    return {"messages": ["agent"]}
+
+
+def build_graph(saver):
+    builder = StateGraph(State)
+    builder.add_node("agent", agent)
+    builder.add_node("human_approval", lambda state: {"messages": ["approved"]})
+    builder.add_node("left", lambda state: {"messages": ["left"]})
+    builder.add_node("right", lambda state: {"messages": ["right"]})
+    builder.add_edge(START, "agent")
+    builder.add_edge("agent", "human_approval")
+    # Fan out after the interrupt, so parallel writes of one superstep hit the database
+    builder.add_edge("human_approval", "left")
+    builder.add_edge("human_approval", "right")
+    builder.add_edge("left", END)
+    builder.add_edge("right", END)
+    return builder.compile(checkpointer=saver, interrupt_before=["human_approval"])
+
+
+@pytest.fixture
+def default_saver(monkeypatch, tmp_path):
+    monkeypatch.delenv("CHECKPOINTER", raising=False)
+    monkeypatch.setenv("CHECKPOINT_DB", str(tmp_path / "checkpoints.sqlite"))
+    return checkpointer.get_checkpointer()
+
+
+def test_default_checkpointer_supports_astream(default_saver):
+    assert isinstance(default_saver, checkpointer.DurableSqliteSaver)
+    graph = build_graph(default_saver)
+    config = {"configurable": {"thread_id": "async"}}
+
+    async def run():
+        async for _ in graph.astream({"messages": ["question"]}, config, stream_mode="values"):
+            pass
+        paused = await graph.aget_state(config)
+        async for _ in graph.astream(None, config, stream_mode="values"):
+            pass
+        history = [snapshot async for snapshot in graph.aget_state_history(config)]
+        finished = await graph.aget_state(config)
+        await default_saver.adelete_thread("async")
+        return paused, history, finished, await graph.aget_state(config)
+
+    paused, history, finished, deleted = asyncio.run(run())
+    assert paused.next == ("human_approval",)
+    assert sorted(finished.values["messages"]) == sorted(["question", "agent", "approved", "left", "right"])
+    assert not finished.next
+    assert len(history) > 3
+    assert not deleted.values
+
+
+def test_default_checkpointer_supports_ainvoke_across_threads(default_saver):
+    graph = build_graph(default_saver)
+
+    async def run(thread_id):
+        config = {"configurable": {"thread_id": thread_id}}
+        await graph.ainvoke({"messages": [thread_id]}, config)
+        return await graph.ainvoke(None, config)
+
+    async def run_all():
+        return await asyncio.gather(*(run(f"thread_{i}") for i in range(8)))
+
+    for i, result in enumerate(asyncio.run(run_all())):
+        assert result["messages"][0] == f"thread_{i}"
+        assert len(result["messages"]) == 5
+
+
+def test_paused_threads_survive_a_new_saver(default_saver, tmp_path):
+    graph = build_graph(default_saver)
+    config = {"configurable": {"thread_id": "durable"}}
+    graph.invoke({"messages": ["question"]}, config)
+
+    reopened = build_graph(checkpointer.DurableSqliteSaver(str(tmp_path / "checkpoints.sqlite")))
+    assert checkpointer.resume_or_start(reopened, config, {"messages": ["question"]}) is None
+    assert reopened.invoke(None, config)["messages"][-1] in ("left", "right")
+
+
+def test_resume_or_start_restarts_threads_of_another_question(default_saver):
+    graph = build_graph(default_saver)
+    config = {"configurable": {"thread_id": "shared"}}
+    graph.invoke({"messages": ["first question"]}, config)
+    inputs = {"messages": ["second question"]}
+    assert checkpointer.resume_or_start(graph, config, inputs) is inputs
+    assert not graph.get_state(config).values
@@ -0,0 +1,29 @@
+import time
+
+from utils import codeblocks
+
+
+def test_extract_python_validates_a_single_tagged_block():
+    # Only the tagged block is Python, so it is returned even though it does not parse
+    assert codeblocks.extract_python("```python\nx = (\n```") == "x = ("
+    assert codeblocks.extract_python("```python\nx = (\n```\n```\ny = 1\n```") == "y = 1"
+
+
+def test_extract_python_prefers_closed_blocks():
+    text = "```python\nx = 1\n```\nand then\n```python\ndef f():\n    return 2"
+    assert codeblocks.extract_python(text) == "x = 1"
+    assert codeblocks.extract_python("```python\ndef f():\n    return 2") == "def f():\n    return 2"
+
+
+def test_loads_json_accepts_what_models_write():
+    assert codeblocks.loads_json('[1, 2,]') == [1, 2]
+    assert codeblocks.loads_json("{'a': True, 'b': None}") == {"a": True, "b": None}
+    assert codeblocks.loads_json('Here it is: {"a": [1, 2]} hope it helps') == {"a": [1, 2]}
+    assert codeblocks.loads_json("no json here") is None
+
+
+def test_loads_json_fallback_is_bounded():
+    text = "Answer: " + "[1, {" * 20000 + " oops"
+    start = time.perf_counter()
+    assert codeblocks.loads_json(text) is None
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,29 @@
+import json
+import time
+
+from scraper.discovery import DiscoveryEngine, NOT_FOUND
+
+
+def test_only_definitive_misses_are_remembered(tmp_path):
+    def probe(url, deadline):
+        if url == "https://docs.acme.com":
+            return url
+        if "readthedocs" in url:
+            # Still running when the budget is spent
+            time.sleep(3)
+            return None
+        if "pypi.org" in url:
+            # Timed out or failed without a definitive answer
+            return None
+        return NOT_FOUND
+
+    state_path = tmp_path / "discovery.json"
+    engine = DiscoveryEngine(probe, lambda url, api: 0, state_path=str(state_path),
+                             seeds_path=str(tmp_path / "missing.json"), budget=1, target=3)
+    assert engine.discover("acme") == ["https://docs.acme.com"]
+
+    state = json.loads(state_path.read_text())
+    assert state["providers"]["acme"]["templates"] == ["https://docs.{api}.com"]
+    assert "https://www.acme.com/docs" in state["negative"]
+    assert not [url for url in state["negative"] if "pypi.org" in url or "readthedocs" in url]
+    assert "https://pypi.org/project/{api}" not in state["patterns"]
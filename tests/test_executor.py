@@ -0,0 +1,65 @@
+import pytest
+
+from utils import executor
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(executor, "PRELOAD_MODULES", [])
+    pool = executor.ToolWorkerPool(size=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_captures_output_of_child_processes(pool):
+    source = "import os, sys\nprint('python')\nsys.stdout.flush()\nos.system('echo shell; echo err >&2')\n"
+    result = pool.run(source, "tool.py", timeout=30)
+    assert result.returncode == 0
+    assert result.stdout == "python\nshell\n"
+    assert result.stderr == "err\n"
+
+
+def test_environment_is_scrubbed_and_restored(pool, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "secret")
+    source = "import os\nprint(os.environ.get('OPENAI_API_KEY'), os.environ.get('LEAK'))\nos.environ['LEAK'] = '1'\n"
+    assert pool.run(source, "tool.py", timeout=30).stdout == "None None\n"
+    assert pool.run(source, "tool.py", timeout=30).stdout == "None None\n"
+
+
+def test_passthrough_variables_reach_tools(pool, monkeypatch):
+    monkeypatch.setenv("WEATHER_API_KEY", "key")
+    monkeypatch.setattr(executor, "ENV_PASSTHROUGH", executor.ENV_PASSTHROUGH | {"WEATHER_API_KEY"})
+    assert pool.run("import os\nprint(os.environ['WEATHER_API_KEY'])", "tool.py", timeout=30).stdout == "key\n"
+
+
+def test_tools_have_no_stdin(pool):
+    result = pool.run("input('name? ')", "tool.py", timeout=30)
+    assert result.returncode == 1
+    assert "EOFError" in result.stderr
+
+
+def test_cpu_limit_ends_a_runaway_tool(pool, monkeypatch):
+    monkeypatch.setattr(executor, "MAX_CPU_SECONDS", 1)
+    result = pool.run("while True:\n    pass\n", "tool.py", timeout=30)
+    assert result.returncode != 0
+    # The next run gets a fresh worker
+    assert pool.run("print('ok')", "tool.py", timeout=30).stdout == "ok\n"
+
+
+def test_memory_limit_fails_the_allocation(pool, monkeypatch):
+    monkeypatch.setattr(executor, "MAX_MEMORY_MB", 512)
+    result = pool.run("data = bytearray(1024 * 1024 * 1024)", "tool.py", timeout=30)
+    assert result.returncode == 1
+    assert "MemoryError" in result.stderr
+
+
+def test_subprocess_mode_applies_the_same_limits(monkeypatch, tmp_path):
+    monkeypatch.setattr(executor, "EXECUTION_MODE", "subprocess")
+    monkeypatch.setattr(executor, "MAX_MEMORY_MB", 512)
+    monkeypatch.setenv("OPENAI_API_KEY", "secret")
+    filename = str(tmp_path / "tool.py")
+    source = "import os\nprint(os.environ.get('OPENAI_API_KEY'))\ndata = bytearray(1024 * 1024 * 1024)\n"
+    result = executor.run_tool_source(source, filename, timeout=30)
+    assert result.stdout == "None\n"
+    assert "MemoryError" in result.stderr
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from utils.dataset import DatasetReader
+
+inference = pytest.importorskip("inference")
+
+
+def test_legacy_checkpoint_results_are_matched_by_question(tmp_path):
+    dataset_path = tmp_path / "data.jsonl"
+    dataset_path.write_text("".join(
+        json.dumps({"question": question, "answer": "x"}) + "\n" for question in ["a", "b", "a", "c", "d"]
+    ))
+    # Question "b" failed in the old run, so its results list skips it
+    legacy = {"current_index": 3, "results": [{"question": "a"}, {"question": "a"}, {"question": "c"}]}
+    (tmp_path / "checkpoint.json").write_text(json.dumps(legacy))
+
+    with DatasetReader(str(dataset_path)) as dataset:
+        log = inference.open_result_log(str(tmp_path / "checkpoint.jsonl"), dataset)
+        assert log.completed == {0, 2, 3}
+        log.close()
+
+
+def test_thread_ids_are_namespaced_by_dataset(tmp_path):
+    first = inference.dataset_thread_prefix(str(tmp_path / "one.jsonl"))
+    second = inference.dataset_thread_prefix(str(tmp_path / "two.jsonl"))
+    assert first != second
+    assert first == inference.dataset_thread_prefix(str(tmp_path / "one.jsonl"))
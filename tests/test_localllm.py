@@ -0,0 +1,107 @@
+import json
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from utils import localllm
+
+RESPONSES = [
+    "plain answer",
+    "  padded answer \n",
+    "<think>reasoning</think>\n\nanswer",
+    "reasoning without an opening tag</think> answer",
+    "<think>a</think>x</think>y",
+    "x</think>y</think>  z  ",
+    "<think>never closed",
+    "text mentioning <think> in passing",
+    "",
+]
+
+
+class FakeResponse:
+    status_code = 200
+    text = ""
+
+    def __init__(self, text, chunk_size):
+        self._text = text
+        self._chunk_size = chunk_size
+
+    def json(self):
+        return {"response": self._text}
+
+    def _lines(self):
+        pieces = [self._text[i:i + self._chunk_size] for i in range(0, len(self._text), self._chunk_size)]
+        for piece in pieces:
+            yield json.dumps({"response": piece, "done": False})
+        yield json.dumps({"response": "", "done": True})
+
+    def iter_lines(self):
+        return self._lines()
+
+    async def aiter_lines(self):
+        for line in self._lines():
+            yield line
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Make the transport answer every request with `text`, streamed `chunk_size` characters at a time."""
+    def install(text, chunk_size):
+        monkeypatch.setattr(localllm.transport, "post", lambda *args, **kwargs: FakeResponse(text, chunk_size))
+
+        @asynccontextmanager
+        async def astream_post(*args, **kwargs):
+            yield FakeResponse(text, chunk_size)
+
+        async def apost(*args, **kwargs):
+            return FakeResponse(text, chunk_size)
+
+        monkeypatch.setattr(localllm.transport, "astream_post", astream_post)
+        monkeypatch.setattr(localllm.transport, "apost", apost)
+    return install
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+@pytest.mark.parametrize("text", RESPONSES)
+def test_stream_matches_invoke(serve, text, chunk_size):
+    serve(text, chunk_size)
+    llm = localllm.LocalChatModel(model_name="test")
+    messages = [HumanMessage(content="question")]
+    expected = llm.invoke(messages).content
+    assert expected == localllm.LocalChatModel._strip_think(text)
+    assert "".join(chunk.content for chunk in llm.stream(messages)) == expected
+
+
+@pytest.mark.parametrize("text", RESPONSES)
+def test_astream_matches_ainvoke(serve, text):
+    serve(text, 2)
+    llm = localllm.LocalChatModel(model_name="test")
+    messages = [HumanMessage(content="question")]
+
+    async def run():
+        expected = (await llm.ainvoke(messages)).content
+        streamed = "".join([chunk.content async for chunk in llm.astream(messages)])
+        return expected, streamed
+
+    expected, streamed = asyncio.run(run())
+    assert streamed == expected
+
+
+def test_stream_caches_what_invoke_would(serve, tmp_path):
+    from utils.llm_cache import LLMCache
+    serve("<think>a</think>x</think> y ", 1)
+    messages = [HumanMessage(content="question")]
+    streaming = localllm.LocalChatModel(model_name="test", cache=LLMCache(str(tmp_path / "stream.sqlite")))
+    invoking = localllm.LocalChatModel(model_name="test", cache=LLMCache(str(tmp_path / "invoke.sqlite")))
+    list(streaming.stream(messages))
+    invoking.invoke(messages)
+    key = streaming._cache_key(streaming._format_messages(messages))
+    assert streaming.cache.get(key) == invoking.cache.get(key) == "y"
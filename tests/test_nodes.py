@@ -0,0 +1,48 @@
+import time
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from utils import nodes
+
+
+def test_atask_solver_prepares_tools_off_the_event_loop(monkeypatch):
+    def slow_prepare(tool):
+        # Stands in for a pip install of the tool's requirements
+        time.sleep(0.5)
+        return tool["function"]
+
+    class BoundLLM:
+        async def ainvoke(self, messages):
+            return HumanMessage(content="done")
+
+    class ChatModel:
+        def bind_tools(self, tools):
+            return BoundLLM()
+
+    monkeypatch.setattr(nodes.dependencies, "prepare_tool_code", slow_prepare)
+    monkeypatch.setattr(nodes, "LocalChatModel", ChatModel)
+    state = {
+        "messages": [HumanMessage(content="question")],
+        "required_tools": [{"name": "Tool", "description": "", "is_available": True, "function": "print(1)"}],
+        "max_turns": 3,
+    }
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        result = await nodes.atask_solver(state)
+        task.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(run())
+    assert result["messages"][-1].content == "done"
+    # A blocked loop would not have ticked at all during the half-second setup
+    assert ticks >= 5
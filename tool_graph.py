@@ -1,28 +1,30 @@
 from typing import Annotated, TypedDict
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph.message import add_messages
+from langchain_core.runnables import RunnableLambda
 import utils.nodes as nodes
 import utils.schema as schema
 import utils.router as router
+import utils.approval as approval
+import utils.checkpointer as checkpointer
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
-# Create memory saver for checkpointing
-memory = MemorySaver()
+# Durable checkpointing in its own database, since both graphs use the same example thread IDs
+memory = checkpointer.get_checkpointer(os.getenv("TOOL_GRAPH_CHECKPOINT_DB", "data/tool_graph_checkpoints.sqlite"))
 
 # Create the graph builder
 graph_builder = StateGraph(schema.State)
 
-# Define nodes
-graph_builder.add_node('task_analyzer', nodes.task_analyzer_agent)
-graph_builder.add_node('tool_master', nodes.tool_master_agent)
-graph_builder.add_node('tool_selector', nodes.tool_selector_agent)
-graph_builder.add_node('tool_generator', nodes.tool_generator_agent)
+# Define nodes (LLM nodes carry an async variant that is used by graph.astream/ainvoke)
+graph_builder.add_node('task_analyzer', RunnableLambda(nodes.task_analyzer_agent, afunc=nodes.atask_analyzer_agent))
+graph_builder.add_node('tool_master', RunnableLambda(nodes.tool_master_agent, afunc=nodes.atool_master_agent))
+graph_builder.add_node('tool_selector', RunnableLambda(nodes.tool_selector_agent, afunc=nodes.atool_selector_agent))
+graph_builder.add_node('tool_generator', RunnableLambda(nodes.tool_generator_agent, afunc=nodes.atool_generator_agent))
 graph_builder.add_node('human_approval', nodes.human_approval_agent)
-graph_builder.add_node('task_solver', nodes.task_solver)
+graph_builder.add_node('task_solver', RunnableLambda(nodes.task_solver, afunc=nodes.atask_solver))
 
 # Define edges
 graph_builder.add_edge(START, "task_analyzer")
@@ -47,6 +49,9 @@ graph = graph_builder.compile(
     interrupt_before=["human_approval"]
 )
 
+# Drop finished threads idle for longer than CHECKPOINT_TTL
+checkpointer.prune_finished(graph)
+
 # Example usage (when running this file directly)
 if __name__ == "__main__":
     # Create a unique thread ID
@@ -58,43 +63,24 @@ if __name__ == "__main__":
     
     # Start the graph execution
     print("Starting graph execution with query:", user_query)
-    stream = graph.stream({"messages": [user_query], "max_turns": 3}, config, stream_mode="values")
+    inputs = checkpointer.resume_or_start(graph, config, {"messages": [user_query], "max_turns": 3})
     
-    # Process the stream
-    for output in stream:
-        # If output is None, the graph was interrupted for human input
-        if output is None:
-            print("\n=== HUMAN APPROVAL REQUIRED ===")
-            print("A tool has been generated and requires your approval.")
-            
-            while True:
-                choice = input("Do you approve this tool? (yes/no): ").strip().lower()
-                if choice in ["yes", "y"]:
-                    feedback = input("Optional feedback for the system: ")
-                    human_input = {"human_approved": True, "human_feedback": feedback}
-                    break
-                elif choice in ["no", "n"]:
-                    feedback = input("Please provide feedback on why you rejected the tool: ")
-                    human_input = {"human_approved": False, "human_feedback": feedback}
-                    break
-                else:
-                    print("Invalid input. Please enter 'yes' or 'no'.")
-            
-            # Resume the graph with human input
-            resume_stream = graph.stream(human_input, config, stream_mode="values")
-            for resume_output in resume_stream:
-                if resume_output is not None:
-                    # Print final messages
-                    if 'messages' in resume_output:
-                        print("\n=== FINAL RESULT ===")
-                        for msg in resume_output['messages']:
-                            if hasattr(msg, 'content'):
-                                print(msg.content)
-        else:
-            # Print any other outputs
-            if 'messages' in output:
-                print("\n=== FINAL RESULT ===")
-                for msg in output['messages']:
-                    if hasattr(msg, 'content'):
-                        print(msg.content)
-
+    response = None
+    while True:
+        # Settle a pending tool approval (APPROVAL_POLICY) before continuing a paused thread
+        if inputs is None and approval.resolve(graph, config) is approval.DEFERRED:
+            break
+        for output in graph.stream(inputs, config, stream_mode="values"):
+            response = output
+        
+        # The stream stops before human_approval
+        if "human_approval" not in graph.get_state(config).next:
+            break
+        inputs = None
+    
+    # Print final messages
+    if response and 'messages' in response:
+        print("\n=== FINAL RESULT ===")
+        for msg in response['messages']:
+            if hasattr(msg, 'content'):
+                print(msg.content)
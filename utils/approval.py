@@ -0,0 +1,423 @@
+"""Approval policies for tools waiting at the graph's human_approval interrupt.
+
+APPROVAL_POLICY is a comma-separated chain tried in order; the first policy
+with an opinion decides, and a chain where none has one rejects the tools.
+
+    interactive  ask on the terminal (the default)
+    timeout      ask on the terminal, reject after APPROVAL_TIMEOUT seconds
+    registry     approve tools whose code was already approved in the registry
+    ast          approve code that only imports APPROVAL_ALLOWED_MODULES and
+                 neither does file or network I/O, runs other programs nor
+                 reaches objects through reflection
+    queue        park the request in APPROVAL_QUEUE_DIR for later review and
+                 move on; review with `python -m utils.approval`
+    approve      approve everything
+    reject       reject everything
+
+For unattended runs use e.g. APPROVAL_POLICY=registry,ast,queue.
+"""
+import os
+import ast
+import sys
+import json
+import time
+import hashlib
+import threading
+from dotenv import load_dotenv
+from utils.dependencies import parse_requirements, strip_install_preamble
+
+load_dotenv()
+
+DEFAULT_POLICY = "interactive"
+DEFAULT_QUEUE_DIR = "data/approval_queue"
+# Standard library modules without I/O of their own; numpy, pandas and scipy read URLs and files and
+# sympy evaluates strings, so adding them to APPROVAL_ALLOWED_MODULES is a deliberate choice
+DEFAULT_ALLOWED_MODULES = (
+    "json,re,math,cmath,statistics,datetime,time,calendar,typing,collections,itertools,functools,"
+    "operator,string,textwrap,unicodedata,random,decimal,fractions,dataclasses,enum,copy,pprint,"
+    "heapq,bisect,hashlib,base64,uuid"
+)
+# Builtins that run code, read input or reach objects by name
+FORBIDDEN_NAMES = {
+    "exec", "eval", "compile", "__import__", "breakpoint", "input", "getattr", "setattr", "delattr",
+    "globals", "locals", "vars", "get_type_hints", "ForwardRef", "_evaluate", "_eval_type",
+}
+# Attributes that delete files, run other programs, do I/O or reach objects by name
+FORBIDDEN_ATTRIBUTES = {
+    "system", "popen", "spawnl", "spawnv", "unlink", "rmdir", "removedirs", "mkdir", "makedirs",
+    "rmtree", "write_text", "write_bytes", "touch", "savefig",
+    "tofile", "save", "savez", "savez_compressed", "savetxt", "load", "loadtxt", "genfromtxt",
+    "fromfile", "fromregex", "memmap", "open_memmap", "DataSource", "HDFStore", "ExcelFile",
+    "ExcelWriter", "attrgetter", "methodcaller", "get_type_hints", "ForwardRef", "_evaluate", "_eval_type",
+}
+# read_* and to_* are pandas' readers and writers, except for these conversions
+SAFE_CONVERSIONS = {
+    "to_dict", "to_list", "to_numpy", "to_records", "to_frame", "to_series", "to_datetime", "to_numeric",
+    "to_timedelta", "to_period", "to_timestamp", "to_pydatetime", "to_flat_index", "to_tuples", "to_dense",
+    "to_bytes", "to_eng_string", "to_integral", "to_integral_value",
+}
+# Writers that return the text instead when given no destination
+TEXT_WRITERS = {"to_csv", "to_json", "to_html", "to_latex", "to_markdown", "to_string", "to_xml"}
+DESTINATION_KEYWORDS = {"buf", "path", "path_or_buf", "path_or_buffer"}
+# The only dunders tool code needs: `if __name__ == "__main__"` and calling a base class __init__
+SAFE_DUNDERS = {"__name__", "__file__", "__doc__", "__init__"}
+# Marks a queued request whose decision is still outstanding
+DEFERRED = object()
+
+
+def tools_for_review(state):
+    """The generated tools that the human_approval node shows for review."""
+    return [
+        tool for tool in state.get('required_tools', [])
+        if tool.get('is_available', False) and tool.get('function')
+    ]
+
+
+def _decision(approved, feedback=""):
+    return {"human_approved": approved, "human_feedback": feedback}
+
+
+class InteractivePolicy:
+    """Ask on the terminal; a closed stdin counts as a rejection."""
+
+    prompt_lock = threading.Lock()
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+    def _read(self, prompt):
+        print(prompt, end="", flush=True)
+        if self.timeout is not None:
+            try:
+                import select
+                ready, _, _ = select.select([sys.stdin], [], [], self.timeout)
+            except (ImportError, OSError, ValueError):
+                # No select() on this stdin (e.g. Windows consoles): wait without a limit
+                ready = [sys.stdin]
+            if not ready:
+                print()
+                raise TimeoutError
+        line = sys.stdin.readline()
+        if not line:
+            raise EOFError
+        return line.strip()
+
+    def _feedback(self, prompt):
+        # The decision is already made; a missing answer only means no feedback
+        try:
+            return self._read(prompt)
+        except (TimeoutError, EOFError):
+            return ""
+
+    def decide(self, tools, config):
+        with self.prompt_lock:
+            for tool in tools:
+                print(f"\n--- TOOL: {tool.get('name', 'Unnamed Tool')} ---")
+                print(f"DESCRIPTION: {tool.get('description', 'No description')}")
+                print(tool.get('function', ''))
+            try:
+                while True:
+                    choice = self._read("\nDo you approve this tool? (yes/no): ").lower()
+                    if choice in ["yes", "y"]:
+                        return _decision(True, self._feedback("Optional feedback for the system: "))
+                    elif choice in ["no", "n"]:
+                        return _decision(False, self._feedback("Please provide feedback on why you rejected the tool: "))
+                    else:
+                        print("Invalid input. Please enter 'yes' or 'no'.")
+            except TimeoutError:
+                return _decision(False, f"No approval within {self.timeout:g}s")
+            except EOFError:
+                return _decision(False, "No terminal available for approval")
+
+
+class RegistryPolicy:
+    """Approve when every tool's code was approved before, as recorded in the registry."""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def decide(self, tools, config):
+        for tool in tools:
+            known = self.registry.find(tool.get('name'), tool.get('description'))
+            # Tools without the flag predate approval tracking, when rejected code was stored too
+            if not known or known.get('function') != tool.get('function') or not known.get('approved', False):
+                return None
+        return _decision(True, "Approved: code already approved in the tool registry")
+
+
+class AstPolicy:
+    """Approve code that imports only allowed modules and stays away from I/O, programs and reflection."""
+
+    def __init__(self, allowed_modules):
+        self.allowed_modules = set(allowed_modules)
+
+    def _module_allowed(self, name):
+        return name.split(".")[0] in self.allowed_modules
+
+    def violations(self, code):
+        """Reasons `code` falls outside the allowlist; empty when it is acceptable."""
+        problems = [f"installs {package}" for package in parse_requirements(code) if not self._module_allowed(package)]
+        try:
+            tree = ast.parse(strip_install_preamble(code))
+        except SyntaxError as e:
+            return problems + [f"does not parse: {e}"]
+        # df.to_string() and the like only build text; the attribute check below must let them pass
+        text_only = {
+            id(node.func) for node in ast.walk(tree)
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr in TEXT_WRITERS and not self._has_destination(node)
+        }
+        # open() is fine only as a direct call with a constant read-only mode, never passed around
+        read_only_opens = {
+            id(node.func) for node in ast.walk(tree)
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "open"
+            and self._opens_read_only(node)
+        }
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                problems += [f"imports {alias.name}" for alias in node.names if not self._module_allowed(alias.name)]
+            elif isinstance(node, ast.ImportFrom):
+                if node.level or not self._module_allowed(node.module or ""):
+                    problems.append(f"imports {node.module}")
+                problems += [
+                    f"imports {alias.name}" for alias in node.names
+                    if alias.name == "*" or self._forbidden_attribute(alias.name)
+                ]
+            elif isinstance(node, ast.Name):
+                if node.id in FORBIDDEN_NAMES or (self._is_dunder(node.id) and node.id not in SAFE_DUNDERS):
+                    problems.append(f"uses {node.id}")
+                elif node.id == "open" and id(node) not in read_only_opens:
+                    problems.append("opens a file for writing or passes open around")
+            elif isinstance(node, ast.Attribute):
+                if id(node) not in text_only and self._forbidden_attribute(node.attr):
+                    problems.append(f"uses .{node.attr}")
+            elif isinstance(node, ast.arg) and self._has_string(node.annotation):
+                problems.append(f"annotates {node.arg} with a string")
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and self._has_string(node.returns):
+                problems.append(f"annotates the return of {node.name} with a string")
+            elif isinstance(node, ast.AnnAssign) and self._has_string(node.annotation):
+                problems.append("annotates a variable with a string")
+        return problems
+
+    @staticmethod
+    def _has_string(annotation):
+        # String annotations are code that typing and functools.singledispatch evaluate
+        return annotation is not None and any(
+            isinstance(node, ast.Constant) and isinstance(node.value, str) for node in ast.walk(annotation)
+        )
+
+    @staticmethod
+    def _is_dunder(name):
+        return len(name) > 4 and name.startswith("__") and name.endswith("__")
+
+    def _forbidden_attribute(self, name):
+        if self._is_dunder(name):
+            return name not in SAFE_DUNDERS
+        if name.startswith("read_"):
+            return True
+        if name.startswith("to_"):
+            return name not in SAFE_CONVERSIONS
+        return name in FORBIDDEN_ATTRIBUTES
+
+    @staticmethod
+    def _has_destination(node):
+        return bool(node.args) or any(
+            keyword.arg is None or keyword.arg in DESTINATION_KEYWORDS for keyword in node.keywords
+        )
+
+    @staticmethod
+    def _opens_read_only(node):
+        if any(isinstance(arg, ast.Starred) for arg in node.args) or any(
+            keyword.arg in (None, "opener") for keyword in node.keywords
+        ):
+            return False
+        mode = node.args[1] if len(node.args) > 1 else next(
+            (keyword.value for keyword in node.keywords if keyword.arg == "mode"), None
+        )
+        if mode is None:
+            return True
+        if not isinstance(mode, ast.Constant) or not isinstance(mode.value, str):
+            return False
+        return not any(flag in mode.value for flag in "wax+")
+
+    def decide(self, tools, config):
+        for tool in tools:
+            if self.violations(tool.get('function', '')):
+                return None
+        return _decision(True, "Approved: code passed the static allowlist")
+
+
+class QueuePolicy:
+    """Park requests as JSON files for asynchronous review instead of blocking.
+
+    Requests are keyed by the reviewed code, so a question that is run again
+    (with the deterministic LLM cache, the same code comes back) picks up the
+    decision once a reviewer has recorded it.
+    """
+
+    def __init__(self, queue_dir):
+        self.queue_dir = queue_dir
+
+    @staticmethod
+    def request_key(tools):
+        payload = json.dumps([[tool.get('name'), tool.get('function')] for tool in tools])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, key):
+        return os.path.join(self.queue_dir, f"{key}.json")
+
+    def _write(self, key, entry):
+        os.makedirs(self.queue_dir, exist_ok=True)
+        tmp_path = f"{self._path(key)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(entry, file, indent=4)
+        os.replace(tmp_path, self._path(key))
+
+    def load(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def pending(self):
+        """Queued requests that still wait for a decision."""
+        if not os.path.isdir(self.queue_dir):
+            return []
+        entries = []
+        for name in sorted(os.listdir(self.queue_dir)):
+            if name.endswith(".json"):
+                entry = self.load(name[:-len(".json")])
+                if entry is not None and entry.get("decision") is None:
+                    entries.append(entry)
+        return entries
+
+    def record(self, key, approved, feedback=""):
+        entry = self.load(key)
+        if entry is None:
+            raise KeyError(key)
+        entry["decision"] = _decision(approved, feedback)
+        entry["decided"] = time.time()
+        self._write(key, entry)
+
+    def decide(self, tools, config):
+        key = self.request_key(tools)
+        entry = self.load(key)
+        if entry is not None and entry.get("decision") is not None:
+            return entry["decision"]
+        if entry is None:
+            thread_id = (config or {}).get("configurable", {}).get("thread_id")
+            self._write(key, {"key": key, "thread_id": thread_id, "queued": time.time(), "tools": tools, "decision": None})
+            print(f"Tool approval queued for review as {key}")
+        return DEFERRED
+
+
+class FixedPolicy:
+    def __init__(self, approved):
+        self.approved = approved
+
+    def decide(self, tools, config):
+        return _decision(self.approved, "Approved by policy" if self.approved else "Rejected by policy")
+
+
+class ApprovalChain:
+    """Ask each policy in turn; the first one with an opinion decides, otherwise the tools are rejected."""
+
+    def __init__(self, policies):
+        self.policies = policies
+
+    def decide(self, tools, config=None):
+        for policy in self.policies:
+            decision = policy.decide(tools, config)
+            if decision is not None:
+                return decision
+        return _decision(False, "Rejected: no approval policy accepted the tools")
+
+
+def build_policy(spec):
+    """Build the ApprovalChain described by a spec such as "registry,ast,queue"."""
+    policies = []
+    for name in (part.strip().lower() for part in spec.split(",")):
+        if name == "interactive":
+            policies.append(InteractivePolicy())
+        elif name == "timeout":
+            policies.append(InteractivePolicy(timeout=float(os.getenv("APPROVAL_TIMEOUT", "300"))))
+        elif name == "registry":
+            from utils.utility import registry
+            policies.append(RegistryPolicy(registry))
+        elif name == "ast":
+            allowed = os.getenv("APPROVAL_ALLOWED_MODULES", DEFAULT_ALLOWED_MODULES)
+            policies.append(AstPolicy(module.strip() for module in allowed.split(",") if module.strip()))
+        elif name == "queue":
+            policies.append(QueuePolicy(os.getenv("APPROVAL_QUEUE_DIR", DEFAULT_QUEUE_DIR)))
+        elif name in ("approve", "reject"):
+            policies.append(FixedPolicy(name == "approve"))
+        elif name:
+            raise ValueError(f"Unknown approval policy: {name}")
+    return ApprovalChain(policies)
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_policy():
+    """The chain configured by APPROVAL_POLICY, built once."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = build_policy(os.getenv("APPROVAL_POLICY", DEFAULT_POLICY))
+        return _policy
+
+
+def _mark_approved(tools):
+    """Flag approved code in the registry so the registry policy accepts it next time."""
+    from utils.utility import registry
+    for tool in tools:
+        known = registry.find(tool.get('name'), tool.get('description'))
+        if known and known.get('function') == tool.get('function') and not known.get('approved', False):
+            registry.upsert({**known, 'approved': True})
+
+
+def resolve(graph, config, policy=None):
+    """Settle a pending approval of the thread in `config`.
+
+    Returns None when the thread is not paused before human_approval,
+    DEFERRED when the decision was queued for later review, and otherwise
+    the decision, which has been written into the thread's state so that
+    `graph.stream(None, config)` continues from the interrupt.
+    """
+    snapshot = graph.get_state(config)
+    if "human_approval" not in snapshot.next:
+        return None
+    tools = tools_for_review(snapshot.values)
+    decision = (policy or get_policy()).decide(tools, config)
+    if decision is DEFERRED:
+        return DEFERRED
+    if decision["human_approved"]:
+        _mark_approved(tools)
+    graph.update_state(config, decision)
+    return decision
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Review tool approvals queued by APPROVAL_POLICY=queue")
+    parser.add_argument("--queue-dir", default=os.getenv("APPROVAL_QUEUE_DIR", DEFAULT_QUEUE_DIR))
+    args = parser.parse_args()
+
+    queue = QueuePolicy(args.queue_dir)
+    requests = queue.pending()
+    if not requests:
+        print("No tool approvals are waiting for review.")
+    reviewer = InteractivePolicy()
+    for entry in requests:
+        print(f"\n=== {entry['key']} (thread {entry.get('thread_id')}) ===")
+        decision = reviewer.decide(entry["tools"], None)
+        queue.record(entry["key"], decision["human_approved"], decision["human_feedback"])
+        if decision["human_approved"]:
+            _mark_approved(entry["tools"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import os
+import time
+import asyncio
+import sqlite3
+from dotenv import load_dotenv
+from langgraph.checkpoint.memory import MemorySaver
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:
+    SqliteSaver = None
+
+load_dotenv()
+
+DEFAULT_CHECKPOINT_DB = 'data/checkpoints.sqlite'
+
+
+if SqliteSaver is not None:
+    class DurableSqliteSaver(SqliteSaver):
+        """SqliteSaver on a WAL database that records per-thread activity.
+
+        Every write is committed before its cursor is released, so parallel
+        branches of a superstep and other processes never wait on a lock
+        held between writes; with synchronous=NORMAL those commits do not
+        fsync, WAL does at its own checkpoints. A connection that still
+        finds the database busy retries for `busy_timeout` seconds. Every
+        checkpoint also stamps the thread in a `thread_activity` table,
+        which is what prune_finished() uses to find idle threads.
+
+        SqliteSaver is sync-only; the async methods run the sync ones in a
+        worker thread, so graph.astream() and ainvoke() work on the same
+        database without blocking the event loop.
+        """
+
+        def __init__(self, path=DEFAULT_CHECKPOINT_DB, busy_timeout=30.0):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            super().__init__(conn)
+            self.path = path
+
+        def setup(self):
+            if self.is_setup:
+                return
+            super().setup()
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_activity (thread_id TEXT PRIMARY KEY, updated REAL NOT NULL)"
+            )
+            self.conn.commit()
+
+        def put(self, config, checkpoint, metadata, new_versions):
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            with self.cursor() as cur:
+                cur.execute(
+                    "INSERT OR REPLACE INTO thread_activity (thread_id, updated) VALUES (?, ?)",
+                    (str(config["configurable"]["thread_id"]), time.time()),
+                )
+            return saved
+
+        def delete_thread(self, thread_id):
+            super().delete_thread(thread_id)
+            with self.cursor() as cur:
+                cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+
+        async def aget_tuple(self, config):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config, *, filter=None, before=None, limit=None):
+            # list() holds the connection lock while it yields, so read everything in one go
+            checkpoints = await asyncio.to_thread(
+                lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+            )
+            for checkpoint in checkpoints:
+                yield checkpoint
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id):
+            await asyncio.to_thread(self.delete_thread, thread_id)
+
+        def idle_threads(self, ttl):
+            """IDs of threads without a checkpoint in the last `ttl` seconds."""
+            with self.cursor(transaction=False) as cur:
+                cur.execute("SELECT thread_id FROM thread_activity WHERE updated < ?", (time.time() - ttl,))
+                return [row[0] for row in cur.fetchall()]
+
+
+def get_checkpointer(path=None):
+    """The checkpointer selected by CHECKPOINTER: "sqlite" (the default) at CHECKPOINT_DB, or "memory"."""
+    kind = os.getenv("CHECKPOINTER", "sqlite").lower()
+    if kind == "memory":
+        return MemorySaver()
+    if kind != "sqlite":
+        raise ValueError(f"Unknown checkpointer: {kind}")
+    if SqliteSaver is None:
+        raise ImportError("CHECKPOINTER=sqlite needs the langgraph-checkpoint-sqlite package")
+    return DurableSqliteSaver(path or os.getenv("CHECKPOINT_DB", DEFAULT_CHECKPOINT_DB))
+
+
+def _first_message(values):
+    messages = (values or {}).get("messages") or [None]
+    return getattr(messages[0], "content", messages[0])
+
+
+def resume_or_start(graph, config, inputs):
+    """Stream input for the thread in `config`: None to resume a run that was interrupted, else `inputs`.
+
+    Only a run started with the same first message as `inputs` is resumed.
+    Any other thread under that ID, finished or not, is cleared first, so
+    its old messages do not leak into the new run.
+    """
+    snapshot = graph.get_state(config)
+    if snapshot.next and _first_message(snapshot.values) == _first_message(inputs):
+        print(f"Resuming thread {config['configurable']['thread_id']} before {', '.join(snapshot.next)}")
+        return None
+    if snapshot.values or snapshot.next:
+        graph.checkpointer.delete_thread(config["configurable"]["thread_id"])
+    return inputs
+
+
+def prune_finished(graph, ttl=None):
+    """Delete threads that finished and have been idle for `ttl` seconds; returns how many.
+
+    Threads still paused at an interrupt are kept however old they are.
+    The TTL defaults to CHECKPOINT_TTL; only the SQLite checkpointer keeps
+    the activity times this needs.
+    """
+    saver = graph.checkpointer
+    if not hasattr(saver, "idle_threads"):
+        return 0
+    if ttl is None:
+        ttl = float(os.getenv("CHECKPOINT_TTL", str(7 * 24 * 3600)))
+    pruned = 0
+    for thread_id in saver.idle_threads(ttl):
+        if not graph.get_state({"configurable": {"thread_id": thread_id}}).next:
+            saver.delete_thread(thread_id)
+            pruned += 1
+    return pruned
@@ -0,0 +1,156 @@
+import re
+import ast
+import json
+from typing import NamedTuple
+
+FENCE = "```"
+# Language tag and the rest of the opening fence line
+_OPENING = re.compile(r"[ \t]*([\w+#.-]*)[ \t]*(\r?\n)?")
+_TRAILING_COMMA = re.compile(r",(\s*[\]}])")
+PYTHON_TAGS = {"python", "py", "python3"}
+JSON_TAGS = {"json", "jsonc", "json5"}
+# Brackets in surrounding prose tried as the start of a JSON value; keeps the scan linear
+MAX_JSON_STARTS = 8
+
+
+class CodeBlock(NamedTuple):
+    """A fenced block: lower-cased language tag ("" when untagged), code with
+    "\\n" line endings, offsets of the whole block in the source text, and
+    whether a closing fence was found."""
+    language: str
+    code: str
+    start: int
+    end: int
+    closed: bool
+
+
+def find_blocks(text, languages=None):
+    """All fenced code blocks in `text` in order, in a single left-to-right scan.
+
+    Tolerates CRLF line endings, a missing newline before the closing fence,
+    code on the fence line (```json[...]```) and a final block left open by a
+    truncated response. `languages` restricts the result to those tags; ""
+    selects untagged blocks.
+    """
+    if not text:
+        return []
+    blocks = []
+    position = 0
+    while True:
+        start = text.find(FENCE, position)
+        if start < 0:
+            break
+        opening = _OPENING.match(text, start + len(FENCE))
+        language = opening.group(1).lower()
+        if opening.group(2) is None and language and opening.end() < len(text):
+            # Code on the fence line: only a following bracket marks the word as a tag
+            if text[opening.end()] not in "[{(":
+                language = ""
+                opening = _OPENING.match(text, start + len(FENCE), start + len(FENCE))
+        body_start = opening.end()
+        close = text.find(FENCE, body_start)
+        closed = close >= 0
+        body_end = close if closed else len(text)
+        position = close + len(FENCE) if closed else len(text)
+        code = text[body_start:body_end].replace("\r\n", "\n")
+        if code.endswith("\n"):
+            code = code[:-1]
+        if languages is None or language in languages:
+            blocks.append(CodeBlock(language, code, start, position, closed))
+    return blocks
+
+
+def is_valid_python(code):
+    try:
+        ast.parse(code)
+    except (SyntaxError, ValueError):
+        return False
+    return True
+
+
+def loads_json(text):
+    """Parse JSON the way models actually write it, or return None.
+
+    Accepts trailing commas, Python literals (single quotes, True/None) when
+    the text is a single bracketed value, and surrounding prose, in which
+    case the first complete array or object starting at one of the first
+    MAX_JSON_STARTS brackets wins.
+    """
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    relaxed = _TRAILING_COMMA.sub(r"\1", text)
+    try:
+        return json.loads(relaxed)
+    except ValueError:
+        pass
+    if relaxed[0] in "[{" and relaxed[-1] in "]}":
+        try:
+            value = ast.literal_eval(relaxed)
+            if isinstance(value, (list, dict)):
+                return value
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            pass
+    decoder = json.JSONDecoder()
+    index = _next_bracket(relaxed, 0)
+    for _ in range(MAX_JSON_STARTS):
+        if index < 0:
+            break
+        try:
+            return decoder.raw_decode(relaxed, index)[0]
+        except ValueError:
+            index = _next_bracket(relaxed, index + 1)
+    return None
+
+
+def _next_bracket(text, start):
+    positions = [position for position in (text.find("[", start), text.find("{", start)) if position >= 0]
+    return min(positions) if positions else -1
+
+
+def extract_python(text):
+    """The first Python block that parses, else the first Python-tagged block, else "".
+
+    Python-tagged blocks are preferred over untagged ones, and a block left
+    open by a truncated response is only used when there is no other.
+    """
+    blocks = [b for b in find_blocks(text, PYTHON_TAGS | {""}) if b.code.strip()]
+    blocks = [b for b in blocks if b.closed] or blocks
+    ordered = [b for b in blocks if b.language] + [b for b in blocks if not b.language]
+    for block in ordered:
+        if is_valid_python(block.code):
+            return block.code
+    for block in ordered:
+        if block.language:
+            return block.code
+    return ""
+
+
+def extract_json(text, bare=True):
+    """The first parseable JSON block (json-tagged before untagged), or None.
+
+    With `bare`, JSON written without a fence is also looked for in the text.
+    """
+    blocks = find_blocks(text, JSON_TAGS | {""})
+    for block in [b for b in blocks if b.language] + [b for b in blocks if not b.language]:
+        value = loads_json(block.code)
+        if value is not None:
+            return value
+    if bare and text:
+        return loads_json(text)
+    return None
+
+
+def remove_blocks(text, languages):
+    """`text` without the blocks tagged with one of `languages`."""
+    parts = []
+    position = 0
+    for block in find_blocks(text, languages):
+        parts.append(text[position:block.start])
+        position = block.end
+    parts.append(text[position:])
+    return "".join(parts).strip()
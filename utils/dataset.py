@@ -0,0 +1,104 @@
+import os
+import threading
+from array import array
+
+READ_SIZE = 1024 * 1024
+
+
+def parse_shard(text):
+    """Parse "i/N" into (i, N) with 0 <= i < N."""
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {text!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be between 0 and {count - 1}, got {text!r}")
+    return index, count
+
+
+class DatasetReader:
+    """Lazy, random-access view of a JSONL dataset.
+
+    Line i is read with one seek using a byte-offset index, which is built
+    once and cached beside the file (`<path>.idx`) until the file's size or
+    mtime changes. Line numbers match `readlines()`, blank lines included,
+    so they stay valid as question indices across versions.
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path or f"{path}.idx"
+        self._lock = threading.Lock()
+        self._offsets = self._load_index()
+        self._file = open(path, "rb")
+
+    def _signature(self):
+        stat = os.stat(self.path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _load_index(self):
+        signature = self._signature()
+        offsets = array("q")
+        try:
+            with open(self.index_path, "rb") as file:
+                offsets.frombytes(file.read())
+            if list(offsets[:2]) == signature:
+                return offsets[2:]
+        except (OSError, ValueError):
+            pass
+        offsets = self._build_index(signature[0])
+        try:
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "wb") as file:
+                array("q", signature).tofile(file)
+                offsets.tofile(file)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            # A read-only dataset directory only costs a rebuild next time
+            pass
+        return offsets
+
+    def _build_index(self, size):
+        offsets = array("q")
+        if size == 0:
+            return offsets
+        offsets.append(0)
+        position = 0
+        with open(self.path, "rb") as file:
+            while True:
+                block = file.read(READ_SIZE)
+                if not block:
+                    break
+                start = block.find(b"\n")
+                while start >= 0:
+                    offsets.append(position + start + 1)
+                    start = block.find(b"\n", start + 1)
+                position += len(block)
+        if offsets[-1] == size:
+            # The file ends with a newline, so no line starts there
+            offsets.pop()
+        return offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self._offsets):
+            raise IndexError(index)
+        with self._lock:
+            self._file.seek(self._offsets[index])
+            return self._file.readline().decode("utf-8")
+
+    def shard(self, index, count):
+        """Indices of shard `index` of `count`: a contiguous slice, so shards need no coordination."""
+        total = len(self)
+        return range(total * index // count, total * (index + 1) // count)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,151 @@
+import os
+import re
+import ast
+import sys
+import json
+import hashlib
+import importlib
+import threading
+import subprocess
+from functools import lru_cache
+from importlib import metadata
+
+try:
+    from packaging.requirements import Requirement, InvalidRequirement
+except ImportError:
+    Requirement = None
+
+# Requirement sets already satisfied, keyed per interpreter so a venv switch re-checks them
+CACHE_PATH = os.getenv("REQUIREMENTS_CACHE_PATH", "data/.requirements_cache.json")
+
+_lock = threading.Lock()
+_satisfied = None
+
+
+@lru_cache(maxsize=512)
+def _analyze(code):
+    """Return (packages, code without the install preamble) for tool source."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return (), code
+
+    packages = []
+    for node in tree.body:
+        if (isinstance(node, ast.Assign)
+                and any(isinstance(target, ast.Name) and target.id == "REQUIRED_PACKAGES" for target in node.targets)
+                and isinstance(node.value, (ast.List, ast.Tuple))):
+            packages = [elt.value for elt in node.value.elts
+                        if isinstance(elt, ast.Constant) and isinstance(elt.value, str)]
+    if not packages:
+        return (), code
+
+    # The `for package in REQUIRED_PACKAGES:` install loop and the pkg_resources import it needs
+    strip = [node for node in tree.body
+             if isinstance(node, ast.For)
+             and isinstance(node.iter, ast.Name) and node.iter.id == "REQUIRED_PACKAGES"]
+    stripped_lines = {line for node in strip for line in range(node.lineno, node.end_lineno + 1)}
+    pkg_resources_used = any(
+        isinstance(node, ast.Name) and node.id == "pkg_resources" and node.lineno not in stripped_lines
+        for node in ast.walk(tree)
+    )
+    if not pkg_resources_used:
+        strip += [node for node in tree.body
+                  if isinstance(node, ast.Import)
+                  and [alias.name for alias in node.names] == ["pkg_resources"]]
+
+    lines = code.splitlines(keepends=True)
+    for node in strip:
+        # Blank the lines instead of deleting them so tracebacks keep their line numbers
+        for index in range(node.lineno - 1, node.end_lineno):
+            lines[index] = "\n"
+    return tuple(packages), "".join(lines)
+
+
+def parse_requirements(code):
+    """Packages listed in a tool's REQUIRED_PACKAGES block, read without running it."""
+    return list(_analyze(code)[0])
+
+
+def strip_install_preamble(code):
+    """Tool source with the REQUIRED_PACKAGES install loop removed."""
+    return _analyze(code)[1]
+
+
+def _is_installed(spec):
+    if Requirement is not None:
+        try:
+            requirement = Requirement(spec)
+        except InvalidRequirement:
+            requirement = None
+        if requirement is not None:
+            try:
+                version = metadata.version(requirement.name)
+            except metadata.PackageNotFoundError:
+                return False
+            return not requirement.specifier or requirement.specifier.contains(version, prereleases=True)
+    name = re.split(r"[\s<>=!~;\[]", spec.strip(), maxsplit=1)[0]
+    try:
+        metadata.distribution(name)
+        return True
+    except metadata.PackageNotFoundError:
+        return False
+
+
+def _requirements_key(packages):
+    payload = json.dumps([sys.prefix, sys.version, sorted(set(packages))])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _load_satisfied():
+    global _satisfied
+    if _satisfied is None:
+        try:
+            with open(CACHE_PATH, "r", encoding="utf-8") as file:
+                _satisfied = set(json.load(file))
+        except (OSError, ValueError):
+            _satisfied = set()
+    return _satisfied
+
+
+def _save_satisfied(satisfied):
+    directory = os.path.dirname(CACHE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{CACHE_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(sorted(satisfied), file)
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def ensure_requirements(packages):
+    """Install any missing packages once per environment; returns True when all are present."""
+    if not packages:
+        return True
+    key = _requirements_key(packages)
+    with _lock:
+        satisfied = _load_satisfied()
+        if key in satisfied:
+            return True
+        missing = [package for package in packages if not _is_installed(package)]
+        if missing:
+            print(f"Installing tool requirements: {', '.join(missing)}")
+            subprocess.call([sys.executable, '-m', 'pip', 'install', *missing])
+            importlib.invalidate_caches()
+            missing = [package for package in missing if not _is_installed(package)]
+            if missing:
+                print(f"Could not install tool requirements: {', '.join(missing)}")
+                return False
+        satisfied.add(key)
+        _save_satisfied(satisfied)
+        return True
+
+
+def prepare_tool_code(tool):
+    """Make sure a tool's requirements are installed and return its code ready to execute."""
+    code = tool.get('function') or ''
+    requirements = tool.get('requirements')
+    if requirements is None:
+        requirements = parse_requirements(code)
+    ensure_requirements(requirements)
+    return strip_install_preamble(code)
@@ -0,0 +1,210 @@
+import os
+import sys
+import queue
+import atexit
+import pickle
+import select
+import threading
+import tempfile
+import subprocess
+from dotenv import load_dotenv
+import utils.tool_worker as tool_worker
+
+load_dotenv()
+
+# "pool" runs tools in pre-warmed workers, "subprocess" starts a fresh interpreter per call
+EXECUTION_MODE = os.getenv("TOOL_EXECUTION_MODE", "pool")
+POOL_SIZE = int(os.getenv("TOOL_WORKERS", "2"))
+# Workers are replaced after this many runs or once their RSS passes the limit
+MAX_RUNS = int(os.getenv("TOOL_WORKER_MAX_RUNS", "100"))
+MAX_RSS_MB = int(os.getenv("TOOL_WORKER_MAX_RSS_MB", "1024"))
+PRELOAD_MODULES = [
+    name.strip() for name in
+    os.getenv("TOOL_WORKER_PRELOAD", "json,re,math,datetime,typing,requests,numpy,pandas,matplotlib.pyplot").split(",")
+    if name.strip()
+]
+# Per-run CPU seconds and per-process address space of tool code; 0 disables a limit (POSIX only)
+MAX_CPU_SECONDS = int(os.getenv("TOOL_MAX_CPU_SECONDS", "60"))
+MAX_MEMORY_MB = int(os.getenv("TOOL_MAX_MEMORY_MB", "4096"))
+# Tools see only these variables of the parent environment, so API keys and LLM settings stay out of reach
+ENV_PASSTHROUGH = {
+    "PATH", "HOME", "USER", "LANG", "LC_ALL", "LC_CTYPE", "TZ", "TMPDIR", "TEMP", "TMP", "SYSTEMROOT",
+    "PYTHONPATH", "MPLBACKEND", "MPLCONFIGDIR", "XDG_CACHE_HOME", "HTTP_PROXY", "HTTPS_PROXY", "NO_PROXY",
+    "http_proxy", "https_proxy", "no_proxy", "REQUESTS_CA_BUNDLE", "SSL_CERT_FILE",
+} | {name.strip() for name in os.getenv("TOOL_ENV_PASSTHROUGH", "").split(",") if name.strip()}
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def tool_environment():
+    """The environment tools run with: the parent's, minus everything not in TOOL_ENV_PASSTHROUGH."""
+    env = {name: value for name, value in os.environ.items() if name in ENV_PASSTHROUGH}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [_REPO_ROOT, env.get("PYTHONPATH")]))
+    return env
+
+
+def _limit_subprocess():
+    tool_worker.limit_memory(MAX_MEMORY_MB)
+    tool_worker.limit_cpu(MAX_CPU_SECONDS)
+
+
+class _Worker:
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "utils.tool_worker", ",".join(PRELOAD_MODULES), str(MAX_MEMORY_MB),
+             str(MAX_CPU_SECONDS)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=tool_environment(),
+        )
+        self.runs = 0
+        self.rss_mb = 0.0
+        self.ready = False
+
+    def _receive(self, timeout):
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            return None
+        return pickle.load(self.process.stdout)
+
+    def run(self, source, filename, timeout):
+        if not self.ready:
+            # Wait for the preloads, without charging them to the tool's timeout
+            self._receive(None)
+            self.ready = True
+        pickle.dump((source, filename), self.process.stdin)
+        self.process.stdin.flush()
+        try:
+            response = self._receive(timeout)
+        except EOFError:
+            self.process.wait()
+            returncode = self.process.returncode or 1
+            return returncode, "", f"Tool worker exited unexpectedly with code {returncode}\n"
+        if response is None:
+            self.kill()
+            raise subprocess.TimeoutExpired([sys.executable, filename], timeout)
+        (returncode, stdout, stderr), self.rss_mb = response
+        self.runs += 1
+        return returncode, stdout, stderr
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def stop(self):
+        if self.alive():
+            try:
+                pickle.dump(None, self.process.stdin)
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self.kill()
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+
+
+class ToolWorkerPool:
+    """Pool of pre-warmed Python processes that execute generated tool code.
+
+    Each call runs the source in a fresh `__main__` namespace of a long-lived
+    worker that already has common modules imported, so only the tool itself
+    is paid for. Results mirror `subprocess.run(..., capture_output=True,
+    text=True, timeout=...)`: a CompletedProcess with the exit code, stdout and
+    stderr, or TimeoutExpired after which the worker is killed.
+
+    Workers run with the scrubbed tool_environment(), an address space of
+    MAX_MEMORY_MB and MAX_CPU_SECONDS of CPU per run; a run that exceeds them
+    takes its worker down and reports a non-zero exit code. Unlike subprocess
+    mode, tools have no stdin, so input() raises EOFError. This bounds
+    runaway tools but is no sandbox: the filesystem and network stay open,
+    which is what tool approval is for.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_runs=MAX_RUNS, max_rss_mb=MAX_RSS_MB):
+        self.size = size
+        self.max_runs = max_runs
+        self.max_rss_mb = max_rss_mb
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._workers = set()
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        """Start idle workers up to the pool size."""
+        with self._lock:
+            missing = self.size - len(self._workers)
+            for _ in range(missing):
+                worker = _Worker()
+                self._workers.add(worker)
+                self._idle.put(worker)
+
+    def _acquire(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                worker = _Worker()
+                with self._lock:
+                    self._workers.add(worker)
+                return worker
+            if worker.alive():
+                return worker
+            self._discard(worker)
+
+    def _discard(self, worker):
+        worker.stop()
+        with self._lock:
+            self._workers.discard(worker)
+
+    def run(self, source, filename, timeout=60):
+        with self._slots:
+            worker = self._acquire()
+            try:
+                returncode, stdout, stderr = worker.run(source, filename, timeout)
+            except BaseException:
+                self._discard(worker)
+                raise
+            if worker.alive() and worker.runs < self.max_runs and worker.rss_mb < self.max_rss_mb:
+                self._idle.put(worker)
+            else:
+                self._discard(worker)
+        return subprocess.CompletedProcess([sys.executable, filename], returncode, stdout, stderr)
+
+    def shutdown(self):
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ToolWorkerPool()
+            atexit.register(_pool.shutdown)
+    return _pool
+
+
+def run_tool_source(source, filename, timeout=60):
+    """Run tool source with `python filename` semantics through the configured execution mode."""
+    if EXECUTION_MODE == "subprocess" or os.name == "nt":
+        # A file of its own per call, so concurrent runs of the same tool cannot overwrite each other
+        directory, name = os.path.split(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=directory or None, prefix=f"{os.path.splitext(name)[0]}_",
+                                         suffix=".py", delete=False) as f:
+            f.write(source)
+        try:
+            return subprocess.run([sys.executable, f.name], capture_output=True, text=True, timeout=timeout,
+                                  env=tool_environment(), preexec_fn=_limit_subprocess if os.name != "nt" else None)
+        finally:
+            os.remove(f.name)
+    return get_pool().run(source, filename, timeout)
@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_CACHE_PATH = 'data/llm_cache.sqlite'
+
+
+class LLMCache:
+    """Persistent cache of LLM completions with TTL and LRU eviction.
+
+    Entries are keyed by a hash of the model name, the temperature and the
+    fully formatted prompt, so only byte-identical requests share a response.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=50000, max_bytes=512 * 1024 * 1024, ttl=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    @classmethod
+    def from_env(cls):
+        """Build the cache configured by LLM_CACHE_* variables, or None when disabled."""
+        if os.getenv("LLM_CACHE", "on").lower() in ("0", "off", "false", "no"):
+            return None
+        ttl = os.getenv("LLM_CACHE_TTL")
+        return cls(
+            path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000")),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", "512")) * 1024 * 1024,
+            ttl=float(ttl) if ttl else None,
+        )
+
+    @staticmethod
+    def make_key(model_name, temperature, prompt):
+        payload = json.dumps([model_name, temperature, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached response for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Drop least recently used entries until both limits hold again
+        cursor = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC")
+        stale = []
+        for key, size in cursor:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        cursor.close()
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": count, "bytes": total}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
@@ -1,14 +1,16 @@
-from typing import Any, Dict, List, Optional, Mapping
+from typing import Any, Dict, List, Optional, Mapping, Iterator, AsyncIterator
 import json
-import requests
-import re
+import time
+import asyncio
 from langchain_core.callbacks.manager import CallbackManagerForLLMRun
 from langchain_core.language_models.llms import LLM
-from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages import BaseMessage, AIMessage, AIMessageChunk, HumanMessage, SystemMessage
 from langchain_core.outputs import LLMResult
 from dotenv import load_dotenv
 import os
 import inspect
+from utils import transport
+from utils import codeblocks
 
 load_dotenv()
 llm_model = os.getenv("LLM_MODEL")
@@ -42,15 +44,46 @@ class LocalLLM(LLM):
             "temperature": self.temperature
         })
         
-        headers = {'Content-Type': 'application/json'}
-        
-        response = requests.post(self.api_url, data=payload, headers=headers)
+        response = transport.post(self.api_url, data=payload)
         if response.status_code != 200:
             raise ValueError(f"Error from Ollama API: {response.text}")
         
         return response.json().get("response", "")
 
 
+class _ThinkStripper:
+    """Apply LocalChatModel._strip_think to streamed text as it arrives.
+
+    The answer is whatever follows the last </think>, with or without an
+    opening <think>, and another </think> can arrive until the stream ends.
+    So feed() only drops the reasoning before each </think> as it comes in,
+    which keeps memory flat, and flush() releases the answer. The
+    concatenated output always equals what invoke() returns for the same
+    response.
+    """
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self.buffer = ""
+        self.closed = False
+
+    def feed(self, text: str) -> str:
+        # A close tag can straddle the previous chunk and this one
+        start = max(len(self.buffer) - len(self.CLOSE) + 1, 0)
+        self.buffer += text
+        idx = self.buffer.rfind(self.CLOSE, start)
+        if idx != -1:
+            self.buffer = self.buffer[idx + len(self.CLOSE):]
+            self.closed = True
+        return ""
+
+    def flush(self) -> str:
+        out = self.buffer.strip() if self.closed else self.buffer
+        self.buffer = ""
+        self.closed = False
+        return out
+
+
 class LocalChatModel:
     """Custom Chat model wrapper for DeepSeek model running on Ollama."""
     
@@ -59,12 +92,20 @@ class LocalChatModel:
         api_url: str = "http://10.10.10.104:11434/api/generate",
         model_name: str = llm_model,
         temperature: float = 0.1,
-        system_prompt: str = "You are a helpful assistant that provides accurate, detailed responses."
+        system_prompt: str = "You are a helpful assistant that provides accurate, detailed responses.",
+        cache=None,
+        cache_bypass: bool = os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
     ):
         self.api_url = api_url
         self.model_name = model_name
         self.temperature = temperature
         self.system_prompt = system_prompt
+        # Optional utils.llm_cache.LLMCache; with cache_bypass set lookups are skipped
+        # but fresh responses are still written back
+        self.cache = cache
+        self.cache_bypass = cache_bypass
+        # Seconds until the first answer token of the most recent stream() call
+        self.last_ttft = None
     
     def _format_messages(self, messages: List[BaseMessage]) -> str:
         """Format messages for the DeepSeek model."""
@@ -95,30 +136,160 @@ class LocalChatModel:
         
         return "\n".join(prompt_parts)
     
-    def invoke(self, messages: List[BaseMessage]) -> AIMessage:
-        """Call the DeepSeek model with the given messages."""
-        formatted_prompt = self._format_messages(messages)
-        
-        payload = json.dumps({
+    def _payload(self, formatted_prompt: str, stream: bool) -> str:
+        return json.dumps({
             "model": self.model_name,
             "prompt": formatted_prompt,
-            "stream": False,
+            "stream": stream,
             "temperature": self.temperature
         })
+    
+    def _cache_key(self, formatted_prompt: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.make_key(self.model_name, self.temperature, formatted_prompt)
+    
+    def _cached(self, key: Optional[str]) -> Optional[str]:
+        if key is None or self.cache_bypass:
+            return None
+        return self.cache.get(key)
+    
+    def _store(self, key: Optional[str], response_text: str):
+        if key is not None:
+            self.cache.put(key, response_text)
+    
+    @staticmethod
+    def _strip_think(response_text: str) -> str:
+        # 🧼 Strip <think> blocks and keep only the actual final output
+        if "</think>" in response_text:
+            response_text = response_text.split("</think>")[-1].strip()
+        return response_text
+    
+    def invoke(self, messages: List[BaseMessage]) -> AIMessage:
+        """Call the DeepSeek model with the given messages."""
+        formatted_prompt = self._format_messages(messages)
+        key = self._cache_key(formatted_prompt)
+        cached = self._cached(key)
+        if cached is not None:
+            return AIMessage(content=cached)
         
-        headers = {'Content-Type': 'application/json'}
+        payload = self._payload(formatted_prompt, stream=False)
         
-        response = requests.post(self.api_url, data=payload, headers=headers)
+        response = transport.post(self.api_url, data=payload)
         if response.status_code != 200:
             raise ValueError(f"Error from Ollama API: {response.text}")
         
-        response_text = response.json().get("response", "")
-        # 🧼 Strip <think> blocks and keep only the actual final output
-        if "</think>" in response_text:
-            response_text = response_text.split("</think>")[-1].strip()
+        response_text = self._strip_think(response.json().get("response", ""))
+        self._store(key, response_text)
+        return AIMessage(content=response_text)
+    
+    async def ainvoke(self, messages: List[BaseMessage]) -> AIMessage:
+        """Async variant of invoke() on the pooled async HTTP client."""
+        formatted_prompt = self._format_messages(messages)
+        key = self._cache_key(formatted_prompt)
+        cached = self._cached(key)
+        if cached is not None:
+            return AIMessage(content=cached)
+        
+        payload = self._payload(formatted_prompt, stream=False)
         
+        response = await transport.apost(self.api_url, content=payload)
+        if response.status_code != 200:
+            raise ValueError(f"Error from Ollama API: {response.text}")
+        
+        response_text = self._strip_think(response.json().get("response", ""))
+        self._store(key, response_text)
         return AIMessage(content=response_text)
     
+    def _stream_chunk(self, line, stripper: _ThinkStripper, start: float, ttft: Optional[float]):
+        """Turn one NDJSON line into (answer token, ttft, done)."""
+        chunk = json.loads(line)
+        if chunk.get("error"):
+            raise ValueError(f"Error from Ollama API: {chunk['error']}")
+        
+        token = stripper.feed(chunk.get("response", ""))
+        done = bool(chunk.get("done"))
+        if done:
+            token += stripper.flush()
+        if token and ttft is None:
+            ttft = self.last_ttft = time.perf_counter() - start
+        return token, ttft, done
+    
+    def stream(self, messages: List[BaseMessage]) -> Iterator[AIMessageChunk]:
+        """Stream answer tokens from the model as Ollama produces them.
+
+        Reasoning up to the last </think> is dropped as it arrives; because a
+        later </think> would still cut the answer, the answer itself is
+        released when the model finishes, so the chunks add up to exactly
+        what invoke() returns. Every chunk carries the time-to-first-token in
+        `response_metadata["ttft"]`, which is also kept on `self.last_ttft`.
+        Closing the generator early closes the HTTP response, which stops the
+        generation on the server. Cache hits are returned as a single chunk;
+        only completed streams are cached.
+        """
+        formatted_prompt = self._format_messages(messages)
+        key = self._cache_key(formatted_prompt)
+        start = time.perf_counter()
+        cached = self._cached(key)
+        if cached is not None:
+            self.last_ttft = time.perf_counter() - start
+            yield AIMessageChunk(content=cached, response_metadata={"ttft": self.last_ttft})
+            return
+        
+        payload = self._payload(formatted_prompt, stream=True)
+        stripper = _ThinkStripper()
+        ttft = None
+        self.last_ttft = None
+        content = ""
+        
+        with transport.post(self.api_url, data=payload, stream=True) as response:
+            if response.status_code != 200:
+                raise ValueError(f"Error from Ollama API: {response.text}")
+            
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                token, ttft, done = self._stream_chunk(line, stripper, start, ttft)
+                if token:
+                    content += token
+                    yield AIMessageChunk(content=token, response_metadata={"ttft": ttft})
+                if done:
+                    self._store(key, content)
+                    break
+    
+    async def astream(self, messages: List[BaseMessage]) -> AsyncIterator[AIMessageChunk]:
+        """Async variant of stream() on the pooled async HTTP client."""
+        formatted_prompt = self._format_messages(messages)
+        key = self._cache_key(formatted_prompt)
+        start = time.perf_counter()
+        cached = self._cached(key)
+        if cached is not None:
+            self.last_ttft = time.perf_counter() - start
+            yield AIMessageChunk(content=cached, response_metadata={"ttft": self.last_ttft})
+            return
+        
+        payload = self._payload(formatted_prompt, stream=True)
+        stripper = _ThinkStripper()
+        ttft = None
+        self.last_ttft = None
+        content = ""
+        
+        async with transport.astream_post(self.api_url, content=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise ValueError(f"Error from Ollama API: {response.text}")
+            
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                token, ttft, done = self._stream_chunk(line, stripper, start, ttft)
+                if token:
+                    content += token
+                    yield AIMessageChunk(content=token, response_metadata={"ttft": ttft})
+                if done:
+                    self._store(key, content)
+                    break
+    
     def bind_tools(self, tools):
         """Implementation of bind_tools to enable tool usage with local LLMs."""
         self_instance = self
@@ -153,19 +324,36 @@ class LocalChatModel:
                     "After receiving the tool output, provide your final response based on the tool output."
                 )
             
+            def _generate(self, messages):
+                """Stream a response, stopping as soon as a complete tool block has arrived."""
+                content = ""
+                for chunk in self_instance.stream(messages):
+                    content += chunk.content
+                    if "`" in chunk.content and self._parse_tool_calls(content):
+                        break
+                return AIMessage(content=content)
+            
+            async def _agenerate(self, messages):
+                """Async variant of _generate()."""
+                content = ""
+                stream = self_instance.astream(messages)
+                try:
+                    async for chunk in stream:
+                        content += chunk.content
+                        if "`" in chunk.content and self._parse_tool_calls(content):
+                            break
+                finally:
+                    await stream.aclose()
+                return AIMessage(content=content)
+            
             def _parse_tool_calls(self, text):
                 """Parse tool calls from the model's response."""
-                tool_pattern = r"```tool\s*([\s\S]*?)```"
-                matches = re.findall(tool_pattern, text)
-                
-                if not matches:
-                    return None
-                
-                try:
-                    tool_call = json.loads(matches[0])
-                    return tool_call
-                except json.JSONDecodeError:
-                    return None
+                # Only closed blocks, so a half-streamed call is never executed
+                for block in codeblocks.find_blocks(text, {"tool"}):
+                    if block.closed:
+                        tool_call = codeblocks.loads_json(block.code)
+                        return tool_call if isinstance(tool_call, dict) else None
+                return None
             
             def _execute_tool(self, tool_call):
                 """Execute the specified tool with parameters."""
@@ -209,7 +397,7 @@ class LocalChatModel:
                 new_messages = self._add_tool_instructions(messages)
                 
                 # Step 2: Get initial response from LLM
-                initial_response = self_instance.invoke(new_messages)
+                initial_response = self._generate(new_messages)
                 
                 # Step 3: Check if response contains tool calls
                 tool_call = self._parse_tool_calls(initial_response.content)
@@ -217,7 +405,7 @@ class LocalChatModel:
                 # If no tool call is detected, return the initial response
                 if not tool_call:
                     # Clean up the response by removing tool-related formatting
-                    cleaned_content = re.sub(r"```tool[\s\S]*?```", "", initial_response.content).strip()
+                    cleaned_content = codeblocks.remove_blocks(initial_response.content, {"tool"})
                     return AIMessage(content=cleaned_content)
                 
                 # Step 4: Execute the tool
@@ -232,5 +420,23 @@ class LocalChatModel:
                 final_response = self_instance.invoke(new_messages)
                 
                 return final_response
+            
+            async def ainvoke(self, messages):
+                """Async variant of invoke(); tools run on a worker thread."""
+                new_messages = self._add_tool_instructions(messages)
+                initial_response = await self._agenerate(new_messages)
+                
+                tool_call = self._parse_tool_calls(initial_response.content)
+                if not tool_call:
+                    cleaned_content = codeblocks.remove_blocks(initial_response.content, {"tool"})
+                    return AIMessage(content=cleaned_content)
+                
+                tool_result = await asyncio.to_thread(self._execute_tool, tool_call)
+                
+                tool_message = f"Tool '{tool_call['tool_name']}' returned: {tool_result}"
+                new_messages.append(AIMessage(content=initial_response.content))
+                new_messages.append(HumanMessage(content=tool_message))
+                
+                return await self_instance.ainvoke(new_messages)
         
         return ToolBoundLocalChat(self, tools)
\ No newline at end of file
@@ -1,12 +1,22 @@
 import os
+import time
+import asyncio
+import contextvars
+import traceback
 import utils.prompts as ctg
 import utils.schema as schema
 from dotenv import load_dotenv
 import utils.utility as utility
+import utils.tool_index as tool_index
+import utils.executor as executor
+import utils.dependencies as dependencies
 from utils.localllm import LocalChatModel
-from langchain_core.messages import SystemMessage
+from utils.llm_cache import LLMCache
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langgraph.config import get_stream_writer
 from utils.utility import retrieve_tool, store_tool
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 load_dotenv()
 llm_model = os.getenv("LLM_MODEL")
@@ -16,10 +26,48 @@ llm = LocalChatModel(
     api_url="http://10.10.10.104:11434/api/generate",
     # model_name="deepseek-r1:671b",
     model_name=llm_model,
-    temperature=0
+    temperature=0,
+    # Deterministic at temperature 0, so completed stages are replayed from disk on re-runs
+    cache=LLMCache.from_env()
 )
 
-def task_analyzer_agent(state:schema.State):
+# Upper bound on tools generated concurrently by tool_generator_agent
+TOOL_GEN_WORKERS = int(os.getenv("TOOL_GEN_WORKERS", "3"))
+
+def _invoke_llm(messages, stage):
+    """Invoke the shared LLM, streaming tokens to the graph's "custom" stream mode.
+
+    Outside of a running graph this is a plain `llm.invoke`.
+    """
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return llm.invoke(messages)
+    
+    content = ""
+    for chunk in llm.stream(messages):
+        if not content:
+            writer({"stage": stage, "ttft": chunk.response_metadata.get("ttft")})
+        content += chunk.content
+        writer({"stage": stage, "token": chunk.content})
+    return AIMessage(content=content)
+
+async def _ainvoke_llm(messages, stage):
+    """Async variant of _invoke_llm()."""
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return await llm.ainvoke(messages)
+    
+    content = ""
+    async for chunk in llm.astream(messages):
+        if not content:
+            writer({"stage": stage, "ttft": chunk.response_metadata.get("ttft")})
+        content += chunk.content
+        writer({"stage": stage, "token": chunk.content})
+    return AIMessage(content=content)
+
+def _task_analyzer_messages(state:schema.State):
     system_message = ctg.task_analyzer_system_prompt
     
     # Get user query for context
@@ -35,9 +83,9 @@ def task_analyzer_agent(state:schema.State):
     # Add a reminder to be minimal in the system message
     enhanced_prompt = f"{system_message}\n\nREMINDER: For this query: '{user_query}', provide only the ABSOLUTE MINIMUM number of subtasks needed (1-2 ideally)."
     
-    messages = [SystemMessage(content=enhanced_prompt)]+state["messages"]
-    response = llm.invoke(messages)
-    
+    return [SystemMessage(content=enhanced_prompt)]+state["messages"]
+
+def _task_analyzer_result(response):
     print("------------- TASK ANALYZER START --------------")
     print("Task Analyzer Response: ", response.content)
     print("------------- TASK ANALYZER END --------------")
@@ -66,18 +114,36 @@ def task_analyzer_agent(state:schema.State):
     
     return {"messages": [response]}
 
-def tool_master_agent(state:schema.State):
+def task_analyzer_agent(state:schema.State):
+    response = _invoke_llm(_task_analyzer_messages(state), "task_analyzer")
+    return _task_analyzer_result(response)
+
+async def atask_analyzer_agent(state:schema.State):
+    response = await _ainvoke_llm(_task_analyzer_messages(state), "task_analyzer")
+    return _task_analyzer_result(response)
+
+def _tool_master_messages(state:schema.State):
     print("------------- TOOL MASTER START --------------")
     print("Tool Master Request [-1]: ", state["messages"][-1].content)
     system_message = ctg.tool_master_system_prompt
-    messages = [SystemMessage(content=system_message)]+[state["messages"][-1].content]
-    response = llm.invoke(messages)
+    return [SystemMessage(content=system_message)]+[state["messages"][-1].content]
+
+def _tool_master_result(response):
     print("Tool Master Response: ", response.content)
     print("------------- TOOL MASTER END --------------")
     return {"messages": [response]}
 
+def tool_master_agent(state:schema.State):
+    response = _invoke_llm(_tool_master_messages(state), "tool_master")
+    return _tool_master_result(response)
+
+async def atool_master_agent(state:schema.State):
+    response = await _ainvoke_llm(_tool_master_messages(state), "tool_master")
+    return _tool_master_result(response)
 
-def tool_selector_agent(state:schema.State):
+
+def _tool_selector_bypass(state:schema.State):
+    """Return the node output when selection can be skipped, otherwise None."""
     print("------------- TOOL SELECTOR START --------------")
     print("Tool Selector Request: ", state["messages"][-1].content)
     
@@ -90,29 +156,68 @@ def tool_selector_agent(state:schema.State):
     if state.get('human_approved', False):
         print("Human has approved tools, continuing with existing tools")
         return {"messages": state.get("messages", []), 'required_tools': state.get('required_tools', [])}
+    
+    return None
+
+def _tool_selector_plan(state:schema.State):
+    """Shortlist registry tools for the selector through the embedding index.
+
+    Returns (decision, messages). When every required tool either matches a
+    registry tool above the acceptance threshold or there is nothing to match
+    against, `decision` is an AIMessage in the selector's output format and no
+    LLM call is needed. Otherwise `messages` holds a prompt listing only the
+    top-k candidates of each required tool.
+    """
+    request = state["messages"][-1].content
+    required = utility.extract_json(request)
+    if isinstance(required, dict):
+        required = [required]
+    
+    candidates = None
+    if tool_index.TOP_K > 0 and isinstance(required, list) and required:
+        index = tool_index.get_tool_index()
+        decided = []
+        candidates = {}
+        for tool in required:
+            if not isinstance(tool, dict):
+                decided = None
+                break
+            hits = index.search(tool_index.tool_text(tool))
+            for _, hit in hits:
+                candidates.setdefault(hit['name'], hit)
+            if decided is None:
+                continue
+            if hits and hits[0][0] >= tool_index.ACCEPT_THRESHOLD:
+                best = hits[0][1]
+                decided.append({'name': best['name'], 'description': best['description'], 'is_available': True, 'function': ''})
+            elif not hits:
+                decided.append({'name': tool.get('name', ''), 'description': tool.get('description', ''), 'is_available': False, 'function': ''})
+            else:
+                decided = None
         
-    system_message = ctg.tool_selector_system_prompt
-    messages = [SystemMessage(content=system_message)]+[state["messages"][-1].content]
-    print("Tool Selector System Message prepared")
+        if decided is not None:
+            print("Tool availability decided from the tool index, skipping the selector LLM")
+            return AIMessage(content=f"```json\n{json.dumps(decided, indent=2)}\n```"), None
     
-    # Get tool selection from LLM
-    response = llm.invoke(messages)
+    if candidates is None:
+        # Tool Master output could not be parsed, show the selector the whole registry
+        system_message = ctg.get_tool_selector_system_prompt()
+    else:
+        print(f"Tool index shortlisted {len(candidates)} candidate tools")
+        system_message = ctg.build_tool_selector_prompt(list(candidates.values()))
+    messages = [SystemMessage(content=system_message)]+[request]
+    print("Tool Selector System Message prepared")
+    return None, messages
+
+def _tool_selector_result(response):
     print("Tool Selector Response: ", response.content)
     
     # Extract tools from response
     try:
+        # Fenced or bare JSON, tolerating trailing commas and surrounding prose
         required_tool = utility.extract_json(response.content)
         if not required_tool:
-            print("Failed to extract JSON from response, using regex fallback")
-            # Try to extract using regex as fallback
-            import re
-            json_pattern = r'\[\s*{.*?}\s*\]'
-            json_match = re.search(json_pattern, response.content, re.DOTALL)
-            if json_match:
-                try:
-                    required_tool = json.loads(json_match.group(0))
-                except json.JSONDecodeError:
-                    print("Regex JSON extraction failed")
+            print("Failed to extract JSON from response")
     except Exception as e:
         print(f"Error extracting tools: {str(e)}")
         required_tool = []
@@ -168,10 +273,30 @@ def tool_selector_agent(state:schema.State):
         'tools_identified': True
     }
 
+def tool_selector_agent(state:schema.State):
+    bypass = _tool_selector_bypass(state)
+    if bypass is not None:
+        return bypass
+    
+    decision, messages = _tool_selector_plan(state)
+    # Get tool selection from LLM unless the index already decided it
+    response = decision if decision is not None else _invoke_llm(messages, "tool_selector")
+    return _tool_selector_result(response)
+
+async def atool_selector_agent(state:schema.State):
+    bypass = _tool_selector_bypass(state)
+    if bypass is not None:
+        return bypass
+    
+    decision, messages = await asyncio.to_thread(_tool_selector_plan, state)
+    response = decision if decision is not None else await _ainvoke_llm(messages, "tool_selector")
+    return _tool_selector_result(response)
+
 tool_dataset_dir = 'data/tool_config.json'
 
 
-def tool_generator_agent(state:schema.ToolState):
+def _tool_generator_prepare(state:schema.ToolState):
+    """Log the request, handle a human rejection and return the original user query."""
     print("------------- TOOL GENERATOR START --------------")
     print("Tool Generator Request: ", state["messages"][-1].content)
     
@@ -193,11 +318,9 @@ def tool_generator_agent(state:schema.ToolState):
             if state['max_turns'] > 0:
                 state['max_turns'] -= 1
     
-    # Check if we've already succeeded
-    if state.get('code_generation_success', False):
-        return state
+    return user_query
 
-    # Ensure required_tools exists in state
+def _ensure_required_tools(state:schema.ToolState):
     if 'required_tools' not in state:
         state['required_tools'] = [{
             'name': state['messages'][-1].content.get('name', ''),
@@ -205,86 +328,68 @@ def tool_generator_agent(state:schema.ToolState):
             'is_available': False,
             'function': None
         }]
+
+def _is_api_tool(tool):
+    return any(keyword in tool['name'].lower() for keyword in ['api', 'web', 'http', 'rest'])
+
+def _enhanced_description(tool, user_query):
+    # Add context about the user query
+    return f"{tool['description']}\n\nThis tool will be used to solve the following user query: '{user_query}'"
+
+def _generate_api_tool_code(tool, user_query):
+    """Generate an API tool with the documentation scraper; returns None on failure."""
+    from scraper.scrape import APICodeAgent
+    scraper = APICodeAgent()
+    code = scraper.generate_api_code(_enhanced_description(tool, user_query), tool_name=tool['name'])
+    
+    if not code or code == "no code found":
+        return None
+    
+    # Ensure the code has placeholders for customization
+    if 'API_KEY' not in code and 'YOUR_API_KEY' not in code:
+        code = code.replace("api_key = ", "API_KEY = 'YOUR_API_KEY'\napi_key = API_KEY")
+    return code
+
+def _tool_writer_messages(tool, user_query):
+    # Use non-API based code writer prompt for non-API tools
+    system_message = ctg.non_api_based_code_writer_system_prompt
     
-    # Keep track of processed tools to prevent duplicates
-    processed_tools = set()
+    # Create a detailed tool request with user query context
+    tool_request = {
+        'name': tool['name'],
+        'description': _enhanced_description(tool, user_query),
+        'user_query': user_query
+    }
     
-    # Process each tool
-    for i, tool in enumerate(state['required_tools']):
-        # Skip already processed tools in this run
-        if tool.get('name') and tool['name'] in processed_tools:
-            print(f"Skipping already processed tool in this run: {tool['name']}")
-            continue
-            
-        if not tool['is_available']:
-            # Add context about the user query
-            enhanced_description = f"{tool['description']}\n\nThis tool will be used to solve the following user query: '{user_query}'"
-            
-            # Check if this is an API-based tool
-            if any(keyword in tool['name'].lower() for keyword in ['api', 'web', 'http', 'rest']):
-                # Use web scraper for API tools
-                from scraper.scrape import APICodeAgent
-                scraper = APICodeAgent()
-                code = scraper.generate_api_code(enhanced_description)
-                
-                if code and code != "no code found":
-                    # Ensure the code has placeholders for customization
-                    if 'API_KEY' not in code and 'YOUR_API_KEY' not in code:
-                        code = code.replace("api_key = ", "API_KEY = 'YOUR_API_KEY'\napi_key = API_KEY")
-                    
-                    # Only update and store if the tool's function has changed
-                    if state['required_tools'][i]['function'] != code:
-                        state['required_tools'][i]['is_available'] = True
-                        state['required_tools'][i]['function'] = code
-                        store_tool(state, i)
-                        
-                    state['code_generation_success'] = True
-                    state['tools_generated'] = True
-                    
-                    # Mark tool as processed
-                    if tool.get('name'):
-                        processed_tools.add(tool['name'])
-                else:
-                    state['max_turns'] -= 1
-            else:
-                # Use non-API based code writer prompt for non-API tools
-                system_message = ctg.non_api_based_code_writer_system_prompt
-                
-                # Create a detailed tool request with user query context
-                tool_request = {
-                    'name': tool['name'],
-                    'description': enhanced_description,
-                    'user_query': user_query
-                }
-                
-                messages = [SystemMessage(content=system_message)] + [str(tool_request)]
-                response = llm.invoke(messages)
-                
-                # Extract Python code from the response
-                code_block = utility.extract_python_code(response.content)
-                
-                if code_block:
-                    state['required_tools'][i]['is_available'] = True
-                    state['required_tools'][i]['function'] = code_block
-
-                    store_tool(state, i)
-
-                    state['code_generation_success'] = True
-                    state['tools_generated'] = True
-                    
-                    
-                    # Mark tool as processed
-                    if tool.get('name'):
-                        processed_tools.add(tool['name'])
-                else:
-                    state['max_turns'] -= 1
-                
+    return [SystemMessage(content=system_message)] + [str(tool_request)]
+
+def _record_generated_tool(state:schema.ToolState, i, tool, code, processed_tools):
+    """Store generated code for tool `i`, or spend a turn if generation failed."""
+    if not code:
+        state['max_turns'] -= 1
+        return
+    
+    # API tools are only updated and stored if the tool's function has changed
+    if not _is_api_tool(tool) or state['required_tools'][i]['function'] != code:
+        state['required_tools'][i]['is_available'] = True
+        state['required_tools'][i]['function'] = code
+        store_tool(state, i)
+    
+    state['code_generation_success'] = True
+    state['tools_generated'] = True
+    
+    # Mark tool as processed
+    if tool.get('name'):
+        processed_tools.add(tool['name'])
+
+def _tool_generator_result(state:schema.ToolState):
     result = {
         'messages': state['messages'], 
         'required_tools': state['required_tools'], 
         'max_turns': state['max_turns'], 
         'code_generation_success': state['code_generation_success'],
         'tools_generated': state.get('tools_generated', False),
+        'tool_generation_timings': state.get('tool_generation_timings', {}),
         # Preserve human feedback if present
         'human_approved': state.get('human_approved', False),
         'human_feedback': state.get('human_feedback', '')
@@ -293,6 +398,102 @@ def tool_generator_agent(state:schema.ToolState):
     print("------------- TOOL GENERATOR END --------------")
     return result
 
+def _pending_tools(state:schema.ToolState):
+    """Indices of the tools to generate, keeping the first entry of each name."""
+    pending = []
+    names = set()
+    for i, tool in enumerate(state['required_tools']):
+        # Skip duplicates of a tool already scheduled in this run
+        if tool.get('name') and tool['name'] in names:
+            print(f"Skipping already processed tool in this run: {tool['name']}")
+            continue
+        if not tool['is_available']:
+            pending.append(i)
+            if tool.get('name'):
+                names.add(tool['name'])
+    return pending
+
+def _generate_tool_code(tool, user_query):
+    """Generate code for one tool; returns (code or None, seconds taken)."""
+    start = time.perf_counter()
+    # Check if this is an API-based tool
+    if _is_api_tool(tool):
+        # Use web scraper for API tools
+        code = _generate_api_tool_code(tool, user_query)
+    else:
+        response = _invoke_llm(_tool_writer_messages(tool, user_query), f"tool_generator:{tool['name']}")
+        # Extract Python code from the response
+        code = utility.extract_python_code(response.content)
+    return code, time.perf_counter() - start
+
+async def _agenerate_tool_code(tool, user_query):
+    start = time.perf_counter()
+    if _is_api_tool(tool):
+        # The scraper pipeline is synchronous, keep it off the event loop
+        code = await asyncio.to_thread(_generate_api_tool_code, tool, user_query)
+    else:
+        response = await _ainvoke_llm(_tool_writer_messages(tool, user_query), f"tool_generator:{tool['name']}")
+        code = utility.extract_python_code(response.content)
+    return code, time.perf_counter() - start
+
+def _merge_generated_tools(state:schema.ToolState, pending, results):
+    """Apply generation results in tool order; registry writes happen here, one at a time."""
+    processed_tools = set()
+    timings = {}
+    for i, (code, seconds) in zip(pending, results):
+        tool = state['required_tools'][i]
+        timings[tool.get('name') or str(i)] = round(seconds, 3)
+        print(f"Generated {tool.get('name', 'unnamed')} in {seconds:.2f}s" if code else f"Failed to generate {tool.get('name', 'unnamed')} after {seconds:.2f}s")
+        _record_generated_tool(state, i, tool, code, processed_tools)
+    state['tool_generation_timings'] = timings
+
+def tool_generator_agent(state:schema.ToolState):
+    user_query = _tool_generator_prepare(state)
+    
+    # Check if we've already succeeded
+    if state.get('code_generation_success', False):
+        return state
+
+    # Ensure required_tools exists in state
+    _ensure_required_tools(state)
+    
+    # Independent tools are generated concurrently on a bounded pool
+    pending = _pending_tools(state)
+    tools = [state['required_tools'][i] for i in pending]
+    if len(pending) > 1 and TOOL_GEN_WORKERS > 1:
+        with ThreadPoolExecutor(max_workers=min(TOOL_GEN_WORKERS, len(pending))) as executor:
+            # Each task gets its own copy of the context so LLM tokens still reach the graph stream
+            futures = [
+                executor.submit(contextvars.copy_context().run, _generate_tool_code, tool, user_query)
+                for tool in tools
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [_generate_tool_code(tool, user_query) for tool in tools]
+    
+    _merge_generated_tools(state, pending, results)
+    return _tool_generator_result(state)
+
+async def atool_generator_agent(state:schema.ToolState):
+    user_query = _tool_generator_prepare(state)
+    
+    if state.get('code_generation_success', False):
+        return state
+
+    _ensure_required_tools(state)
+    
+    pending = _pending_tools(state)
+    semaphore = asyncio.Semaphore(max(TOOL_GEN_WORKERS, 1))
+    
+    async def generate(tool):
+        async with semaphore:
+            return await _agenerate_tool_code(tool, user_query)
+    
+    results = await asyncio.gather(*(generate(state['required_tools'][i]) for i in pending))
+    
+    _merge_generated_tools(state, pending, results)
+    return _tool_generator_result(state)
+
 def code_writer(state:schema.ToolState):
     print("------------- CODE WRITER START --------------")
     print("Code Writer Request: ", state["messages"][-1].content)
@@ -312,7 +513,7 @@ def code_writer(state:schema.ToolState):
     # Use non-API based code writer prompt for all non-API tools
     system_message = ctg.non_api_based_code_writer_system_prompt
     messages = [SystemMessage(content=system_message)] + [state["messages"][0].content]
-    response = llm.invoke(messages)
+    response = _invoke_llm(messages, "code_writer")
 
     # Extract Python code from the response
     code_block = utility.extract_python_code(response.content)
@@ -336,7 +537,42 @@ def code_writer(state:schema.ToolState):
     }
 
 
-def task_solver(state: schema.State):
+def _create_tool_function(tool_name, tool_code, i):
+    """Create a wrapper function that executes the tool code"""
+    def wrapper_function(*args, **kwargs):
+        tool_filename = f"temp/tool_{i}.py"
+        source = tool_code
+
+        # Append arguments to the source if needed
+        if args or kwargs:
+            args_code = "\n\n# Arguments passed to the tool\n"
+            if args:
+                args_code += f"# Positional args: {args}\n"
+            if kwargs:
+                for k, v in kwargs.items():
+                    args_code += f"{k} = {repr(v)}\n"
+            source += args_code
+
+        # Execute the tool in a pre-warmed worker and capture its output
+        result = executor.run_tool_source(source, tool_filename, timeout=60)
+
+        if result.returncode == 0:
+            return result.stdout.strip()
+        else:
+            return f"Error: {result.stderr}"
+    
+    # Add attributes needed for bind_tools to work
+    wrapper_function.__name__ = tool_name
+    wrapper_function.__doc__ = f"Execute the {tool_name} tool to solve the task."
+    
+    return wrapper_function
+
+def _task_solver_setup(state: schema.State):
+    """Bind the available tools to a solver LLM.
+
+    Returns (early_result, llm_with_tools, messages); early_result is set when
+    there is nothing to execute.
+    """
     print("------------- TASK SOLVER START --------------")
     print("Task Solver Request state[message]: ", state["messages"][-1].content)
     print("Task Solver Required Tools state[required_tools]: ", state['required_tools'])
@@ -349,7 +585,7 @@ def task_solver(state: schema.State):
             ],
             'required_tools': [],
             'max_turns': state['max_turns']
-        }
+        }, None, None
     
     # Get the original user query from the first message
     user_query = ""
@@ -363,14 +599,6 @@ def task_solver(state: schema.State):
     
     print("User Query: ", user_query)
     
-    # Import necessary modules
-    import sys
-    import os
-    import subprocess
-    import re
-    from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-    from utils.localllm import LocalChatModel  # Adjust import path as needed
-    
     # Create a directory for tool execution if it doesn't exist
     if not os.path.exists('temp'):
         os.makedirs('temp')
@@ -386,57 +614,11 @@ def task_solver(state: schema.State):
         print(f"Processing tool {i+1}: {tool.get('name', 'unnamed')}")
         
         try:
-            # Get tool code and handle API keys
-            tool_code = tool['function']
-            
-            # Handle API key replacements and user query injection as before
-            # [Your existing API key replacement code here]
-            
-            # Create a wrapper function that executes the tool code
-            def create_tool_function(tool_name, tool_code, i):
-                def wrapper_function(*args, **kwargs):
-                    # Save the tool code to a temporary file
-                    tool_filename = f"temp/tool_{i}.py"
-                    with open(tool_filename, 'w') as f:
-                        f.write(tool_code)
-                    
-                    # Append arguments to the file if needed
-                    args_code = ""
-                    if args or kwargs:
-                        args_code = "\n\n# Arguments passed to the tool\n"
-                        if args:
-                            args_code += f"# Positional args: {args}\n"
-                        if kwargs:
-                            for k, v in kwargs.items():
-                                args_code += f"{k} = {repr(v)}\n"
-                        with open(tool_filename, 'a') as f:
-                            f.write(args_code)
-                    
-                    # Execute the tool and capture its output
-                    result = subprocess.run(
-                        [sys.executable, tool_filename],
-                        capture_output=True,
-                        text=True,
-                        timeout=60  # Add timeout to prevent hanging
-                    )
-                    
-                    if result.returncode == 0:
-                        return result.stdout.strip()
-                    else:
-                        return f"Error: {result.stderr}"
-                
-                # Add attributes needed for bind_tools to work
-                wrapper_function.__name__ = tool['name']
-                wrapper_function.__doc__ = f"Execute the {tool['name']} tool to solve the task."
-                
-                return wrapper_function
-            
             # Create a unique function for this tool
-            tool_function = create_tool_function(tool['name'], tool_code, i)
+            tool_function = _create_tool_function(tool['name'], dependencies.prepare_tool_code(tool), i)
             tool_functions.append(tool_function)
             
         except Exception as e:
-            import traceback
             error_trace = traceback.format_exc()
             print(f"Exception preparing tool {tool['name']}: {str(e)}")
             print(f"Error trace: {error_trace}")
@@ -451,20 +633,17 @@ def task_solver(state: schema.State):
     IMPORTANT: Respond as if you personally solved the task, not as if you're presenting tool results.
     """
     
-    # Initialize the LLM
-    llm = LocalChatModel()
-    
     # Bind the tools to the LLM
-    llm_with_tools = llm.bind_tools(tool_functions)
+    llm_with_tools = LocalChatModel().bind_tools(tool_functions)
     
     # Create the messages
     messages = [
         SystemMessage(content=system_content),
         HumanMessage(content=user_query)
     ]
-    
-    # Get the response using the tool-enabled LLM
-    response = llm_with_tools.invoke(messages)
+    return None, llm_with_tools, messages
+
+def _task_solver_result(state: schema.State, response):
     print("Task Solver generated a response using the bound tools")
     
     # Update the state with the response
@@ -474,6 +653,24 @@ def task_solver(state: schema.State):
     print("------------- TASK SOLVER END --------------")
     return state
 
+def task_solver(state: schema.State):
+    early_result, llm_with_tools, messages = _task_solver_setup(state)
+    if early_result is not None:
+        return early_result
+    
+    # Get the response using the tool-enabled LLM
+    response = llm_with_tools.invoke(messages)
+    return _task_solver_result(state, response)
+
+async def atask_solver(state: schema.State):
+    # Preparing tools may pip install requirements and writes files, so keep it off the event loop
+    early_result, llm_with_tools, messages = await asyncio.to_thread(_task_solver_setup, state)
+    if early_result is not None:
+        return early_result
+    
+    response = await llm_with_tools.ainvoke(messages)
+    return _task_solver_result(state, response)
+
 def human_approval_agent(state:schema.ToolState):
     """
     Human-in-the-loop node to approve or reject generated tools.
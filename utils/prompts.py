@@ -1,4 +1,5 @@
-import json
+import threading
+from utils.utility import registry
 
 task_analyzer_system_prompt = """You are a Task Analyzer. Your role is to break down tasks into the MINIMUM number of necessary sub-tasks.
 
@@ -91,14 +92,14 @@ Example 4: "Calculate compound interest on $1000 at 5% for 10 years"
 
 Remember, these tools will be generated as actual Python code and executed to solve the user's query. Your output must contain ONLY the JSON response."""
 
-available_tools = json.dumps(json.loads(open('data/tool_config.json').read().strip() or '[]'))
-tool_list = json.loads(available_tools)
-filtered_tools = [
-    {key: value for key, value in tool.items() if key not in {"is_available", "function"}}
-    for tool in tool_list
-]
+def build_tool_selector_prompt(tools):
+    """Build the Tool Selector system prompt listing `tools` as the Available Tools."""
+    filtered_tools = [
+        {key: value for key, value in tool.items() if key not in {"is_available", "function", "requirements", "approved"}}
+        for tool in tools
+    ]
 
-tool_selector_system_prompt = f"""You are an intelligent Tool Selector agent. Given a list of Required Tools (name and description) and a list of Available Tools \
+    return f"""You are an intelligent Tool Selector agent. Given a list of Required Tools (name and description) and a list of Available Tools \
     (name, description, availability and function) you need to determine the availablibily of Required Tools based on the Required Tool 'name' and 'desciption'. \
     A Required Tool's name may or may not match exatcly with the Available Tools in the system but their description may be similar or the Required Tool may not be \
     present in the Available Tool at all.
@@ -121,6 +122,29 @@ tool_selector_system_prompt = f"""You are an intelligent Tool Selector agent. Gi
 
     """
 
+_selector_prompt_lock = threading.Lock()
+_selector_prompt_cache = {"version": None, "prompt": None}
+
+def get_tool_selector_system_prompt():
+    """Selector prompt listing the whole registry.
+
+    Built per call from the registry snapshot, so tools stored by a running
+    process are visible immediately; the prompt is only re-rendered when the
+    registry version changes.
+    """
+    version, tools = registry.snapshot()
+    with _selector_prompt_lock:
+        if _selector_prompt_cache["version"] != version:
+            _selector_prompt_cache["prompt"] = build_tool_selector_prompt(tools)
+            _selector_prompt_cache["version"] = version
+        return _selector_prompt_cache["prompt"]
+
+def __getattr__(name):
+    # Keep `prompts.tool_selector_system_prompt` working, now always up to date
+    if name == "tool_selector_system_prompt":
+        return get_tool_selector_system_prompt()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 non_api_based_code_writer_system_prompt = """You are a Python Tool Generator. Your task is to create high-quality, executable Python functions that solve specific tasks.
 
 Your code must be:
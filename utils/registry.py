@@ -0,0 +1,164 @@
+import os
+import json
+import hashlib
+import threading
+
+
+class ToolRegistry:
+    """In-memory, indexed view of the tool dataset (data/tool_config.json).
+
+    The JSON file is parsed once and re-read only when its mtime changes.
+    New and updated tools are appended to a JSONL journal next to it
+    (`<path>.journal`) instead of rewriting the whole file; the journal is
+    folded back into the JSON file with an atomic replace once it holds
+    `compact_every` entries, or when compact() is called.
+    """
+
+    def __init__(self, path, compact_every=50):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.compact_every = compact_every
+        # Incremented whenever the set of tools changes
+        self.version = 0
+        self._lock = threading.RLock()
+        self._tools = []
+        self._positions = {}
+        self._by_name = {}
+        self._by_description = {}
+        self._journal_entries = 0
+        self._signature = None
+        self._listeners = []
+
+    @staticmethod
+    def _description_key(description):
+        normalized = " ".join((description or "").lower().split())
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    def _file_signature(self):
+        signature = []
+        for path in (self.path, self.journal_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _refresh(self):
+        signature = self._file_signature()
+        if signature != self._signature:
+            self._load()
+            self._signature = signature
+
+    def _load(self):
+        tools = []
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as file:
+                try:
+                    tools = json.loads(file.read().strip() or "[]")
+                except json.JSONDecodeError:
+                    print("Error reading tool config, initializing empty list")
+                    tools = []
+
+        self._tools = []
+        self._positions = {}
+        for tool in tools:
+            self._apply(tool)
+
+        self._journal_entries = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line from an interrupted append
+                        continue
+                    self._apply(entry)
+                    self._journal_entries += 1
+
+        self._reindex()
+        self.version += 1
+
+    def _apply(self, tool):
+        """Insert or replace `tool` by exact name, keeping the original order."""
+        name = tool.get("name")
+        position = self._positions.get(name) if name is not None else None
+        if position is None:
+            self._positions[name] = len(self._tools)
+            self._tools.append(tool)
+            return False
+        self._tools[position] = tool
+        return True
+
+    def _reindex(self):
+        self._by_name = {}
+        self._by_description = {}
+        for tool in self._tools:
+            self._index(tool)
+
+    def _index(self, tool):
+        # First match wins, mirroring the linear scans this replaces
+        self._by_name.setdefault((tool.get("name") or "").lower(), tool)
+        self._by_description.setdefault(self._description_key(tool.get("description")), tool)
+
+    def find(self, name, description):
+        """Look a tool up by name (case-insensitive), falling back to its description."""
+        with self._lock:
+            self._refresh()
+            tool = self._by_name.get(name.lower()) if name else None
+            if tool is None:
+                tool = self._by_description.get(self._description_key(description))
+            return tool
+
+    def snapshot(self):
+        """Return (version, list of tools) for a consistent read of the registry."""
+        with self._lock:
+            self._refresh()
+            return self.version, list(self._tools)
+
+    def add_listener(self, callback):
+        """Call `callback(tool)` after a tool is added or updated through upsert()."""
+        self._listeners.append(callback)
+
+    def upsert(self, tool):
+        """Add or replace a tool by name; returns True if an existing tool was updated."""
+        with self._lock:
+            self._refresh()
+            with open(self.journal_path, "a", encoding="utf-8") as journal:
+                journal.write(json.dumps(tool) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+            self._journal_entries += 1
+
+            updated = self._apply(tool)
+            if updated:
+                self._reindex()
+            else:
+                self._index(tool)
+            self.version += 1
+
+            if self._journal_entries >= self.compact_every:
+                self.compact()
+            else:
+                self._signature = self._file_signature()
+
+        for callback in self._listeners:
+            callback(tool)
+        return updated
+
+    def compact(self):
+        """Fold the journal into the JSON file with an atomic replace."""
+        with self._lock:
+            self._refresh()
+            directory = os.path.dirname(self.path) or "."
+            tmp_path = os.path.join(directory, f".{os.path.basename(self.path)}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self._tools, file, indent=4)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self._journal_entries = 0
+            self._signature = self._file_signature()
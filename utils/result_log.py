@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import threading
+
+
+class ResultLog:
+    """Append-only JSONL log of inference results, one {"index", "result"} line per question.
+
+    Appending costs the same however long the run is: each line is flushed
+    to the OS right away and fsynced in batches of `fsync_every` lines or
+    every `fsync_interval` seconds, whichever comes first. On open the log
+    is scanned to rebuild the set of completed indices; a line torn by a
+    crash is cut off. compact() writes the results as one JSON array in
+    index order with an atomic replace.
+    """
+
+    def __init__(self, path, fsync_every=20, fsync_interval=5.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        # Byte offset of the latest line for each completed index
+        self._offsets = {}
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._scan()
+        self._file = open(path, "ab")
+
+    def _scan(self):
+        if not os.path.exists(self.path):
+            return
+        valid_end = 0
+        with open(self.path, "rb") as file:
+            offset = 0
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                    self._offsets[int(entry["index"])] = offset
+                except (ValueError, KeyError, TypeError):
+                    break
+                offset += len(line)
+                valid_end = offset
+        if valid_end < os.path.getsize(self.path):
+            # Drop a partial last line so new entries start on a fresh line
+            with open(self.path, "r+b") as file:
+                file.truncate(valid_end)
+
+    @property
+    def completed(self):
+        with self._lock:
+            return set(self._offsets)
+
+    def __contains__(self, index):
+        with self._lock:
+            return index in self._offsets
+
+    def __len__(self):
+        with self._lock:
+            return len(self._offsets)
+
+    def append(self, index, result):
+        line = (json.dumps({"index": index, "result": result}, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+            self._offsets[index] = offset
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                self._sync()
+                self._file.close()
+
+    def results(self):
+        """Yield the results in index order, reading one line at a time."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+            offsets = sorted(self._offsets.items())
+        with open(self.path, "rb") as file:
+            for _, offset in offsets:
+                file.seek(offset)
+                yield json.loads(file.readline())["result"]
+
+    def compact(self, output_path):
+        """Write all results as a JSON array in index order to `output_path`; returns the count."""
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{output_path}.tmp"
+        count = 0
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write("[")
+            for result in self.results():
+                file.write(",\n    " if count else "\n    ")
+                file.write(json.dumps(result, ensure_ascii=False))
+                count += 1
+            file.write("\n]\n" if count else "]\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, output_path)
+        return count
@@ -13,6 +13,7 @@ class State(MessagesState):
     code_generation_success: bool = False
     human_approved: bool = False
     human_feedback: str = ""
+    tool_generation_timings: dict = {}
 
 class ToolState(MessagesState):
     context: list
@@ -25,4 +26,5 @@ class ToolState(MessagesState):
     human_approved: bool = False
     human_feedback: str = ""
     api_key: str = None
-    execution_output: str = None
\ No newline at end of file
+    execution_output: str = None
+    tool_generation_timings: dict = {}
\ No newline at end of file
@@ -0,0 +1,169 @@
+import os
+import re
+import zlib
+import logging
+import threading
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+EMBEDDING_MODEL = os.getenv("TOOL_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+TOP_K = int(os.getenv("TOOL_INDEX_TOP_K", "5"))
+# Cosine similarity above which a registry tool is taken as available without asking the LLM
+ACCEPT_THRESHOLD = float(os.getenv("TOOL_INDEX_ACCEPT_THRESHOLD", "0.92"))
+
+
+def tool_text(tool):
+    """Text that represents a tool in the index."""
+    return f"{(tool.get('name') or '').replace('_', ' ')}: {tool.get('description') or ''}"
+
+
+class HashingEmbedder:
+    """Offline fallback: signed feature hashing of words and character n-grams."""
+
+    def __init__(self, dim=1024, ngram_range=(3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text):
+        text = " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+        features = text.split()
+        padded = f" {text} "
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                # crc32 is stable across processes, unlike hash()
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model; never downloads at query time."""
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu", local_files_only=True)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts):
+        vectors = self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32)
+
+
+def load_embedder(model_name=EMBEDDING_MODEL):
+    """Return a local embedding model, or the hashing fallback when none is available."""
+    if model_name and model_name != "hashing":
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except Exception as e:
+            logger.warning(f"Embedding model {model_name} unavailable ({e}), using hashed n-gram embeddings")
+    return HashingEmbedder()
+
+
+class ToolIndex:
+    """Vector index over tool name + description, kept in step with a ToolRegistry."""
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self._lock = threading.Lock()
+        self._version = None
+        self._ids = {}
+        self._texts = {}
+        self._tools = {}
+        self._next_id = 0
+        if faiss is not None:
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(embedder.dim))
+        else:
+            self._matrix = np.zeros((0, embedder.dim), dtype=np.float32)
+            self._row_ids = np.zeros(0, dtype=np.int64)
+
+    def _remove(self, tool_id):
+        if faiss is not None:
+            self._index.remove_ids(np.array([tool_id], dtype=np.int64))
+        else:
+            keep = self._row_ids != tool_id
+            self._matrix = self._matrix[keep]
+            self._row_ids = self._row_ids[keep]
+
+    def _add_vectors(self, vectors, ids):
+        if faiss is not None:
+            self._index.add_with_ids(vectors, ids)
+        else:
+            self._matrix = np.vstack([self._matrix, vectors])
+            self._row_ids = np.concatenate([self._row_ids, ids])
+
+    def add(self, tools):
+        """Embed tools that are new or whose name/description changed."""
+        with self._lock:
+            pending = []
+            for tool in tools:
+                name = tool.get("name")
+                if not name:
+                    continue
+                text = tool_text(tool)
+                self._tools[name] = tool
+                if self._texts.get(name) == text:
+                    continue
+                if name in self._ids:
+                    self._remove(self._ids[name])
+                self._ids[name] = self._next_id
+                self._texts[name] = text
+                self._next_id += 1
+                pending.append(name)
+            if pending:
+                vectors = self.embedder.encode([self._texts[name] for name in pending])
+                ids = np.array([self._ids[name] for name in pending], dtype=np.int64)
+                self._add_vectors(vectors, ids)
+
+    def sync(self, registry):
+        """Catch up with changes made to the registry outside of add()."""
+        version, tools = registry.snapshot()
+        if version != self._version:
+            self.add(tools)
+            self._version = version
+
+    def search(self, text, k=TOP_K):
+        """Return up to k (similarity, tool) pairs, best first."""
+        with self._lock:
+            if not self._ids:
+                return []
+            query = self.embedder.encode([text])
+            names = {tool_id: name for name, tool_id in self._ids.items()}
+            if faiss is not None:
+                scores, ids = self._index.search(query, min(k, len(self._ids)))
+                hits = zip(scores[0], ids[0])
+            else:
+                scores = self._matrix @ query[0]
+                order = np.argsort(-scores)[:k]
+                hits = zip(scores[order], self._row_ids[order])
+            return [(float(score), self._tools[names[int(tool_id)]]) for score, tool_id in hits if tool_id in names]
+
+
+_tool_index = None
+_tool_index_lock = threading.Lock()
+
+
+def get_tool_index():
+    """Shared index over utils.utility.registry, loading the embedding model on first use."""
+    global _tool_index
+    from utils.utility import registry
+    with _tool_index_lock:
+        if _tool_index is None:
+            _tool_index = ToolIndex(load_embedder())
+            registry.add_listener(lambda tool: _tool_index.add([tool]))
+    _tool_index.sync(registry)
+    return _tool_index
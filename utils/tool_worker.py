@@ -0,0 +1,154 @@
+"""Process side of the tool worker pool in utils.executor.
+
+Kept apart from the executor so a worker never loads .env: workers start
+with a scrubbed environment and should not get the parent's secrets back.
+"""
+import os
+import sys
+import pickle
+import linecache
+import tempfile
+import traceback
+
+try:
+    import resource
+except ImportError:
+    # Windows: no rlimits, and tools run through subprocess mode anyway
+    resource = None
+
+
+def _current_rss_mb():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def limit_memory(max_memory_mb):
+    """Cap the address space of this process and its children; 0 leaves it unlimited."""
+    if resource is not None and max_memory_mb > 0:
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def limit_cpu(max_cpu_seconds):
+    """Let this process use `max_cpu_seconds` more CPU time before SIGXCPU ends it; 0 lifts the limit."""
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if max_cpu_seconds > 0:
+        soft = int(_cpu_seconds()) + max_cpu_seconds + 1
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+    else:
+        soft = hard
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _read_output(file):
+    file.seek(0)
+    return file.read().decode("utf-8", errors="replace")
+
+
+def _run_source(source, filename, max_cpu_seconds=0):
+    """Execute tool source as if it were `python filename`; returns (returncode, stdout, stderr).
+
+    fds 1 and 2 point at temporary files during the run, so output of child
+    processes, os.system() and C extensions is captured along with print().
+    The working directory, sys.path, sys.argv and os.environ are restored
+    afterwards.
+    """
+    # Let tracebacks show the executed source instead of whatever is on disk
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+
+    returncode = 0
+    cwd, path, argv, environ = os.getcwd(), list(sys.path), list(sys.argv), dict(os.environ)
+    streams = sys.stdout, sys.stderr
+    sys.argv = [filename]
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        for stream in streams:
+            stream.flush()
+        saved_fds = os.dup(1), os.dup(2)
+        os.dup2(stdout.fileno(), 1)
+        os.dup2(stderr.fileno(), 2)
+        limit_cpu(max_cpu_seconds)
+        try:
+            code = compile(source, filename, "exec")
+            exec(code, {"__name__": "__main__", "__file__": filename, "__builtins__": __builtins__})
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                returncode = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                returncode = 1
+        except BaseException as e:
+            # Drop this frame so the traceback matches a plain interpreter run
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            returncode = 1
+        finally:
+            limit_cpu(0)
+            sys.stdout, sys.stderr = streams
+            for stream in streams:
+                stream.flush()
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            for fd in saved_fds:
+                os.close(fd)
+        output = _read_output(stdout), _read_output(stderr)
+    os.chdir(cwd)
+    sys.path[:] = path
+    sys.argv = argv
+    if dict(os.environ) != environ:
+        os.environ.clear()
+        os.environ.update(environ)
+    if "matplotlib.pyplot" in sys.modules:
+        sys.modules["matplotlib.pyplot"].close("all")
+    return (returncode,) + output
+
+
+def main(preload, max_memory_mb=0, max_cpu_seconds=0):
+    """Worker loop: read (source, filename) frames from stdin, answer on stdout.
+
+    Tools get no stdin: input() raises EOFError, as the protocol owns fd 0.
+    """
+    # Keep the protocol pipes private; between runs anything writing to fd 0/1 (pip, child processes) gets /dev/null
+    proto_in = os.fdopen(os.dup(0), "rb")
+    proto_out = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.stdin = open(os.devnull)
+    limit_memory(max_memory_mb)
+
+    for name in preload:
+        try:
+            __import__(name)
+        except Exception:
+            pass
+
+    pickle.dump(("ready", _current_rss_mb()), proto_out)
+    proto_out.flush()
+    while True:
+        try:
+            request = pickle.load(proto_in)
+        except EOFError:
+            break
+        if request is None:
+            break
+        result = _run_source(*request, max_cpu_seconds)
+        pickle.dump((result, _current_rss_mb()), proto_out)
+        proto_out.flush()
+
+
+if __name__ == "__main__":
+    main(
+        [name for name in sys.argv[1].split(",") if name],
+        max_memory_mb=int(sys.argv[2]),
+        max_cpu_seconds=int(sys.argv[3]),
+    )
@@ -1,5 +1,4 @@
 import subprocess
-import re
 from dotenv import load_dotenv
 import utils.schema as schema
 import utils.utility as utility
@@ -22,7 +21,7 @@ def api_documentation_pipeline(state:schema.ToolState):
         scraper = APICodeAgent()
         
         # Generate code using the scraper
-        code = scraper.generate_api_code(query)
+        code = scraper.generate_api_code(query, tool_name=api_name)
         
         if code and code != "no code found":
             # Create a temporary state for the interpreter
@@ -64,7 +63,7 @@ SCRIPT_PATH = "temp/generated_script.py"
 
 def python_interpreter(state:schema.ToolState):
     # Extract Python code from the message
-    python_code = re.findall(r"```python(.*?)```", state["messages"][-1].content, re.DOTALL)
+    python_code = utility.extract_python_code(state["messages"][-1].content)
     
     # If no code found, return early with success state
     if not python_code:
@@ -76,7 +75,7 @@ def python_interpreter(state:schema.ToolState):
         
     try:
         # Check for API key placeholder
-        code_content = python_code[0]
+        code_content = python_code
         if "YOUR_API_KEY" in code_content:
             # Get API key from user
             api_key = input("Please enter your API key for this service: ")
@@ -0,0 +1,157 @@
+import os
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Connection pool settings shared by every LLM call site
+POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "600"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+# Read failures (reset mid-response, read timeout) are retried less eagerly since
+# a generation may already have run for minutes before failing
+READ_RETRIES = int(os.getenv("LLM_READ_RETRIES", "1"))
+RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+# Async clients are bound to the event loop that created them
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _host_key(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def _build_session():
+    """Create a keep-alive session with a bounded pool and retry-with-backoff."""
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=READ_RETRIES,
+        status=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUS_CODES,
+        # Ollama generation requests are POSTs, so they must be retried too
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({'Content-Type': 'application/json'})
+    return session
+
+
+def get_session(url):
+    """Return the shared session for the host serving `url`."""
+    key = _host_key(url)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _build_session()
+                _sessions[key] = session
+    return session
+
+
+def post(url, timeout=None, **kwargs):
+    """POST through the pooled session of the target host.
+
+    `timeout` may be a single read timeout in seconds or a (connect, read) tuple;
+    the configured connect timeout is used when only the read timeout is given.
+    """
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    elif not isinstance(timeout, tuple):
+        timeout = (CONNECT_TIMEOUT, timeout)
+    return get_session(url).post(url, timeout=timeout, **kwargs)
+
+
+def close_sessions():
+    """Close every pooled session (e.g. before forking worker processes)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def get_async_client(url):
+    """Return the pooled async client for the host serving `url` on the running loop."""
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    key = _host_key(url)
+    client = clients.get(key)
+    if client is None:
+        limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+        client = httpx.AsyncClient(
+            # The transport retries failed connection attempts; 5xx is handled in _asend
+            transport=httpx.AsyncHTTPTransport(retries=MAX_RETRIES, limits=limits),
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            headers={'Content-Type': 'application/json'},
+        )
+        clients[key] = client
+    return client
+
+
+def _async_timeout(timeout):
+    if timeout is None:
+        return httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+    if isinstance(timeout, tuple):
+        return httpx.Timeout(timeout[1], connect=timeout[0])
+    return httpx.Timeout(timeout, connect=CONNECT_TIMEOUT)
+
+
+async def _asend(url, stream, timeout, kwargs):
+    """Send a POST with the same retry-with-backoff policy as the sync sessions."""
+    client = get_async_client(url)
+    attempt = 0
+    while True:
+        request = client.build_request("POST", url, timeout=_async_timeout(timeout), **kwargs)
+        try:
+            response = await client.send(request, stream=stream)
+        except (httpx.RemoteProtocolError, httpx.ReadError):
+            # Connection reset by the server
+            if attempt >= READ_RETRIES:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= MAX_RETRIES:
+                return response
+            await response.aclose()
+        await asyncio.sleep(RETRY_BACKOFF * (2 ** attempt))
+        attempt += 1
+
+
+async def apost(url, timeout=None, **kwargs):
+    """Async counterpart of post()."""
+    return await _asend(url, False, timeout, kwargs)
+
+
+@asynccontextmanager
+async def astream_post(url, timeout=None, **kwargs):
+    """POST and yield the response without reading the body, closing it on exit."""
+    response = await _asend(url, True, timeout, kwargs)
+    try:
+        yield response
+    finally:
+        await response.aclose()
+
+
+async def aclose_clients():
+    """Close the async clients bound to the running event loop."""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
@@ -1,62 +1,38 @@
-import re
 import os
 import ast
 import json
 from dotenv import load_dotenv
 from tiktoken import get_encoding
+from utils.registry import ToolRegistry
+from utils.dependencies import parse_requirements
+from utils import codeblocks
 
 load_dotenv()
 
 def extract_python_code(text: str) -> str:
     """Extracts Python code block from a given string."""
-    match = re.search(r"```python\n(.*?)\n```", text, re.DOTALL)
-    return match.group(1) if match else ""
+    return codeblocks.extract_python(text)
 
 def extract_json(response: str):
-    match = re.search(r'```json\n(.*?)\n```', response, re.DOTALL)
-    if match:
-        json_content = match.group(1)
-        try:
-            return json.loads(json_content)
-        except json.JSONDecodeError:
-            return ""
-    return ""
+    """Extracts JSON from a ```json block, an untagged block or the bare response; "" if none parses."""
+    value = codeblocks.extract_json(response)
+    return "" if value is None else value
 
 tool_dataset_dir = 'data/tool_config.json'
+# Shared registry: loaded once, reloaded only when the dataset file changes
+registry = ToolRegistry(tool_dataset_dir)
 # Global cache to track updated tools
 _updated_tools_cache = set()
 
 def retrieve_tool(required_tool):
-    with open(tool_dataset_dir, 'r') as file:
-        tool_list = json.load(file) or []
-
     for i, tool_item in enumerate(required_tool):
         if tool_item['is_available']:
-            # Get the name from the required tool
-            name = tool_item['name']
-            # If name is empty, try to find a tool with matching description
-            if not name:
-                for tool in tool_list:
-                    if tool['description'].lower() == tool_item['description'].lower():
-                        required_tool[i]['name'] = tool['name']
-                        required_tool[i]['function'] = tool['function']
-                        break
-            else:
-                # If name exists, try to find exact match first
-                found = False
-                for tool in tool_list:
-                    if tool['name'].lower() == name.lower():
-                        required_tool[i]['function'] = tool['function']
-                        found = True
-                        break
-                
-                # If no exact match found, try matching by description
-                if not found:
-                    for tool in tool_list:
-                        if tool['description'].lower() == tool_item['description'].lower():
-                            required_tool[i]['name'] = tool['name']
-                            required_tool[i]['function'] = tool['function']
-                            break
+            # Match by name first, then by description
+            tool = registry.find(tool_item['name'], tool_item['description'])
+            if tool is not None:
+                if not tool_item['name'] or tool['name'].lower() != tool_item['name'].lower():
+                    required_tool[i]['name'] = tool['name']
+                required_tool[i]['function'] = tool['function']
 
     return required_tool
 
@@ -69,50 +45,35 @@ def store_tool(state, i):
         print(f"Invalid tool index: {i}")
         return
         
-    with open(tool_dataset_dir, "r", encoding="utf-8") as file:
-        try:
-            tool_config = json.load(file)
-        except json.JSONDecodeError:
-            print("Error reading tool config, initializing empty list")
-            tool_config = []
-        
-        # Get the tool to be added
-        new_tool = state['required_tools'][i]
+    # Get the tool to be added
+    new_tool = state['required_tools'][i]
+    
+    # Skip if tool doesn't have a name
+    if not new_tool.get('name'):
+        print(f"Skipping unnamed tool at index {i}")
+        return
         
-        # Skip if tool doesn't have a name
-        if not new_tool.get('name'):
-            print(f"Skipping unnamed tool at index {i}")
-            return
-            
-        # Skip if tool doesn't have a function
-        if not new_tool.get('function'):
-            print(f"Skipping tool without function: {new_tool.get('name')}")
-            return
-            
-        # Skip if we've already updated this tool in this session
-        if new_tool.get('name') in _updated_tools_cache:
-            print(f"Already updated tool in this session: {new_tool.get('name')}")
-            return
-            
-        # Check if a tool with the same name already exists
-        tool_exists = False
-        for j, existing_tool in enumerate(tool_config):
-            if existing_tool.get('name') == new_tool.get('name'):
-                # Update the existing tool instead of adding a duplicate
-                tool_config[j] = new_tool
-                tool_exists = True
-                print(f"Updating existing tool: {new_tool.get('name')}")
-                _updated_tools_cache.add(new_tool.get('name'))
-                break
+    # Skip if tool doesn't have a function
+    if not new_tool.get('function'):
+        print(f"Skipping tool without function: {new_tool.get('name')}")
+        return
         
-        # Only append if the tool doesn't already exist
-        if not tool_exists:
-            tool_config.append(new_tool)
-            print(f"Adding new tool: {new_tool.get('name')}")
-            _updated_tools_cache.add(new_tool.get('name'))
+    # Skip if we've already updated this tool in this session
+    if new_tool.get('name') in _updated_tools_cache:
+        print(f"Already updated tool in this session: {new_tool.get('name')}")
+        return
+    
+    # Record the REQUIRED_PACKAGES block so runs can install once instead of on every execution
+    new_tool['requirements'] = parse_requirements(new_tool['function'])
+    # New code waits for approval before the registry approval policy trusts it
+    new_tool['approved'] = False
 
-    with open(tool_dataset_dir, "w", encoding="utf-8") as file:
-        json.dump(tool_config, file, indent=4)
+    # Update the existing tool with the same name instead of adding a duplicate
+    if registry.upsert(new_tool):
+        print(f"Updating existing tool: {new_tool.get('name')}")
+    else:
+        print(f"Adding new tool: {new_tool.get('name')}")
+    _updated_tools_cache.add(new_tool.get('name'))
 
 
 def extract_function_names(python_code: str):